@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'sndot.middleware.MetricasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,13 +80,141 @@ WSGI_APPLICATION = 'setup.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SNDOT_BANCO escolhe o perfil do banco de dados:
+#   'sqlite' (padrão): SQLite ajustado para escritas concorrentes (WAL, synchronous=NORMAL,
+#       busy_timeout, cache e mmap maiores, aplicados a cada nova conexão pelo init_command,
+#       e transações BEGIN IMMEDIATE, que esperam pelo lock em vez de falhar com
+#       "database is locked" ao passar de leitura para escrita);
+#   'sqlite-padrao': SQLite com as configurações padrão do Django (referência para comparação);
+#   'postgres': PostgreSQL (requer o pacote psycopg) com conexões persistentes
+#       (SNDOT_PG_CONN_MAX_AGE segundos) ou, com SNDOT_PG_POOL=1, com o pool de
+#       conexões do psycopg (requer psycopg[pool]; o Django exige CONN_MAX_AGE=0).
+# O comando benchmark_banco mede a vazão de escritas concorrentes do perfil em uso.
+
+SNDOT_BANCO = os.getenv('SNDOT_BANCO', 'sqlite')
+SNDOT_SQLITE_ARQUIVO = os.getenv('SNDOT_SQLITE_ARQUIVO', BASE_DIR / 'db.sqlite3')
+SNDOT_PG_POOL = os.getenv('SNDOT_PG_POOL', '0') == '1'
+
+SNDOT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',            # leitores não bloqueiam o escritor (e vice-versa)
+    'synchronous': 'NORMAL',          # seguro com WAL: fsync apenas nos checkpoints
+    'busy_timeout': 20000,            # ms esperando pelo lock antes de "database is locked"
+    'cache_size': -64000,             # 64 MB de cache de páginas por conexão
+    'mmap_size': 256 * 1024 * 1024,   # leituras via memória mapeada
+    'temp_store': 'MEMORY',
+}
+
+BANCOS_DISPONIVEIS = {
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SNDOT_SQLITE_ARQUIVO,
+        'OPTIONS': {
+            'timeout': SNDOT_SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {nome}={valor}' for nome, valor in SNDOT_SQLITE_PRAGMAS.items()),
+        },
+    },
+    'sqlite-padrao': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SNDOT_SQLITE_ARQUIVO,
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('SNDOT_PG_NOME', 'sndot'),
+        'USER': os.getenv('SNDOT_PG_USUARIO', 'sndot'),
+        'PASSWORD': os.getenv('SNDOT_PG_SENHA', ''),
+        'HOST': os.getenv('SNDOT_PG_HOST', '127.0.0.1'),
+        'PORT': os.getenv('SNDOT_PG_PORTA', '5432'),
+        'CONN_MAX_AGE': 0 if SNDOT_PG_POOL else int(os.getenv('SNDOT_PG_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('SNDOT_PG_POOL_MIN', '2')),
+                'max_size': int(os.getenv('SNDOT_PG_POOL_MAX', '10')),
+                'timeout': 10,
+            },
+        } if SNDOT_PG_POOL else {},
+    },
+}
+
 DATABASES = {
+    'default': BANCOS_DISPONIVEIS[SNDOT_BANCO],
+}
+
+# Réplicas de leitura (opcional): SNDOT_REPLICAS lista, separados por vírgula, os
+# arquivos (SQLite) ou host[:porta] (PostgreSQL) das réplicas, que viram os bancos
+# replica1, replica2, ... com as demais configurações do principal. Com réplicas,
+# o roteador de sndot/replicas.py envia as leituras das requisições GET para uma
+# réplica saudável e as gravações (e a leitura do que acabou de ser gravado) para o
+# principal. O atraso das réplicas é medido pelo pulso que o comando
+# pulso_replicacao grava no principal (sem ele, as leituras ficam no principal).
+# Para testar localmente com SQLite, o comando sincronizar_replicas copia o banco
+# principal para os arquivos das réplicas (gravando também o pulso).
+SNDOT_REPLICAS = []
+for _numero, _destino in enumerate(filter(None, (r.strip() for r in os.getenv('SNDOT_REPLICAS', '').split(','))), 1):
+    _replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if _replica['ENGINE'] == 'django.db.backends.postgresql':
+        _host, _, _porta = _destino.partition(':')
+        _replica.update(HOST=_host, PORT=_porta or _replica['PORT'])
+    else:
+        _replica['NAME'] = _destino
+    DATABASES[f'replica{_numero}'] = _replica
+    SNDOT_REPLICAS.append(f'replica{_numero}')
+
+SNDOT_REPLICA_ATRASO_MAXIMO = float(os.getenv('SNDOT_REPLICA_ATRASO_MAXIMO', '10'))  # segundos
+SNDOT_REPLICA_INTERVALO = 5          # segundos entre as verificações do atraso (e entre os pulsos)
+SNDOT_REPLICA_FIXAR_SEGUNDOS = 5     # leituras no principal após uma gravação
+
+if SNDOT_REPLICAS:
+    DATABASE_ROUTERS = ['sndot.replicas.RoteadorReplicas']
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'), 'sndot.middleware.ReplicasMiddleware')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# SNDOT_CACHE_BACKEND escolhe o backend: 'arquivo' (padrão, compartilhado pelos
+# processos da mesma máquina), 'redis' (compartilhado entre máquinas; requer o pacote
+# redis e um servidor em SNDOT_REDIS_URL) ou 'memoria' (LRU limitado a
+# SNDOT_CACHE_MAX_ENTRADAS, apenas para um único processo: as versões dos grupos
+# (sndot/cache.py) também ficam no cache, e uma gravação feita por outro processo
+# (outro worker web, comandos de importação, processar_importacoes) não invalidaria
+# as páginas guardadas neste até o fim do TTL).
+
+SNDOT_CACHE_BACKEND = os.getenv('SNDOT_CACHE_BACKEND', 'arquivo')
+SNDOT_CACHE_MAX_ENTRADAS = int(os.getenv('SNDOT_CACHE_MAX_ENTRADAS', '1000'))
+
+CACHES_DISPONIVEIS = {
+    'memoria': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sndot',
+        'OPTIONS': {'MAX_ENTRIES': SNDOT_CACHE_MAX_ENTRADAS},
+    },
+    'arquivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': SNDOT_CACHE_MAX_ENTRADAS},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('SNDOT_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        **CACHES_DISPONIVEIS[SNDOT_CACHE_BACKEND],
+        'TIMEOUT': 300,
     }
 }
 
+# Tempo (em segundos) de cada grupo de entradas do cache (ver sndot/cache.py).
+# As entradas de doadores, órgãos e do painel também são invalidadas a cada gravação.
+SNDOT_CACHE_TTL = {
+    'paginas': 60 * 60,   # páginas sem dados (ex.: index)
+    'doadores': 5 * 60,   # páginas da listagem de doadores
+    'painel': 5 * 60,     # estatísticas do painel administrativo
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,3 +256,17 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Métricas por view (sndot.middleware.MetricasMiddleware)
+# Cada processo grava um snapshot das métricas neste diretório, lido pelo comando dump_metricas
+SNDOT_METRICAS_DIR = BASE_DIR / 'metricas'
+
+# Rejeita na importação os doadores cujas cidades não estão no índice de municípios
+# (sndot/dados/municipios.tsv). Desativado por padrão: o arquivo de exemplo em dados_json
+# usa cidades fictícias. As cidades conhecidas são sempre gravadas com o nome oficial.
+SNDOT_VALIDAR_MUNICIPIOS = False
+
+# API JSON de doadores (sndot/api.py): tokens aceitos nas gravações em lote
+# ("Authorization: Bearer <token>"), separados por vírgula. Sem tokens, as gravações ficam bloqueadas.
+SNDOT_API_TOKENS = [token.strip() for token in os.getenv('SNDOT_API_TOKENS', '').split(',') if token.strip()]
+SNDOT_API_TAMANHO_MAXIMO_LOTE = 1000
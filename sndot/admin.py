@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Doador, IntencaoDeDoar, Orgao
+from .models import Doador, IntencaoDeDoar, Orgao, ImportacaoDoadores, Receptor, Doacao, ResumoMensalDoacoes
+from .busca import buscar_doadores
 
 class IntencaoDeDoarInline(admin.StackedInline):
     model = IntencaoDeDoar
@@ -20,6 +21,24 @@ class DoadorAdmin(admin.ModelAdmin):
     ordering = ('nome',)
     inlines = [IntencaoDeDoarInline]
 
+    def get_queryset(self, request):
+        # tem_intencao_doar e orgaos_desejados usam a intenção e os órgãos já carregados:
+        # cada página do changelist faz um número constante de consultas
+        return super().get_queryset(request).com_intencao()
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Usa a busca indexada (sndot/busca.py) em vez de icontains em nome/cpf:
+        termos só com dígitos e pontuação de CPF buscam pelo prefixo do CPF,
+        os demais pelo nome.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if all(c.isdigit() or c in '.-' for c in search_term):
+            return buscar_doadores(queryset, cpf=search_term), False
+        return buscar_doadores(queryset, nome=search_term), False
+
     def tem_intencao_doar(self, obj):
         return hasattr(obj, 'intencao_doar') and obj.intencao_doar is not None
     tem_intencao_doar.short_description = 'Intenção de Doar?'
@@ -29,4 +48,43 @@ class DoadorAdmin(admin.ModelAdmin):
         if hasattr(obj, 'intencao_doar') and obj.intencao_doar is not None:
             return ", ".join([str(orgao) for orgao in obj.intencao_doar.orgaos.all()])
         return "-"
-    orgaos_desejados.short_description = 'Órgãos Desejados'
\ No newline at end of file
+    orgaos_desejados.short_description = 'Órgãos Desejados'
+
+@admin.register(ImportacaoDoadores)
+class ImportacaoDoadoresAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nome_arquivo', 'status', 'registros_processados', 'registros_com_erro', 'criado_em', 'concluido_em')
+    list_filter = ('status',)
+    readonly_fields = ('criado_em', 'iniciado_em', 'concluido_em')
+
+@admin.register(Receptor)
+class ReceptorAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'cpf', 'orgao', 'tipo_sanguineo', 'urgencia', 'data_inclusao', 'status')
+    list_filter = ('status', 'orgao', 'tipo_sanguineo', 'urgencia')
+    search_fields = ('nome', 'cpf')
+    list_select_related = ('orgao',)
+    list_per_page = 10
+    ordering = Receptor.ORDEM_FILA
+
+@admin.register(Doacao)
+class DoacaoAdmin(admin.ModelAdmin):
+    """Doações são somente inclusão: o admin apenas as exibe."""
+    list_display = ('data', 'orgao', 'doador', 'receptor')
+    list_filter = ('orgao',)
+    list_select_related = ('orgao', 'doador', 'receptor')
+    date_hierarchy = 'data'
+    list_per_page = 10
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ResumoMensalDoacoes)
+class ResumoMensalDoacoesAdmin(admin.ModelAdmin):
+    list_display = ('mes', 'orgao', 'total')
+    list_filter = ('orgao',)
+    list_select_related = ('orgao',)
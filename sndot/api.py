@@ -0,0 +1,404 @@
+"""
+API JSON de doadores, para os sistemas que integram com o SNDOT.
+
+Leituras (públicas, como a listagem HTML):
+- GET api/doadores/: busca com os mesmos filtros de listar_doadores, paginação por
+  cursor (por_pagina, padrão 20, máximo 100) e seleção de campos (?fields=nome,cpf,intencao).
+- GET api/doadores/<id>/: um doador, também com ?fields=.
+
+Os dados são serializados direto das linhas de .values(), sem instanciar os models,
+e as respostas levam um ETag calculado da última gravação dos doadores e das intenções
+(atualizado_em, que muda a cada inclusão ou edição de qualquer processo) e da versão
+do grupo 'doadores' do cache (trocada também pelas remoções): uma requisição com
+If-None-Match recebe 304 depois de duas buscas de MAX no índice de atualizado_em,
+sem COUNT nem varredura da tabela.
+
+Gravações em lote (token em SNDOT_API_TOKENS, cabeçalho "Authorization: Bearer <token>"):
+- POST api/doadores/lote/ {"doadores": [...]}: cadastra doadores novos.
+- PATCH api/doadores/lote/ {"doadores": [{"id": ..., campos alterados}]}: edita doadores.
+- DELETE api/doadores/lote/ {"ids": [...]}: remove doadores.
+
+Os doadores passam pelas mesmas validações de Doador.cadastrar e o lote é gravado
+em uma única transação: se algum item for inválido nada é gravado e a resposta
+(400) traz os erros de cada item, pela posição no lote. A remoção também é tudo ou
+nada: doadores com doações registradas não podem ser removidos e, se o lote tiver
+algum, nenhum doador é removido e a resposta (409) traz os itens em conflito.
+"""
+import hashlib
+import hmac
+import json
+from datetime import date
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from .busca import buscar_doadores, filtros_da_consulta
+from .cache import aobter_ou_calcular, aversao
+from .models import Doador, IntencaoDeDoar
+from .orgaos import REGISTRO_ORGAOS
+from .paginacao import PaginadorKeyset
+
+# Campos dos doadores aceitos na gravação (e devolvidos pela leitura, além de 'id' e 'intencao')
+CAMPOS_GRAVAVEIS = tuple(
+    field.name for field in Doador._meta.concrete_fields if not field.primary_key and field.editable
+)
+CAMPOS_API = ('id',) + CAMPOS_GRAVAVEIS + ('intencao',)
+CAMPOS_PADRAO_LISTAGEM = (
+    'id', 'nome', 'cpf', 'idade', 'data_nascimento', 'cidade_residencia',
+    'estado_residencia', 'tipo_sanguineo', 'contato_emergencia',
+)
+COLUNAS_INTENCAO = ('intencao_doar__id', 'intencao_doar__status', 'intencao_doar__doar_agora')
+
+POR_PAGINA_PADRAO = 20
+POR_PAGINA_MAXIMO = 100
+TAMANHO_MAXIMO_LOTE = 1000
+
+
+class LoteEmConflito(Exception):
+    """Itens do lote em conflito com o estado do banco (ex.: doadores com doações); nada foi gravado."""
+
+    def __init__(self, mensagem, erros):
+        super().__init__(mensagem)
+        self.erros = erros
+
+
+def _erro(mensagem, status=400, **extras):
+    return JsonResponse({'erro': mensagem, **extras}, status=status)
+
+
+def _erros_por_item(erros):
+    return [{'indice': indice, 'erros': erros[indice]} for indice in sorted(erros)]
+
+
+# --- leitura ---
+
+def _campos_pedidos(request, padrao):
+    """Campos de ?fields= (na ordem pedida) ou `padrao`. Lança ValueError com campos desconhecidos."""
+    pedidos = [campo.strip() for campo in request.GET.get('fields', '').split(',') if campo.strip()]
+    if not pedidos:
+        return list(padrao)
+    desconhecidos = [campo for campo in pedidos if campo not in CAMPOS_API]
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos: {', '.join(desconhecidos)}. Disponíveis: {', '.join(CAMPOS_API)}.")
+    return list(dict.fromkeys(pedidos))
+
+
+def _colunas(campos):
+    """Colunas de .values() para os campos; 'nome' e 'id' sempre, por serem a chave da paginação."""
+    colunas = ['id', 'nome']
+    for campo in campos:
+        novas = COLUNAS_INTENCAO if campo == 'intencao' else (campo,)
+        colunas.extend(coluna for coluna in novas if coluna not in colunas)
+    return colunas
+
+
+async def _serializar(linhas, campos):
+    """
+    Projeta as linhas de .values() nos campos pedidos. Com 'intencao', os órgãos de
+    todas as intenções das linhas são lidos em uma única consulta (ids dos órgãos).
+    """
+    orgaos = {}
+    if 'intencao' in campos:
+        intencoes = [linha['intencao_doar__id'] for linha in linhas if linha['intencao_doar__id'] is not None]
+        if intencoes:
+            consulta = (
+                IntencaoDeDoar.orgaos.through.objects.filter(intencaodedoar_id__in=intencoes)
+                .order_by('orgao_id').values_list('intencaodedoar_id', 'orgao_id')
+            )
+            async for intencao_id, orgao_id in consulta:
+                orgaos.setdefault(intencao_id, []).append(orgao_id)
+
+    resultado = []
+    for linha in linhas:
+        item = {}
+        for campo in campos:
+            if campo != 'intencao':
+                item[campo] = linha[campo]
+            elif linha['intencao_doar__id'] is None:
+                item['intencao'] = None
+            else:
+                item['intencao'] = {
+                    'status': linha['intencao_doar__status'],
+                    'doar_agora': linha['intencao_doar__doar_agora'],
+                    'orgaos': orgaos.get(linha['intencao_doar__id'], []),
+                }
+        resultado.append(item)
+    return resultado
+
+
+async def _etag_doadores(request):
+    """
+    ETag das leituras: muda a cada inclusão ou edição de doador ou intenção, de
+    qualquer processo (inclusive do worker de importações), e a cada remoção.
+    Retorna (etag, resposta 304 ou None).
+
+    Cada MAX é uma consulta separada: sozinho, o MAX de uma coluna indexada é uma
+    busca no índice; junto com outra agregação, vira uma varredura da tabela.
+    As remoções não mudam nenhum MAX e são vistas pela versão do grupo 'doadores',
+    trocada pelos sinais e pelas gravações em lote (compartilhada entre os processos
+    com o backend de cache padrão).
+    """
+    doadores = await Doador.objects.aaggregate(atualizado=Max('atualizado_em'))
+    intencoes = await IntencaoDeDoar.objects.aaggregate(atualizado=Max('atualizado_em'))
+    resumo = repr((await aversao('doadores'), doadores['atualizado'], intencoes['atualizado']))
+    etag = quote_etag(hashlib.md5(resumo.encode('utf-8')).hexdigest())
+    return etag, get_conditional_response(request, etag=etag)
+
+
+@require_GET
+async def listar_doadores_json(request):
+    """Busca de doadores em JSON, com os filtros e cursores de listar_doadores e seleção de campos."""
+    etag, nao_modificada = await _etag_doadores(request)
+    if nao_modificada is not None:
+        return nao_modificada
+
+    try:
+        campos = _campos_pedidos(request, CAMPOS_PADRAO_LISTAGEM)
+    except ValueError as e:
+        return _erro(str(e))
+    try:
+        por_pagina = min(max(int(request.GET.get('por_pagina', POR_PAGINA_PADRAO)), 1), POR_PAGINA_MAXIMO)
+    except ValueError:
+        por_pagina = POR_PAGINA_PADRAO
+    filtros = filtros_da_consulta(request.GET)
+    cursor = request.GET.get('cursor')
+
+    async def calcular():
+        # buscar_doadores consulta o roteador de bancos (que pode ir ao banco): roda fora do event loop
+        doadores = await sync_to_async(buscar_doadores)(**filtros)
+        pagina = await PaginadorKeyset(doadores.values(*_colunas(campos)), por_pagina).apagina(cursor)
+        pagina.object_list = await _serializar(pagina.object_list, campos)
+        return pagina
+
+    # O ETag faz parte da chave: uma página em cache nunca é mais antiga que o banco
+    pagina = await aobter_ou_calcular('doadores', ('api', etag, sorted(filtros.items()), cursor, por_pagina, campos), calcular)
+
+    def url_cursor(cursor):
+        parametros = {**filtros, 'por_pagina': por_pagina, 'cursor': cursor}
+        if 'fields' in request.GET:
+            parametros['fields'] = ','.join(campos)
+        return f'{request.path}?{urlencode(parametros)}'
+
+    resposta = JsonResponse({
+        'resultados': pagina.object_list,
+        'proxima': url_cursor(pagina.next_cursor) if pagina.has_next else None,
+        'anterior': url_cursor(pagina.previous_cursor) if pagina.has_previous else None,
+    })
+    resposta['ETag'] = etag
+    return resposta
+
+
+@require_GET
+async def detalhar_doador_json(request, doador_id):
+    """Um doador em JSON (todos os campos, inclusive a intenção de doar, ou os de ?fields=)."""
+    etag, nao_modificada = await _etag_doadores(request)
+    if nao_modificada is not None:
+        return nao_modificada
+
+    try:
+        campos = _campos_pedidos(request, CAMPOS_API)
+    except ValueError as e:
+        return _erro(str(e))
+    linha = await aget_object_or_404(Doador.objects.values(*_colunas(campos)), id=doador_id)
+    (doador,) = await _serializar([linha], campos)
+
+    resposta = JsonResponse(doador)
+    resposta['ETag'] = etag
+    return resposta
+
+
+# --- gravação em lote ---
+
+def _autorizada(request):
+    """A requisição traz um dos tokens de SNDOT_API_TOKENS no cabeçalho Authorization."""
+    tipo, _, token = request.headers.get('Authorization', '').partition(' ')
+    if tipo.lower() != 'bearer' or not token:
+        return False
+    return any(hmac.compare_digest(token.strip(), valido) for valido in getattr(settings, 'SNDOT_API_TOKENS', []))
+
+
+def _converter_intencao(dados_intencao):
+    """
+    Converte o bloco "intencao" ({"doar_agora": true, "orgaos": [ids]}) no formato de
+    dados_intencao de Doador.cadastrar, com o mesmo status gravado pelas views.
+    Lança ValidationError se o bloco ou algum órgão for inválido.
+    """
+    if not isinstance(dados_intencao, dict):
+        raise ValidationError('A intenção deve ser um objeto com "doar_agora" e "orgaos".')
+    orgaos = dados_intencao.get('orgaos') or []
+    if not isinstance(orgaos, list):
+        raise ValidationError('"orgaos" deve ser uma lista de ids de órgãos.')
+    desconhecidos = [orgao_id for orgao_id in orgaos if REGISTRO_ORGAOS.por_id(orgao_id) is None]
+    if desconhecidos:
+        raise ValidationError(f"Órgãos não cadastrados: {', '.join(map(str, desconhecidos))}.")
+    doar_agora = bool(dados_intencao.get('doar_agora'))
+    return {
+        "doar_agora": doar_agora,
+        "status": "ativa" if doar_agora else "inativa",
+        "orgaos": [REGISTRO_ORGAOS.por_id(orgao_id).pk for orgao_id in orgaos],
+    }
+
+
+def _converter_doador(item, novo):
+    """
+    Converte um item do lote nos valores Python dos campos do model (to_python de cada
+    campo) e na intenção. Para doadores novos sem 'idade', ela é calculada pela data
+    de nascimento, como na importação. Retorna (dados, erros).
+    """
+    dados, erros = {}, {}
+    for campo, valor in item.items():
+        if campo == 'intencao':
+            try:
+                dados['intencao'] = _converter_intencao(valor)
+            except ValidationError as e:
+                erros['intencao'] = e.messages
+        elif campo in CAMPOS_GRAVAVEIS:
+            try:
+                dados[campo] = Doador._meta.get_field(campo).to_python(valor)
+            except ValidationError as e:
+                erros[campo] = e.messages
+        else:
+            erros[campo] = ['Campo desconhecido.']
+
+    data_nascimento = dados.get('data_nascimento')
+    if novo and 'idade' not in item and isinstance(data_nascimento, date):
+        hoje = date.today()
+        dados['idade'] = hoje.year - data_nascimento.year - ((hoje.month, hoje.day) < (data_nascimento.month, data_nascimento.day))
+    return dados, erros
+
+
+def _itens_do_lote(corpo, chave):
+    """Lista `chave` do corpo JSON. Lança ValueError se estiver ausente, vazia ou acima do tamanho máximo."""
+    itens = corpo.get(chave) if isinstance(corpo, dict) else None
+    if not isinstance(itens, list) or not itens:
+        raise ValueError(f'O corpo deve ser um objeto JSON com a lista "{chave}".')
+    maximo = getattr(settings, 'SNDOT_API_TAMANHO_MAXIMO_LOTE', TAMANHO_MAXIMO_LOTE)
+    if len(itens) > maximo:
+        raise ValueError(f'No máximo {maximo} itens por lote.')
+    return itens
+
+
+def _cadastrar_lote(corpo):
+    """Cadastra os doadores do lote. Retorna (resultados, erros por posição)."""
+    itens = _itens_do_lote(corpo, 'doadores')
+    lista, erros = [], {}
+    for indice, item in enumerate(itens):
+        if not isinstance(item, dict):
+            erros[indice] = {'__all__': ['Cada doador deve ser um objeto JSON.']}
+            continue
+        dados, erros_item = _converter_doador(item, novo=True)
+        if erros_item:
+            erros[indice] = erros_item
+        lista.append((indice, dados))
+
+    # As mesmas validações de Doador.cadastrar (full_clean), em memória; os erros de
+    # conversão prevalecem sobre os da validação do mesmo campo
+    validacao = Doador.validar_em_lote([{k: v for k, v in dados.items() if k != 'intencao'} for _, dados in lista])
+    for (indice, _), erro in zip(lista, validacao):
+        if erro:
+            erros[indice] = {**erro, **erros.get(indice, {})}
+
+    # O CPF não pode pertencer a um doador já cadastrado, nem se repetir no lote
+    cpfs = [dados.get('cpf') for _, dados in lista if dados.get('cpf')]
+    existentes = set(Doador.objects.filter(cpf__in=cpfs).values_list('cpf', flat=True))
+    vistos = set()
+    for indice, dados in lista:
+        cpf = dados.get('cpf')
+        if cpf and (cpf in existentes or cpf in vistos):
+            erro_unico = Doador(cpf=cpf).unique_error_message(Doador, ('cpf',))
+            erros[indice] = {**erros.get(indice, {}), 'cpf': erro_unico.messages}
+        vistos.add(cpf)
+    if erros:
+        return None, erros
+
+    # Doadores, intenções e estatísticas na mesma transação (Doador.cadastrar_em_lote)
+    resultados = Doador.cadastrar_em_lote([dados for _, dados in lista], validar=False)
+    return [{'id': doador.pk, 'cpf': doador.cpf} for doador, _, _ in resultados], {}
+
+
+def _editar_lote(corpo):
+    """Edita os doadores do lote (cada item com o 'id' e os campos alterados). Retorna (resultados, erros por posição)."""
+    itens = _itens_do_lote(corpo, 'doadores')
+    alteracoes, posicoes, erros = {}, {}, {}
+    for indice, item in enumerate(itens):
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            erros[indice] = {'id': ['Cada item deve ser um objeto JSON com o "id" (inteiro) do doador.']}
+            continue
+        if item['id'] in alteracoes:
+            erros[indice] = {'id': ['Doador repetido no lote.']}
+            continue
+        dados, erros_item = _converter_doador({k: v for k, v in item.items() if k != 'id'}, novo=False)
+        if erros_item:
+            erros[indice] = erros_item
+        alteracoes[item['id']] = dados
+        posicoes[item['id']] = indice
+    if erros:
+        return None, erros
+
+    with transaction.atomic():
+        resultados = Doador.editar_em_lote(alteracoes)
+        erros = {posicoes[doador_id]: erro for doador_id, (_, erro) in resultados.items() if erro}
+        if erros:
+            transaction.set_rollback(True)
+            return None, erros
+    return [{'id': doador_id} for doador_id in alteracoes], {}
+
+
+def _remover_lote(corpo):
+    """
+    Remove os doadores do lote (lista "ids"). Retorna (resultados, erros por posição);
+    com ids inválidos ou inexistentes, nada é removido e resultados é None. Lança
+    LoteEmConflito, sem remover nenhum, se algum doador tiver doações registradas.
+    """
+    ids = _itens_do_lote(corpo, 'ids')
+    erros = {indice: {'id': ['Id inválido.']} for indice, doador_id in enumerate(ids) if not isinstance(doador_id, int)}
+    if erros:
+        return None, erros
+    existentes = set(Doador.objects.filter(pk__in=ids).values_list('id', flat=True))
+    erros = {indice: {'id': ['Doador não encontrado.']} for indice, doador_id in enumerate(ids) if doador_id not in existentes}
+    if erros:
+        return None, erros
+
+    protegidos = Doador.remover_em_lote(ids)
+    if protegidos:
+        raise LoteEmConflito('Nada foi removido: há doadores com doações registradas.', {
+            indice: {'id': ['Doador com doações registradas não pode ser removido.']}
+            for indice, doador_id in enumerate(ids) if doador_id in protegidos
+        })
+    return [{'id': doador_id} for doador_id in dict.fromkeys(ids)], {}
+
+
+OPERACOES_LOTE = {'POST': (_cadastrar_lote, 201), 'PATCH': (_editar_lote, 200), 'DELETE': (_remover_lote, 200)}
+
+
+@csrf_exempt  # Autenticada pelo token, não pela sessão
+@require_http_methods(list(OPERACOES_LOTE))
+def doadores_em_lote_json(request):
+    """Cadastro (POST), edição (PATCH) e remoção (DELETE) de doadores em lote, tudo ou nada."""
+    if not _autorizada(request):
+        resposta = _erro('Token de acesso ausente ou inválido.', status=401)
+        resposta['WWW-Authenticate'] = 'Bearer'
+        return resposta
+    try:
+        corpo = json.loads(request.body)
+    except ValueError:
+        return _erro('O corpo da requisição não é um JSON válido.')
+
+    operacao, status = OPERACOES_LOTE[request.method]
+    try:
+        resultados, erros = operacao(corpo)
+    except ValueError as e:
+        return _erro(str(e))
+    except LoteEmConflito as e:
+        return _erro(str(e), status=409, erros=_erros_por_item(e.erros))
+    if resultados is None:
+        return _erro('Nada foi gravado: corrija os itens com erro.', erros=_erros_por_item(erros))
+    return JsonResponse({'resultados': resultados}, status=status)
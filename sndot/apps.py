@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SndotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sndot'
+
+    def ready(self):
+        # Conecta os sinais que mantêm o motor de compatibilidade atualizado
+        from . import signals  # noqa: F401
@@ -0,0 +1,411 @@
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .cache import invalidar
+from .forms import CadastrarDoadorForm, ESTADO_CIVIL_CHOICES, PROFISSAO_CHOICES
+from .localidades import MUNICIPIOS
+from .metricas import percentil
+from .models import Doador, TIPO_SANGUINEO_CHOICES, validar_cpf, validar_cpfs
+from .paginacao import PaginadorKeyset, codificar_cursor
+from .validador import (
+    VALIDADOR_SEGURANCA, ValidadorNome, ValidadorScriptInjection, ValidadorSQLInjection, ValidadorXSS,
+)
+
+# --- geração de dados sintéticos ---
+
+NOMES = [
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João',
+    'Larissa', 'Marcos', 'Natália', 'Otávio', 'Patrícia', 'Rafael', 'Sofia', 'Thiago', 'Vitória', 'Yuri',
+]
+SOBRENOMES = [
+    'Almeida', 'Barbosa', 'Cardoso', 'Dias', 'Esteves', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Nunes',
+    'Oliveira', 'Pereira', 'Ribeiro', 'Santos', 'Teixeira', 'Vieira',
+]
+SEXOS = ['M', 'F']
+TIPOS_SANGUINEOS = [valor for valor, _ in TIPO_SANGUINEO_CHOICES]
+PROFISSOES = [valor for valor, _ in PROFISSAO_CHOICES if valor and valor != 'Outra']
+ESTADOS_CIVIS = [valor for valor, _ in ESTADO_CIVIL_CHOICES if valor]
+
+
+def gerar_cpf(numero):
+    """CPF válido (só dígitos) cuja base de 9 dígitos é `numero`: CPFs diferentes para números diferentes."""
+    base = [int(c) for c in f'{numero % 10**9:09d}']
+    for tamanho in (9, 10):
+        resto = sum(d * (tamanho + 1 - i) for i, d in enumerate(base)) % 11
+        base.append(0 if resto < 2 else 11 - resto)
+    return ''.join(map(str, base))
+
+
+def gerar_registros(quantidade, orgao_ids=(), inicio=0, semente=0):
+    """
+    Gera `quantidade` registros no formato do JSON de importação ({"dados", "intencao"}),
+    todos válidos e determinísticos para a mesma semente. Os CPFs são gerados a partir
+    de inicio, inicio + 1, ...: use inícios diferentes para lotes de doadores novos.
+    """
+    rng = random.Random(semente)
+    estados = MUNICIPIOS.estados()
+    cidades = {uf: MUNICIPIOS.cidades(uf) for uf in estados}
+    nascimento_minimo = date(1940, 1, 1)
+    orgao_ids = list(orgao_ids)
+
+    for numero in range(inicio, inicio + quantidade):
+        uf_natal, uf_residencia = rng.choice(estados), rng.choice(estados)
+        nascimento = nascimento_minimo + timedelta(days=rng.randrange(23000))
+        doar = rng.random() < 0.5
+        yield {
+            "dados": {
+                "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+                "cpf": gerar_cpf(numero),
+                "sexo": rng.choice(SEXOS),
+                "data_nascimento": nascimento.strftime('%d/%m/%Y'),
+                "cidade_natal": rng.choice(cidades[uf_natal]),
+                "estado_natal": uf_natal,
+                "profissao": rng.choice(PROFISSOES),
+                "cidade_residencia": rng.choice(cidades[uf_residencia]),
+                "estado_residencia": uf_residencia,
+                "estado_civil": rng.choice(ESTADOS_CIVIS),
+                "contato_emergencia": f"{rng.randint(11, 99)} 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                "tipo_sanguineo": rng.choice(TIPOS_SANGUINEOS),
+            },
+            "intencao": {
+                "status": "s" if doar else "n",
+                "orgaos_id": rng.sample(orgao_ids, min(len(orgao_ids), rng.randint(0, 3))) if doar else [],
+            },
+        }
+
+
+def dados_formulario(registro):
+    """Dados de POST do CadastrarDoadorForm para um registro gerado por gerar_registros."""
+    dados = dict(registro['dados'])
+    dia, mes, ano = dados['data_nascimento'].split('/')
+    dados['data_nascimento'] = f'{ano}-{mes}-{dia}'
+    dados['cpf'] = f"{dados['cpf'][:3]}.{dados['cpf'][3:6]}.{dados['cpf'][6:9]}-{dados['cpf'][9:]}"
+    if registro['intencao']['status'] == 's':
+        dados['doar_agora'] = 'on'
+        dados['orgaos_desejados'] = [str(i) for i in registro['intencao']['orgaos_id']]
+    return dados
+
+
+# --- medição ---
+
+def medir(funcao, repeticoes=20, aquecimento=1, preparar=None):
+    """
+    Executa funcao() `aquecimento` + `repeticoes` vezes e resume os tempos das
+    repetições em milissegundos (min, p50, p95, média). preparar(), se informada,
+    roda antes de cada execução, fora da medição (ex.: invalidar o cache).
+    O número de consultas SQL é contado em uma execução extra, também fora da medição.
+    """
+    for _ in range(aquecimento):
+        if preparar:
+            preparar()
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    if preparar:
+        preparar()
+    with CaptureQueriesContext(connection) as consultas:
+        funcao()
+
+    tempos.sort()
+    return {
+        'repeticoes': repeticoes,
+        'min_ms': round(tempos[0], 4),
+        'p50_ms': round(percentil(tempos, 50), 4),
+        'p95_ms': round(percentil(tempos, 95), 4),
+        'media_ms': round(sum(tempos) / len(tempos), 4),
+        'consultas': len(consultas),
+    }
+
+
+# --- cenários ---
+
+def cenario_importacao(quantidade, orgao_ids, inicio, batch_size=1000, workers=1):
+    """Importação de `quantidade` doadores novos pelo import_doadores --bulk, em streaming."""
+    registros = gerar_registros(quantidade, orgao_ids, inicio=inicio, semente=inicio)
+    contagens = Counter()
+    saida = io.StringIO()
+    inicio_medicao = time.perf_counter()
+    with contextlib.redirect_stdout(saida):  # O comando também escreve mensagens de depuração com print()
+        call_command(
+            'import_doadores', 'benchmark', bulk=True, batch_size=batch_size, workers=workers,
+            registros=registros, stdout=saida, progresso=contagens.update,
+        )
+    duracao = (time.perf_counter() - inicio_medicao) * 1000
+    if contagens['registros_com_erro']:
+        raise AssertionError(f"{contagens['registros_com_erro']} registros gerados foram rejeitados pela importação.")
+    return {
+        'repeticoes': 1,
+        'min_ms': round(duracao, 4),
+        'p50_ms': round(duracao, 4),
+        'p95_ms': round(duracao, 4),
+        'media_ms': round(duracao, 4),
+        'registros': quantidade,
+        'registros_por_segundo': round(quantidade / (duracao / 1000)) if duracao else 0,
+    }
+
+
+def cenarios_validacao(quantidade, repeticoes):
+    """validar_cpf (um a um e em lote) e a cadeia de validadores, sobre `quantidade` valores por repetição."""
+    rng = random.Random(1)
+    cpfs = [gerar_cpf(n) if n % 10 else f'{rng.randrange(10**11):011d}' for n in range(quantidade)]  # ~10% inválidos
+    textos = [registro['dados']['nome'] for registro in gerar_registros(quantidade)]
+    textos[::50] = ['<script>alert(1)</script>'] * len(textos[::50])
+    cadeia = ValidadorXSS(ValidadorScriptInjection(ValidadorSQLInjection()))
+    nome = ValidadorNome()
+
+    def um_a_um(validador, valores, *args):
+        def executar():
+            for valor in valores:
+                try:
+                    validador(valor, *args)
+                except ValidationError:
+                    pass
+        return executar
+
+    resultados = {
+        'validar_cpf': medir(um_a_um(validar_cpf, cpfs), repeticoes),
+        'validar_cpfs_lote': medir(lambda: validar_cpfs(cpfs), repeticoes),
+        'validador_seguranca': medir(um_a_um(VALIDADOR_SEGURANCA.validar, textos, 'nome'), repeticoes),
+        'validador_cadeia': medir(um_a_um(cadeia.validar, textos, 'nome'), repeticoes),
+        'validador_nome': medir(um_a_um(nome.validar, textos, 'nome'), repeticoes),
+    }
+    for resultado in resultados.values():
+        resultado['valores_por_repeticao'] = quantidade
+    return resultados
+
+
+def cenarios_formulario(orgao_ids, repeticoes):
+    """Renderização do formulário de cadastro vazio e validação de um POST válido."""
+    registro = next(gerar_registros(1, orgao_ids, inicio=10**9 - 1, semente=7))
+    registro['intencao'] = {'status': 's', 'orgaos_id': list(orgao_ids)[:2]}
+    dados = dados_formulario(registro)
+
+    def validar():
+        formulario = CadastrarDoadorForm(dados)
+        if not formulario.is_valid():
+            raise AssertionError(f'Dados do benchmark inválidos: {formulario.errors.as_json()}')
+
+    return {
+        'formulario_render': medir(lambda: str(CadastrarDoadorForm()), repeticoes),
+        'formulario_validacao': medir(validar, repeticoes),
+    }
+
+
+def cenarios_listagem(cliente, repeticoes):
+    """listar_doadores (primeira página, meio da tabela e última página, sem cache) e o changelist do admin."""
+    url = reverse('listar_doadores')
+    total = Doador.objects.count()
+    meio = Doador.objects.order_by('nome', 'id').values('nome', 'id')[total // 2]
+    cursor_meio = codificar_cursor({'d': 'proxima', 'v': meio['nome'], 'id': meio['id']})
+
+    def get(caminho, **parametros):
+        def executar():
+            resposta = cliente.get(caminho, parametros)
+            if resposta.status_code != 200:
+                raise AssertionError(f'{caminho} retornou {resposta.status_code}')
+        return executar
+
+    def sem_cache():
+        invalidar('doadores')
+
+    changelist = reverse('admin:sndot_doador_changelist')
+    por_pagina = admin.site.get_model_admin(Doador).list_per_page
+    return {
+        'listar_doadores_primeira': medir(get(url), repeticoes, preparar=sem_cache),
+        'listar_doadores_meio': medir(get(url, cursor=cursor_meio), repeticoes, preparar=sem_cache),
+        'listar_doadores_ultima': medir(get(url, cursor=PaginadorKeyset.CURSOR_ULTIMA), repeticoes, preparar=sem_cache),
+        'listar_doadores_cache': medir(get(url, cursor=cursor_meio), repeticoes),
+        'admin_changelist': medir(get(changelist), repeticoes),
+        'admin_changelist_ultima': medir(get(changelist, p=max(1, -(-total // por_pagina))), repeticoes),
+    }
+
+
+# --- concorrência: WSGI x ASGI ---
+
+def requisicoes_concorrencia(quantidade, doador_ids, semente=0):
+    """
+    Mistura de GETs das views de doadores, como (caminho, query string):
+    detalhe JSON de um doador, busca JSON por nome e listagem HTML filtrada.
+    """
+    rng = random.Random(semente)
+    lista, lista_json = reverse('listar_doadores'), reverse('listar_doadores_json')
+    requisicoes = []
+    for _ in range(quantidade):
+        sorteio = rng.random()
+        if sorteio < 0.4:
+            requisicoes.append((reverse('detalhar_doador_json', args=[rng.choice(doador_ids)]), ''))
+        elif sorteio < 0.7:
+            requisicoes.append((lista_json, f'nome={rng.choice(SOBRENOMES)[:3]}'))
+        else:
+            requisicoes.append((lista, f'tipo_sanguineo={rng.choice(TIPOS_SANGUINEOS)}&estado={rng.choice(MUNICIPIOS.estados())}'))
+    return requisicoes
+
+
+def requisicao_wsgi(aplicacao, caminho, query):
+    """Executa um GET na aplicação WSGI, como um servidor WSGI faria, e retorna o status."""
+    status = []
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    resposta = aplicacao(environ, lambda linha, cabecalhos, exc_info=None: status.append(int(linha.split()[0])))
+    try:
+        b''.join(resposta)
+    finally:
+        resposta.close()  # Dispara request_finished (fecha as conexões), como o servidor
+    return status[0]
+
+
+async def requisicao_asgi(aplicacao, caminho, query):
+    """Executa um GET na aplicação ASGI, como um servidor ASGI faria, e retorna o status."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': caminho, 'raw_path': caminho.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    corpo_enviado = False
+    concluida = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal corpo_enviado
+        if not corpo_enviado:
+            corpo_enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await concluida.wait()  # O Django espera por uma desconexão enquanto processa a requisição
+        return {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            status.append(mensagem['status'])
+        elif not mensagem.get('more_body'):
+            concluida.set()
+
+    await aplicacao(scope, receive, send)
+    return status[0]
+
+
+def resumir_concorrencia(tempos, erros, duracao):
+    """Vazão e latências (ms) de uma rodada de requisições concorrentes."""
+    tempos = sorted(tempos)
+    return {
+        'requisicoes': len(tempos),
+        'erros': erros,
+        'duracao_s': round(duracao, 3),
+        'requisicoes_por_segundo': round(len(tempos) / duracao, 1) if duracao else 0,
+        'p50_ms': round(percentil(tempos, 50), 2),
+        'p95_ms': round(percentil(tempos, 95), 2),
+        'p99_ms': round(percentil(tempos, 99), 2),
+    }
+
+
+def cenario_wsgi(requisicoes, concorrencia):
+    """As requisições pelo WSGIHandler, com `concorrencia` threads (como um servidor WSGI com threads)."""
+    aplicacao = WSGIHandler()
+
+    def executar(requisicao):
+        inicio = time.perf_counter()
+        status = requisicao_wsgi(aplicacao, *requisicao)
+        return (time.perf_counter() - inicio) * 1000, status
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(executar, requisicoes))
+    duracao = time.perf_counter() - inicio
+    return resumir_concorrencia([tempo for tempo, _ in resultados], sum(status != 200 for _, status in resultados), duracao)
+
+
+def cenario_asgi(requisicoes, concorrencia):
+    """As requisições pelo ASGIHandler, com até `concorrencia` em andamento no mesmo event loop."""
+    aplicacao = ASGIHandler()
+
+    async def executar_todas():
+        limite = asyncio.Semaphore(concorrencia)
+
+        async def executar(requisicao):
+            async with limite:
+                inicio = time.perf_counter()
+                status = await requisicao_asgi(aplicacao, *requisicao)
+                return (time.perf_counter() - inicio) * 1000, status
+
+        return await asyncio.gather(*(executar(requisicao) for requisicao in requisicoes))
+
+    inicio = time.perf_counter()
+    resultados = asyncio.run(executar_todas())
+    duracao = time.perf_counter() - inicio
+    return resumir_concorrencia([tempo for tempo, _ in resultados], sum(status != 200 for _, status in resultados), duracao)
+
+
+def executar_cenarios(tamanhos, repeticoes=20, valores_validacao=10000, batch_size=1000, workers=1, log=None):
+    """
+    Executa todos os cenários no banco atual (que deve ser um banco descartável:
+    o comando benchmark cria um banco de teste) e retorna {nome: resultado}.
+    As importações são cumulativas: os cenários de listagem rodam sobre o total importado.
+    """
+    from django.contrib.auth.models import User
+    from .orgaos import REGISTRO_ORGAOS
+
+    log = log or (lambda mensagem: None)
+    call_command('populate_orgaos', stdout=io.StringIO())
+    REGISTRO_ORGAOS.invalidar()
+    orgao_ids = [orgao.pk for orgao in REGISTRO_ORGAOS.todos()]
+
+    resultados = {}
+    inicio = 0
+    for quantidade in tamanhos:
+        log(f'importacao_{quantidade}...')
+        resultados[f'importacao_{quantidade}'] = cenario_importacao(quantidade, orgao_ids, inicio, batch_size, workers)
+        inicio += quantidade
+
+    log('validacao...')
+    resultados.update(cenarios_validacao(valores_validacao, repeticoes))
+    log('formulario...')
+    resultados.update(cenarios_formulario(orgao_ids, repeticoes))
+
+    if Doador.objects.exists():
+        log('listagem...')
+        cliente = Client()
+        cliente.force_login(User.objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark'))
+        resultados.update(cenarios_listagem(cliente, repeticoes))
+    return resultados
+
+
+def comparar_resultados(atuais, base, tolerancia):
+    """
+    Compara o p50 de cada cenário presente nos dois resultados.
+    Retorna uma lista de (cenario, p50_base, p50_atual, variacao) dos cenários
+    que ficaram mais lentos do que p50_base * (1 + tolerancia).
+    """
+    regressoes = []
+    for nome, atual in atuais.items():
+        anterior = base.get(nome)
+        if not anterior or not anterior.get('p50_ms'):
+            continue
+        variacao = atual['p50_ms'] / anterior['p50_ms'] - 1
+        if variacao > tolerancia:
+            regressoes.append((nome, anterior['p50_ms'], atual['p50_ms'], variacao))
+    return regressoes
@@ -0,0 +1,92 @@
+import re
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Doador
+from .texto import normalizar_texto
+
+# Maior caractere usado como limite superior das buscas por prefixo:
+# "prefixo <= valor < prefixo + LIMITE_PREFIXO" usa o índice B-tree da coluna
+LIMITE_PREFIXO = '\U0010ffff'
+
+
+def _filtro_prefixo(campo, prefixo):
+    return {f'{campo}__gte': prefixo, f'{campo}__lt': prefixo + LIMITE_PREFIXO}
+
+
+def _formatar_prefixo_cpf(digitos):
+    """Aplica a máscara 000.000.000-00 a um prefixo de dígitos. Ex.: '12345' -> '123.45'."""
+    partes = [digitos[:3], digitos[3:6], digitos[6:9]]
+    formatado = '.'.join(parte for parte in partes if parte)
+    if len(digitos) > 9:
+        formatado += '-' + digitos[9:11]
+    return formatado
+
+
+def _usa_fts(queryset):
+    """O índice FTS5 (criado na migração 0006) só existe no SQLite."""
+    return connections[queryset.db].vendor == 'sqlite'
+
+
+def _consulta_fts(nome):
+    """
+    Monta a expressão MATCH do FTS5: cada palavra digitada vira uma busca por prefixo,
+    e todas precisam estar no nome. Ex.: 'mar sil' -> '"mar"* AND "sil"*'.
+    """
+    palavras = re.findall(r'\w+', normalizar_texto(nome))
+    return ' AND '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar_doadores(queryset=None, nome='', cpf='', tipo_sanguineo='', estado='', cidade=''):
+    """
+    Filtra doadores pelos critérios informados (os vazios são ignorados).
+
+    - nome: no SQLite, prefixo de qualquer palavra do nome via FTS5 ('sil' encontra
+      'Maria da Silva'); nos demais bancos, prefixo do nome normalizado. Em ambos
+      os casos sem diferenciar acentos e maiúsculas.
+    - cpf: prefixo do CPF, com ou sem máscara.
+    - tipo_sanguineo, estado (de residência): igualdade.
+    - cidade (de residência): igualdade.
+
+    Todas as condições usam os índices de Doador (ver Meta.indexes) ou o FTS5,
+    nunca um LIKE '%...%' sobre a tabela inteira.
+    """
+    if queryset is None:
+        queryset = Doador.objects.all()
+
+    if nome:
+        if _usa_fts(queryset):
+            consulta = _consulta_fts(nome)
+            if consulta:
+                queryset = queryset.filter(id__in=RawSQL(
+                    'SELECT rowid FROM sndot_doador_fts WHERE sndot_doador_fts MATCH %s', [consulta]
+                ))
+        else:
+            queryset = queryset.filter(**_filtro_prefixo('nome_normalizado', normalizar_texto(nome)))
+
+    if cpf:
+        digitos = ''.join(filter(str.isdigit, cpf))
+        if digitos:
+            # O CPF pode estar gravado só com dígitos (importação) ou com máscara (formulário)
+            queryset = queryset.filter(
+                Q(**_filtro_prefixo('cpf', digitos)) | Q(**_filtro_prefixo('cpf', _formatar_prefixo_cpf(digitos)))
+            )
+
+    if tipo_sanguineo:
+        queryset = queryset.filter(tipo_sanguineo=tipo_sanguineo)
+    if estado:
+        queryset = queryset.filter(estado_residencia=estado.upper())
+    if cidade:
+        queryset = queryset.filter(cidade_residencia=cidade)
+
+    return queryset
+
+
+# Parâmetros de busca aceitos na URL das listagens de doadores (HTML e API)
+PARAMETROS_BUSCA = ('nome', 'cpf', 'tipo_sanguineo', 'estado', 'cidade')
+
+
+def filtros_da_consulta(parametros):
+    """Filtros de buscar_doadores presentes nos parâmetros da URL (ex.: request.GET); os vazios são ignorados."""
+    filtros = {campo: parametros.get(campo, '').strip() for campo in PARAMETROS_BUSCA}
+    return {campo: valor for campo, valor in filtros.items() if valor}
@@ -0,0 +1,93 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .replicas import fixar_no_principal
+
+TTL_PADRAO = 300
+
+
+def ttl(grupo):
+    """Tempo de vida das entradas do grupo (settings.SNDOT_CACHE_TTL)."""
+    return getattr(settings, 'SNDOT_CACHE_TTL', {}).get(grupo, TTL_PADRAO)
+
+
+def _chave_versao(grupo):
+    return f'sndot:versao:{grupo}'
+
+
+def versao(grupo):
+    """
+    Versão atual do grupo, que faz parte da chave de todas as suas entradas.
+    Se a versão tiver sido descartada pelo cache (LRU), uma nova é criada: as
+    entradas antigas deixam de ser encontradas, nunca são servidas desatualizadas.
+    """
+    chave = _chave_versao(grupo)
+    atual = cache.get(chave)
+    if atual is None:
+        cache.add(chave, time.time_ns(), timeout=None)
+        atual = cache.get(chave)
+    return atual
+
+
+async def aversao(grupo):
+    """Versão assíncrona de versao(), para views async."""
+    chave = _chave_versao(grupo)
+    atual = await cache.aget(chave)
+    if atual is None:
+        await cache.aadd(chave, time.time_ns(), timeout=None)
+        atual = await cache.aget(chave)
+    return atual
+
+
+def invalidar(*grupos):
+    """
+    Troca a versão dos grupos: todas as entradas anteriores ficam inacessíveis de uma vez.
+    A versão é gravada no próprio backend: a invalidação só alcança os outros processos
+    com um backend compartilhado ('arquivo' ou 'redis', ver settings SNDOT_CACHE_BACKEND).
+    """
+    cache.set_many({_chave_versao(grupo): time.time_ns() for grupo in grupos}, timeout=None)
+
+
+def chave(grupo, *partes):
+    """Chave versionada de uma entrada do grupo, variando pelas partes (ex.: parâmetros da URL)."""
+    return f'sndot:{grupo}:{versao(grupo)}:{_resumo(partes)}'
+
+
+def _resumo(partes):
+    return hashlib.md5(repr(partes).encode('utf-8')).hexdigest()
+
+
+def fixar_se_recente(versao_grupo):
+    """
+    A versão é o horário (ns) da invalidação: se ela tem menos de
+    SNDOT_REPLICA_FIXAR_SEGUNDOS, a gravação que a criou (em qualquer processo) pode
+    ainda não ter chegado às réplicas, e as leituras da requisição vão para o
+    principal, para que a entrada guardada com esta versão não seja anterior à gravação.
+    """
+    fixar_segundos = getattr(settings, 'SNDOT_REPLICA_FIXAR_SEGUNDOS', 5)
+    if time.time_ns() - versao_grupo < fixar_segundos * 1_000_000_000:
+        fixar_no_principal()
+
+
+def obter_ou_calcular(grupo, partes, calcular):
+    """Retorna a entrada do cache ou chama calcular() e a guarda pelo TTL do grupo."""
+    versao_grupo = versao(grupo)
+
+    def calcular_entrada():
+        fixar_se_recente(versao_grupo)
+        return calcular()
+
+    return cache.get_or_set(f'sndot:{grupo}:{versao_grupo}:{_resumo(partes)}', calcular_entrada, ttl(grupo))
+
+
+async def aobter_ou_calcular(grupo, partes, calcular):
+    """Versão assíncrona de obter_ou_calcular(): calcular é uma função async."""
+    versao_grupo = await aversao(grupo)
+    chave_entrada = f'sndot:{grupo}:{versao_grupo}:{_resumo(partes)}'
+    valor = await cache.aget(chave_entrada)
+    if valor is None:
+        fixar_se_recente(versao_grupo)
+        valor = await calcular()
+        await cache.aset(chave_entrada, valor, ttl(grupo))
+    return valor
@@ -0,0 +1,187 @@
+import heapq
+import threading
+import time
+from collections import namedtuple
+from django.db.models import Exists, OuterRef
+from .models import Doacao, Doador, IntencaoDeDoar
+
+# Tipos sanguíneos de doador compatíveis com cada tipo de receptor (sistema ABO e fator Rh)
+DOADORES_COMPATIVEIS = {
+    'O-': ('O-',),
+    'O+': ('O-', 'O+'),
+    'A-': ('O-', 'A-'),
+    'A+': ('O-', 'O+', 'A-', 'A+'),
+    'B-': ('O-', 'B-'),
+    'B+': ('O-', 'O+', 'B-', 'B+'),
+    'AB-': ('O-', 'A-', 'B-', 'AB-'),
+    'AB+': ('O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'),
+}
+
+DoadorCompativel = namedtuple(
+    'DoadorCompativel',
+    ['doador_id', 'nome', 'cpf', 'tipo_sanguineo', 'estado', 'cidade', 'doar_agora', 'data_intencao', 'orgaos'],
+)
+
+
+class MotorCompatibilidade:
+    """
+    Índices em memória dos doadores com intenção de doar ativa, para encontrar
+    doadores compatíveis com um receptor sem percorrer a tabela de doadores:
+
+    - tipo sanguíneo -> ids dos doadores
+    - órgão (id) -> ids dos doadores que desejam doá-lo e ainda não o doaram
+    - estado de residência -> ids dos doadores
+
+    Os índices são montados na primeira busca e atualizados incrementalmente pelos
+    sinais de Doador, IntencaoDeDoar, Doacao e dos órgãos (ver signals.py) e pelas
+    gravações em lote, que não disparam sinais (Doador.cadastrar_em_lote e
+    editar_em_lote). Gravações feitas por outro processo (ex.: importação pelo worker)
+    não chegam a este: por isso o índice é remontado por inteiro depois de `ttl` segundos.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._carregado_em = None
+        self._doadores = {}
+        self._por_tipo = {}
+        self._por_orgao = {}
+        self._por_estado = {}
+
+    # --- montagem e manutenção dos índices ---
+
+    def _indexar(self, doador):
+        self._doadores[doador.doador_id] = doador
+        self._por_tipo.setdefault(doador.tipo_sanguineo, set()).add(doador.doador_id)
+        self._por_estado.setdefault(doador.estado, set()).add(doador.doador_id)
+        for orgao_id in doador.orgaos:
+            self._por_orgao.setdefault(orgao_id, set()).add(doador.doador_id)
+
+    def _desindexar(self, doador_id):
+        doador = self._doadores.pop(doador_id, None)
+        if doador is None:
+            return
+        self._por_tipo.get(doador.tipo_sanguineo, set()).discard(doador_id)
+        self._por_estado.get(doador.estado, set()).discard(doador_id)
+        for orgao_id in doador.orgaos:
+            self._por_orgao.get(orgao_id, set()).discard(doador_id)
+
+    @staticmethod
+    def _consultar(doador_ids=None):
+        """
+        Lê do banco os doadores com intenção ativa (todos, ou apenas os de doador_ids),
+        com os órgãos da intenção que ainda não foram doados (Doacao).
+        O status é comparado sem diferenciar maiúsculas: as views gravam 'ativa'.
+        """
+        intencoes = IntencaoDeDoar.objects.filter(status__iexact='ativa')
+        doado = Doacao.objects.filter(doador_id=OuterRef('intencaodedoar__doador_id'), orgao_id=OuterRef('orgao_id'))
+        through = IntencaoDeDoar.orgaos.through.objects.filter(intencaodedoar__status__iexact='ativa').filter(~Exists(doado))
+        if doador_ids is not None:
+            intencoes = intencoes.filter(doador_id__in=doador_ids)
+            through = through.filter(intencaodedoar__doador_id__in=doador_ids)
+
+        orgaos = {}
+        for doador_id, orgao_id in through.values_list('intencaodedoar__doador_id', 'orgao_id'):
+            orgaos.setdefault(doador_id, set()).add(orgao_id)
+
+        return [
+            DoadorCompativel(doador_id, nome, cpf, tipo, estado, cidade, doar_agora, data_intencao,
+                             frozenset(orgaos.get(doador_id, ())))
+            for doador_id, nome, cpf, tipo, estado, cidade, doar_agora, data_intencao in intencoes.values_list(
+                'doador_id', 'doador__nome', 'doador__cpf', 'doador__tipo_sanguineo', 'doador__estado_residencia',
+                'doador__cidade_residencia', 'doar_agora', 'data_intencao',
+            )
+        ]
+
+    def carregar(self):
+        """(Re)monta todos os índices a partir do banco (duas consultas)."""
+        doadores = self._consultar()
+        with self._lock:
+            self._doadores, self._por_tipo, self._por_orgao, self._por_estado = {}, {}, {}, {}
+            for doador in doadores:
+                self._indexar(doador)
+            self._carregado_em = time.monotonic()
+
+    def invalidar(self):
+        """Descarta os índices; a próxima busca os remonta."""
+        with self._lock:
+            self._carregado_em = None
+
+    @property
+    def carregado(self):
+        return self._carregado_em is not None and time.monotonic() - self._carregado_em < self.ttl
+
+    def atualizar_doador(self, doador_id):
+        """Reindexa um doador (ou o remove, se ele não existe mais ou não tem intenção ativa)."""
+        self.atualizar_doadores([doador_id])
+
+    def atualizar_doadores(self, doador_ids):
+        """Reindexa vários doadores com as mesmas duas consultas (ex.: depois de uma gravação em lote)."""
+        doador_ids = list(doador_ids)
+        if not self.carregado or not doador_ids:
+            return  # Serão lidos na próxima montagem completa
+        doadores = self._consultar(doador_ids)
+        with self._lock:
+            for doador_id in doador_ids:
+                self._desindexar(doador_id)
+            for doador in doadores:
+                self._indexar(doador)
+
+    def remover_doador(self, doador_id):
+        with self._lock:
+            self._desindexar(doador_id)
+
+    # --- busca ---
+
+    def buscar(self, tipo_sanguineo, orgao=None, estado=None, somente_estado=False, limite=20):
+        """
+        Doadores compatíveis com um receptor do tipo sanguíneo informado, que desejam
+        doar `orgao` (id ou Orgao, opcional), ordenados por:
+        mesmo estado do receptor, tipo sanguíneo idêntico, intenção de doar agora,
+        intenção mais antiga e nome. Com somente_estado=True, apenas doadores do estado.
+        """
+        tipos = DOADORES_COMPATIVEIS.get(tipo_sanguineo)
+        if not tipos:
+            return []
+        if not self.carregado:
+            self.carregar()
+
+        orgao_id = getattr(orgao, 'pk', orgao)
+        estado = estado.upper() if estado else None
+        with self._lock:
+            # Começa pelo menor conjunto e intersecta com os demais
+            filtros = []
+            if orgao_id is not None:
+                filtros.append(self._por_orgao.get(orgao_id, set()))
+            if somente_estado and estado:
+                filtros.append(self._por_estado.get(estado, set()))
+            filtros.sort(key=len)
+
+            candidatos = set()
+            for tipo in tipos:
+                por_tipo = self._por_tipo.get(tipo, set())
+                candidatos.update(por_tipo.intersection(*filtros) if filtros else por_tipo)
+
+            doadores = [self._doadores[doador_id] for doador_id in candidatos]
+
+        return heapq.nsmallest(limite, doadores, key=lambda d: (
+            d.estado != estado,
+            d.tipo_sanguineo != tipo_sanguineo,
+            not d.doar_agora,
+            d.data_intencao,
+            d.nome,
+        ))
+
+    def para_receptor(self, receptor, limite=20):
+        """Doadores compatíveis com o receptor: do seu tipo sanguíneo, com o órgão da fila, priorizando o seu estado."""
+        return self.buscar(receptor.tipo_sanguineo, receptor.orgao_id, receptor.estado_residencia, limite=limite)
+
+    def doadores(self, *args, **kwargs):
+        """Mesma busca de buscar(), mas retorna os objetos Doador na ordem do ranking."""
+        compativeis = self.buscar(*args, **kwargs)
+        por_id = Doador.objects.in_bulk([d.doador_id for d in compativeis])
+        return [por_id[d.doador_id] for d in compativeis if d.doador_id in por_id]
+
+
+# Motor compartilhado pelo processo, mantido atualizado pelos sinais de signals.py
+MOTOR_COMPATIBILIDADE = MotorCompatibilidade()
@@ -0,0 +1,63 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .compatibilidade import DOADORES_COMPATIVEIS
+from .fila import retirar_proximo
+from .models import Doacao, IntencaoDeDoar, Receptor, ResumoMensalDoacoes
+
+
+def registrar_doacao(doador, orgao, receptor=None, data=None):
+    """
+    Registra a doação de `orgao` do `doador` para o `receptor` (ou, se nenhum for
+    informado, para o próximo receptor compatível da fila de espera do órgão).
+
+    Tudo acontece em uma única transação curta: a intenção de doar e o receptor são
+    bloqueados (SELECT ... FOR UPDATE, onde houver suporte), as compatibilidades são
+    conferidas, a doação é incluída e o receptor, a intenção e o resumo mensal são
+    atualizados. Assim, duas doações simultâneas não destinam o mesmo órgão de uma
+    intenção nem o mesmo receptor; a restrição única (doador, orgao) garante o mesmo no banco.
+
+    Retorna uma tupla (doacao, erros); erros é um dicionário campo -> mensagens, como
+    o message_dict de Doador.cadastrar, ou None se a doação foi registrada.
+    """
+    try:
+        with transaction.atomic():
+            intencao = IntencaoDeDoar.objects.select_for_update().filter(doador=doador).first()
+            if intencao is None or intencao.status.lower() != 'ativa':
+                raise ValidationError({'doador': 'O doador não tem intenção de doar ativa.'})
+            orgaos_intencao = set(intencao.orgaos.values_list('id', flat=True))
+            if orgao.pk not in orgaos_intencao:
+                raise ValidationError({'orgao': f'O doador não tem intenção de doar {orgao}.'})
+            if Doacao.objects.filter(doador=doador, orgao=orgao).exists():
+                raise ValidationError({'orgao': f'{orgao} deste doador já foi destinado(a) a outro receptor.'})
+
+            if receptor is None:
+                # O próximo receptor compatível já sai da fila como 'Transplantado'
+                receptor = retirar_proximo(orgao, doador.tipo_sanguineo)
+                if receptor is None:
+                    raise ValidationError({'receptor': f'Nenhum receptor compatível aguardando {orgao}.'})
+            else:
+                receptor = Receptor.objects.select_for_update().get(pk=receptor.pk)
+                if receptor.status != 'Aguardando':
+                    raise ValidationError({'receptor': 'O receptor não está aguardando na fila.'})
+                if receptor.orgao_id != orgao.pk:
+                    raise ValidationError({'receptor': f'O receptor não está na fila de {orgao}.'})
+                if doador.tipo_sanguineo not in DOADORES_COMPATIVEIS.get(receptor.tipo_sanguineo, ()):
+                    raise ValidationError({'receptor': (
+                        f'Tipo sanguíneo incompatível: doador {doador.tipo_sanguineo}, receptor {receptor.tipo_sanguineo}.'
+                    )})
+                receptor.status = 'Transplantado'
+                receptor.save(update_fields=['status'])
+
+            doacao = Doacao.objects.create(doador=doador, receptor=receptor, orgao=orgao, data=data or timezone.now())
+
+            # Todos os órgãos da intenção foram destinados: a intenção está concluída
+            doados = set(Doacao.objects.filter(doador=doador).values_list('orgao_id', flat=True))
+            if orgaos_intencao <= doados:
+                intencao.status = 'Concluída'
+                intencao.save(update_fields=['status', 'atualizado_em'])
+
+            ResumoMensalDoacoes.registrar(doacao.data, orgao)
+        return doacao, None
+    except ValidationError as e:
+        return None, e.message_dict
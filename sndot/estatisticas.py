@@ -0,0 +1,71 @@
+from collections import Counter
+from django.db.models import Count
+from django.utils import timezone
+
+# Faixas etárias usadas nas estatísticas de doadores: (idade mínima, rótulo), em ordem crescente
+FAIXAS_ETARIAS = [
+    (0, '0-17'),
+    (18, '18-29'),
+    (30, '30-39'),
+    (40, '40-49'),
+    (50, '50-59'),
+    (60, '60+'),
+]
+
+
+def faixa_etaria(idade):
+    """Rótulo da faixa etária de uma idade ('' se a idade não for informada)."""
+    if idade is None:
+        return ''
+    rotulo = FAIXAS_ETARIAS[0][1]
+    for minima, nome in FAIXAS_ETARIAS:
+        if idade >= minima:
+            rotulo = nome
+    return rotulo
+
+
+def chaves_doador(tipo_sanguineo, estado, idade):
+    """Chaves (dimensão, valor) das estatísticas em que um doador é contado."""
+    return [
+        ('tipo_sanguineo', tipo_sanguineo or ''),
+        ('estado', (estado or '').upper()),
+        ('faixa_etaria', faixa_etaria(idade)),
+    ]
+
+
+def variacao_doador(anterior, atual):
+    """
+    Variação das estatísticas quando um doador passa de `anterior` para `atual`,
+    ambos tuplas (tipo_sanguineo, estado, idade) ou None (doador inexistente).
+    Um doador novo (anterior None) conta também nos cadastrados do dia, que não
+    diminuem quando ele é editado ou removido.
+    """
+    variacao = Counter()
+    if anterior is not None:
+        variacao.subtract(chaves_doador(*anterior))
+    if atual is not None:
+        variacao.update(chaves_doador(*atual))
+        if anterior is None:
+            variacao[('importacao_dia', timezone.localdate().isoformat())] += 1
+    return variacao
+
+
+def calcular_estatisticas(Doador, IntencaoDeDoar):
+    """
+    Calcula do zero as estatísticas de doadores e de intenções ativas por órgão
+    (os doadores cadastrados por dia não podem ser recalculados e ficam de fora).
+    Recebe as classes dos models para poder ser usada também nas migrações.
+    """
+    totais = Counter()
+    linhas = Doador.objects.values_list('tipo_sanguineo', 'estado_residencia', 'idade').annotate(total=Count('id'))
+    for tipo_sanguineo, estado, idade, total in linhas:
+        for chave in chaves_doador(tipo_sanguineo, estado, idade):
+            totais[chave] += total
+
+    orgaos = (
+        IntencaoDeDoar.orgaos.through.objects.filter(intencaodedoar__status__iexact='ativa')
+        .values_list('orgao_id').annotate(total=Count('id'))
+    )
+    for orgao_id, total in orgaos:
+        totais[('orgao', str(orgao_id))] += total
+    return totais
@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.db import router
+from .models import Doador, IntencaoDeDoar
+from .orgaos import REGISTRO_ORGAOS
+from .replicas import usar_replicas
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+TIPO_GZIP = 'application/gzip'
+
+# Campos do doador exportados, na ordem das colunas do CSV
+CAMPOS_DOADOR = (
+    'id', 'nome', 'cpf', 'idade', 'sexo', 'data_nascimento', 'cidade_natal', 'estado_natal', 'profissao',
+    'cidade_residencia', 'estado_residencia', 'estado_civil', 'contato_emergencia', 'tipo_sanguineo',
+)
+COLUNAS_CSV = CAMPOS_DOADOR + ('intencao_status', 'doar_agora', 'orgaos')
+SEPARADOR_ORGAOS = '|'  # Separa os nomes dos órgãos na coluna 'orgaos' do CSV
+
+TAMANHO_BLOCO = 2000
+
+
+def banco_de_leitura():
+    """Banco de onde a exportação lê: uma réplica saudável, se houver (sndot/replicas.py)."""
+    with usar_replicas():
+        return router.db_for_read(Doador)
+
+
+def linhas_doadores(queryset=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gera os doadores em blocos de até `tamanho_bloco` dicionários (CAMPOS_DOADOR mais
+    'intencao': None ou {status, doar_agora, orgaos}, com os nomes dos órgãos), em ordem de id.
+
+    Os doadores e as intenções vêm de uma única consulta (LEFT JOIN) percorrida com
+    .iterator(chunk_size): cursor do lado do servidor no PostgreSQL e fetchmany no
+    SQLite, sem carregar o resultado inteiro. Os órgãos de cada bloco são lidos em uma
+    consulta e os nomes vêm do REGISTRO_ORGAOS: duas consultas por bloco, nunca uma por doador.
+    """
+    if queryset is None:
+        queryset = Doador.objects.all()
+    consulta = queryset.order_by('id').values(
+        *CAMPOS_DOADOR, 'intencao_doar__id', 'intencao_doar__status', 'intencao_doar__doar_agora',
+    ).iterator(chunk_size=tamanho_bloco)
+    through = IntencaoDeDoar.orgaos.through.objects.using(queryset.db)
+
+    while True:
+        linhas = list(islice(consulta, tamanho_bloco))
+        if not linhas:
+            return
+        orgaos = {}
+        intencoes = [linha['intencao_doar__id'] for linha in linhas if linha['intencao_doar__id'] is not None]
+        if intencoes:
+            ligacoes = through.filter(intencaodedoar_id__in=intencoes).values_list('intencaodedoar_id', 'orgao_id')
+            for intencao_id, orgao_id in ligacoes:
+                orgao = REGISTRO_ORGAOS.por_id(orgao_id)
+                orgaos.setdefault(intencao_id, []).append(orgao.nome if orgao else str(orgao_id))
+
+        bloco = []
+        for linha in linhas:
+            intencao_id = linha.pop('intencao_doar__id')
+            status, doar_agora = linha.pop('intencao_doar__status'), linha.pop('intencao_doar__doar_agora')
+            linha['intencao'] = None if intencao_id is None else {
+                'status': status,
+                'doar_agora': doar_agora,
+                'orgaos': sorted(orgaos.get(intencao_id, [])),
+            }
+            bloco.append(linha)
+        yield bloco
+
+
+def _csv(blocos):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_CSV)
+    for bloco in blocos:
+        for doador in bloco:
+            intencao = doador['intencao'] or {}
+            escritor.writerow([doador[campo] for campo in CAMPOS_DOADOR] + [
+                intencao.get('status', ''),
+                '' if not intencao else int(intencao['doar_agora']),
+                SEPARADOR_ORGAOS.join(intencao.get('orgaos', ())),
+            ])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')  # Só o cabeçalho, sem nenhum doador
+
+
+def _jsonl(blocos):
+    for bloco in blocos:
+        yield ''.join(json.dumps(doador, ensure_ascii=False, default=str) + '\n' for doador in bloco).encode('utf-8')
+
+
+def _gzip(partes):
+    """Comprime as partes incrementalmente (formato gzip), sem juntar a saída inteira na memória."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for parte in partes:
+        comprimida = compressor.compress(parte)
+        if comprimida:
+            yield comprimida
+    yield compressor.flush()
+
+
+def gerar_exportacao(formato='csv', compactar=False, queryset=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Gera a exportação dos doadores e das suas intenções em partes de bytes (uma por
+    bloco de doadores), em CSV ou JSON Lines e opcionalmente comprimida com gzip.
+    A memória usada não depende do número de doadores.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' inválido. Use: {', '.join(FORMATOS)}.")
+    codificar = _csv if formato == 'csv' else _jsonl
+    partes = codificar(linhas_doadores(queryset, tamanho_bloco))
+    return _gzip(partes) if compactar else partes
+
+
+async def partes_assincronas(partes):
+    """
+    Entrega as partes de gerar_exportacao() como um iterador assíncrono, para o
+    StreamingHttpResponse no ASGI (que consumiria um iterador síncrono inteiro antes
+    de enviar). Cada parte é gerada na thread da requisição, onde está a conexão do banco.
+    """
+    partes = iter(partes)
+    proxima = sync_to_async(next, thread_sensitive=True)
+    while (parte := await proxima(partes, None)) is not None:
+        yield parte
+
+
+def nome_arquivo(formato, compactar, data):
+    """Nome sugerido do arquivo exportado. Ex.: doadores-20250101.csv.gz"""
+    return f"doadores-{data:%Y%m%d}.{FORMATOS[formato][1]}{'.gz' if compactar else ''}"
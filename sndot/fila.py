@@ -0,0 +1,39 @@
+from django.db import transaction
+from .compatibilidade import DOADORES_COMPATIVEIS
+from .models import Receptor
+
+# Tipos sanguíneos de receptor que podem receber de cada tipo de doador (inverso de DOADORES_COMPATIVEIS)
+RECEPTORES_COMPATIVEIS = {
+    tipo_doador: tuple(
+        tipo_receptor for tipo_receptor, doadores in DOADORES_COMPATIVEIS.items() if tipo_doador in doadores
+    )
+    for tipo_doador in DOADORES_COMPATIVEIS
+}
+
+
+def fila_de_espera(orgao, tipo_sanguineo_doador=None):
+    """
+    Receptores aguardando o órgão, na ordem de atendimento (ver Receptor.ORDEM_FILA).
+    Com o tipo sanguíneo do doador, apenas os receptores compatíveis com ele.
+    """
+    tipos = None
+    if tipo_sanguineo_doador is not None:
+        tipos = RECEPTORES_COMPATIVEIS.get(tipo_sanguineo_doador, ())
+    return Receptor.objects.fila(orgao, tipos)
+
+
+def retirar_proximo(orgao, tipo_sanguineo_doador=None, status='Transplantado'):
+    """
+    Retira o próximo receptor elegível da fila (como um pop de heap), marcando o
+    novo status: uma única consulta com LIMIT 1 que percorre o índice parcial da
+    fila na ordem de atendimento. O registro é bloqueado (SELECT ... FOR UPDATE, onde
+    houver suporte) para que duas doações simultâneas não escolham o mesmo receptor.
+    Retorna o receptor retirado, ou None se não houver receptor compatível.
+    Usada por registrar_doacao (doacoes.py) quando o receptor não é informado.
+    """
+    with transaction.atomic():
+        receptor = fila_de_espera(orgao, tipo_sanguineo_doador).select_for_update().first()
+        if receptor is not None:
+            receptor.status = status
+            receptor.save(update_fields=['status'])
+        return receptor
@@ -1,44 +1,41 @@
 from django import forms
-from .models import Doador, Orgao  # Importe o model Doador
+from .models import Doador, Receptor  # Importe o model Doador
+from .orgaos import REGISTRO_ORGAOS
 from datetime import datetime
 
 class ImportarDoadoresForm(forms.Form):
     json_file = forms.FileField(
         label='Arquivo JSON',
-        widget=forms.FileInput(attrs={'accept': '.json'})
+        help_text='Array JSON ou JSON Lines (um doador por linha).',
+        widget=forms.FileInput(attrs={'accept': '.json,.jsonl'})
     )
 
-# Define Brazilian states and their cities
-# This data will be passed to the frontend via json_script
-BRAZILIAN_STATES_AND_CITIES = {
-    "AC": ["Rio Branco", "Cruzeiro do Sul"],
-    "AL": ["Maceió", "Arapiraca"],
-    "AM": ["Manaus", "Parintins"],
-    "AP": ["Macapá", "Santana"],
-    "BA": ["Salvador", "Feira de Santana"],
-    "CE": ["Fortaleza", "Caucaia"],
-    "DF": ["Brasília"],
-    "ES": ["Vitória", "Vila Velha"],
-    "GO": ["Goiânia", "Aparecida de Goiânia"],
-    "MA": ["São Luís", "Imperatriz"],
-    "MG": ["Belo Horizonte", "Uberlândia", "Contagem"],
-    "MS": ["Campo Grande", "Dourados"],
-    "MT": ["Cuiabá", "Várzea Grande"],
-    "PA": ["Belém", "Ananindeua"],
-    "PB": ["João Pessoa", "Campina Grande"],
-    "PE": ["Recife", "Jaboatão dos Guararapes"],
-    "PI": ["Teresina", "Parnaíba"],
-    "PR": ["Curitiba", "Londrina", "Maringá"],
-    "RJ": ["Rio de Janeiro", "Niterói", "Duque de Caxias"],
-    "RN": ["Natal", "Mossoró"],
-    "RO": ["Porto Velho", "Ji-Paraná"],
-    "RR": ["Boa Vista"],
-    "RS": ["Porto Alegre", "Caxias do Sul", "Canoas"],
-    "SC": ["Florianópolis", "Joinville", "Blumenau"],
-    "SE": ["Aracaju", "Nossa Senhora do Socorro"],
-    "SP": ["São Paulo", "Campinas", "Guarulhos", "São Bernardo do Campo"],
-    "TO": ["Palmas", "Araguaína"]
-}
+# Estados e cidades (e as choices pré-calculadas) ficam em localidades.py
+from .localidades import BRAZILIAN_STATES_AND_CITIES, CHOICES_CIDADES, CIDADES_POR_ESTADO, MUNICIPIOS, OPCAO_SELECIONE_CIDADE
+
+
+class OrgaoChoiceField(forms.TypedChoiceField):
+    """Escolha de um órgão com as opções e o objeto vindos do REGISTRO_ORGAOS (sem consultas)."""
+
+    def __init__(self, *, empty_label='Selecione o Órgão', **kwargs):
+        super().__init__(
+            choices=lambda: [('', empty_label)] + REGISTRO_ORGAOS.choices(),
+            coerce=REGISTRO_ORGAOS.por_id, empty_value=None, **kwargs
+        )
+
+    def prepare_value(self, value):
+        return getattr(value, 'pk', value)
+
+
+class OrgaosMultipleChoiceField(forms.TypedMultipleChoiceField):
+    """Como ModelMultipleChoiceField, mas com as opções e os objetos vindos do REGISTRO_ORGAOS."""
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=REGISTRO_ORGAOS.choices, coerce=REGISTRO_ORGAOS.por_id, **kwargs)
+
+    def prepare_value(self, value):
+        return [getattr(orgao, 'pk', orgao) for orgao in value or ()]
+
 
 # Create choices for states
 STATE_CHOICES = [('', 'Selecione o Estado')] + [(uf, uf) for uf in sorted(BRAZILIAN_STATES_AND_CITIES.keys())]
@@ -88,8 +85,7 @@ class CadastrarDoadorForm(forms.ModelForm):
 
     # Novos campos para Intenção de Doar
     doar_agora = forms.BooleanField(label="Tenho intenção de doar agora", required=False)
-    orgaos_desejados = forms.ModelMultipleChoiceField(
-        queryset=Orgao.objects.all(),
+    orgaos_desejados = OrgaosMultipleChoiceField(
         widget=forms.CheckboxSelectMultiple,
         required=False,
         label="Quais órgãos deseja doar"
@@ -137,7 +133,7 @@ class CadastrarDoadorForm(forms.ModelForm):
             try:
                 intencao = doador_instance.intencao_doar
                 initial_doar_agora = intencao.doar_agora
-                initial_orgaos_desejados = intencao.orgaos.all()
+                initial_orgaos_desejados = list(intencao.orgaos.values_list('id', flat=True))
                 kwargs['initial'] = kwargs.get('initial', {})
                 kwargs['initial']['doar_agora'] = initial_doar_agora
                 kwargs['initial']['orgaos_desejados'] = initial_orgaos_desejados
@@ -159,29 +155,19 @@ class CadastrarDoadorForm(forms.ModelForm):
         # Obtém os dados do formulário (POST) ou os dados iniciais (GET, instance)
         data = self.data if self.data else self.initial
 
-        # Para cidade_natal
-        estado_natal_value = data.get('estado_natal')
-        if estado_natal_value and estado_natal_value in BRAZILIAN_STATES_AND_CITIES:
-            cidades = BRAZILIAN_STATES_AND_CITIES[estado_natal_value]
-            self.fields['cidade_natal'].choices = [('', 'Selecione a Cidade')] + [(c, c) for c in cidades]
-            # Se houver um valor inicial para cidade_natal e ele não estiver nas opções atuais, adicione-o
-            if data.get('cidade_natal') and data.get('cidade_natal') not in [c for c, _ in self.fields['cidade_natal'].choices]:
-                self.fields['cidade_natal'].choices.append((data.get('cidade_natal'), data.get('cidade_natal')))
-        else:
-            self.fields['cidade_natal'].choices = [('', 'Selecione a Cidade')]
-            self.fields['cidade_natal'].widget.attrs['disabled'] = 'disabled' # Desabilita se não houver estado
-
-        # Para cidade_residencia
-        estado_residencia_value = data.get('estado_residencia')
-        if estado_residencia_value and estado_residencia_value in BRAZILIAN_STATES_AND_CITIES:
-            cidades = BRAZILIAN_STATES_AND_CITIES[estado_residencia_value]
-            self.fields['cidade_residencia'].choices = [('', 'Selecione a Cidade')] + [(c, c) for c in cidades]
-            # Se houver um valor inicial para cidade_residencia e ele não estiver nas opções atuais, adicione-o
-            if data.get('cidade_residencia') and data.get('cidade_residencia') not in [c for c, _ in self.fields['cidade_residencia'].choices]:
-                self.fields['cidade_residencia'].choices.append((data.get('cidade_residencia'), data.get('cidade_residencia')))
-        else:
-            self.fields['cidade_residencia'].choices = [('', 'Selecione a Cidade')]
-            self.fields['cidade_residencia'].widget.attrs['disabled'] = 'disabled' # Desabilita se não houver estado
+        # Para cidade_natal e cidade_residencia: reaproveita as choices pré-calculadas do estado
+        for campo_estado, campo_cidade in (('estado_natal', 'cidade_natal'), ('estado_residencia', 'cidade_residencia')):
+            uf = data.get(campo_estado)
+            if uf and uf in CHOICES_CIDADES:
+                choices = CHOICES_CIDADES[uf]
+                # Se houver um valor inicial para a cidade e ele não estiver nas opções do estado, adicione-o
+                cidade = data.get(campo_cidade)
+                if cidade and cidade not in CIDADES_POR_ESTADO[uf]:
+                    choices = choices + ((cidade, cidade),)
+                self.fields[campo_cidade].choices = choices
+            else:
+                self.fields[campo_cidade].choices = (OPCAO_SELECIONE_CIDADE,)
+                self.fields[campo_cidade].widget.attrs['disabled'] = 'disabled' # Desabilita se não houver estado
 
 
     def clean(self):
@@ -208,6 +194,19 @@ class CadastrarDoadorForm(forms.ModelForm):
         if estado_residencia and not cidade_residencia:
             self.add_error('cidade_residencia', 'Cidade de residência é obrigatória quando o estado é selecionado.')
 
+        # Confere as cidades no índice de municípios e grava o nome oficial ('sao paulo' -> 'São Paulo').
+        # Um valor já gravado no doador que está sendo editado continua aceito, mesmo fora do índice.
+        for campo_estado, campo_cidade in (('estado_natal', 'cidade_natal'), ('estado_residencia', 'cidade_residencia')):
+            estado = cleaned_data.get(campo_estado)
+            cidade = cleaned_data.get(campo_cidade)
+            if not (estado and cidade):
+                continue
+            nome_oficial = MUNICIPIOS.nome_oficial(estado, cidade)
+            if nome_oficial:
+                cleaned_data[campo_cidade] = nome_oficial
+            elif (estado, cidade) != (getattr(self.instance, campo_estado, None), getattr(self.instance, campo_cidade, None)):
+                self.add_error(campo_cidade, f'Cidade não encontrada no estado {estado}.')
+
         # Validação para idade
         data_nascimento = cleaned_data.get('data_nascimento')
         if data_nascimento:
@@ -217,3 +216,38 @@ class CadastrarDoadorForm(forms.ModelForm):
             cleaned_data['idade'] = None
 
         return cleaned_data
+
+
+def _variantes_cpf(valor):
+    """O CPF pode estar gravado só com dígitos (importação) ou com máscara (formulário)."""
+    digitos = ''.join(filter(str.isdigit, valor))
+    return {valor, digitos, f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'}
+
+
+class RegistrarDoacaoForm(forms.Form):
+    cpf_doador = forms.CharField(label='CPF do Doador', max_length=14)
+    orgao = OrgaoChoiceField(label='Órgão')
+    cpf_receptor = forms.CharField(
+        label='CPF do Receptor', max_length=14, required=False,
+        help_text='Deixe em branco para destinar ao próximo receptor compatível da fila.'
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline'
+
+    def clean_cpf_doador(self):
+        doador = Doador.objects.filter(cpf__in=_variantes_cpf(self.cleaned_data['cpf_doador'])).first()
+        if doador is None:
+            raise forms.ValidationError('Doador não encontrado.')
+        return doador
+
+    def clean_cpf_receptor(self):
+        cpf = self.cleaned_data['cpf_receptor']
+        if not cpf:
+            return None
+        receptor = Receptor.objects.filter(cpf__in=_variantes_cpf(cpf)).first()
+        if receptor is None:
+            raise forms.ValidationError('Receptor não encontrado.')
+        return receptor
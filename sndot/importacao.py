@@ -0,0 +1,304 @@
+import functools
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+
+from .localidades import MUNICIPIOS
+from .models import Doador, Receptor
+from .orgaos import REGISTRO_ORGAOS
+
+
+def _preparar_pessoa(dados_pessoa):
+    """Campos comuns a doadores e receptores (Pessoa). Lança ValueError se a data de nascimento for inválida."""
+    data_nascimento = datetime.strptime(dados_pessoa['data_nascimento'], '%d/%m/%Y').date()
+    hoje = date.today()
+    idade = hoje.year - data_nascimento.year - ((hoje.month, hoje.day) < (data_nascimento.month, data_nascimento.day))
+
+    return {
+        "nome":dados_pessoa['nome'],
+        "cpf":dados_pessoa['cpf'],
+        "idade":idade,
+        "sexo":dados_pessoa['sexo'],
+        "data_nascimento":data_nascimento,
+        "cidade_natal":dados_pessoa['cidade_natal'],
+        "estado_natal":dados_pessoa['estado_natal'],
+        "profissao":dados_pessoa['profissao'],
+        "cidade_residencia":dados_pessoa['cidade_residencia'],
+        "estado_residencia":dados_pessoa['estado_residencia'],
+        "estado_civil":dados_pessoa['estado_civil'],
+    }
+
+
+def preparar_doador(dados_doador):
+    """
+    Converte um registro "dados" do JSON no dicionário aceito por Doador.cadastrar.
+    Lança ValueError se a data de nascimento for inválida.
+    """
+    doador = _preparar_pessoa(dados_doador)
+    doador["contato_emergencia"] = dados_doador['contato_emergencia']
+    doador["tipo_sanguineo"] = dados_doador['tipo_sanguineo']
+    return doador
+
+
+def preparar_receptor(dados_receptor, orgaos):
+    """
+    Converte um registro "dados" do JSON de receptores no dicionário aceito por
+    Receptor.cadastrar. `orgaos` mapeia o nome de cada órgão para o seu id.
+    Lança ValueError se a data de nascimento for inválida e LookupError se o órgão não existir.
+    """
+    receptor = _preparar_pessoa(dados_receptor)
+    nome_orgao = dados_receptor['orgao']
+    if nome_orgao not in orgaos:
+        raise LookupError(f"Órgão '{nome_orgao}' não cadastrado.")
+    receptor["orgao_id"] = orgaos[nome_orgao]
+    receptor["tipo_sanguineo"] = dados_receptor['tipo_sanguineo']
+    receptor["urgencia"] = dados_receptor.get('urgencia', 1)
+    if dados_receptor.get('data_inclusao'):
+        receptor["data_inclusao"] = datetime.fromisoformat(dados_receptor['data_inclusao'])
+    return receptor
+
+
+def preparar_intencao(dados_intencao):
+    """
+    Converte o bloco "intencao" do JSON ({"status": "s"/"n", "orgaos_id": [...]}) no
+    dicionário aceito como dados_intencao por Doador.cadastrar, com o mesmo status
+    gravado pelas views ('ativa' ou 'inativa'). Retorna None se o registro não tiver
+    o bloco e lança LookupError se algum órgão não existir.
+    """
+    if not dados_intencao:
+        return None
+    doar_agora = str(dados_intencao.get('status', '')).strip().lower() == 's'
+    orgaos = []
+    for orgao_id in dados_intencao.get('orgaos_id') or ():
+        orgao = REGISTRO_ORGAOS.por_id(orgao_id)
+        if orgao is None:
+            raise LookupError(f"Órgão {orgao_id} não cadastrado.")
+        orgaos.append(orgao.pk)
+    return {
+        "doar_agora": doar_agora,
+        "status": "ativa" if doar_agora else "inativa",
+        "orgaos": orgaos,
+    }
+
+
+def ajustar_municipios(doador, validar=None):
+    """
+    Troca as cidades do doador pelo nome oficial do índice de municípios
+    (ex.: 'SAO PAULO' -> 'São Paulo'). Se a validação estiver ativa (settings
+    SNDOT_VALIDAR_MUNICIPIOS), retorna a mensagem de erro da primeira cidade que
+    não existe na UF informada; senão, mantém o valor original e retorna None.
+    """
+    if validar is None:
+        validar = getattr(settings, 'SNDOT_VALIDAR_MUNICIPIOS', False)
+    for campo_estado, campo_cidade in (('estado_natal', 'cidade_natal'), ('estado_residencia', 'cidade_residencia')):
+        nome_oficial = MUNICIPIOS.nome_oficial(doador[campo_estado], doador[campo_cidade])
+        if nome_oficial:
+            doador[campo_cidade] = nome_oficial
+        elif validar:
+            return f"Cidade '{doador[campo_cidade]}' não encontrada no estado {doador[campo_estado]}."
+    return None
+
+
+def _validar_pessoas(registros, modelo, preparar):
+    """Prepara os registros com `preparar` e os valida com modelo.validar_em_lote (ver validar_registros)."""
+    rotulo = modelo._meta.verbose_name.lower()
+    resultados = []
+    preparados = []
+
+    for registro in registros:
+        dados_pessoa = registro['dados']
+        try:
+            pessoa = preparar(dados_pessoa)
+        except ValueError:
+            resultados.append((dados_pessoa.get('nome'), None, [f"Erro ao converter data de nascimento para o {rotulo}: {dados_pessoa.get('nome')}. Data: {dados_pessoa.get('data_nascimento')}"]))
+            continue
+        except Exception as e:
+            resultados.append((dados_pessoa.get('nome'), None, [f"Erro ao processar {rotulo} '{dados_pessoa.get('nome')}': {e}"]))
+            continue
+        erro_municipio = ajustar_municipios(pessoa)
+        if erro_municipio:
+            resultados.append((dados_pessoa['nome'], None, [f"Erro ao processar {rotulo} '{dados_pessoa['nome']}': {erro_municipio}"]))
+            continue
+        resultados.append((dados_pessoa['nome'], pessoa, []))
+        preparados.append(len(resultados) - 1)
+
+    erros = modelo.validar_em_lote([resultados[i][1] for i in preparados])
+    for indice, erro in zip(preparados, erros):
+        if erro:
+            nome = resultados[indice][0]
+            mensagens = [f"Erro ao processar {rotulo} '{nome}': {error[0]}" for field, error in erro.items()]
+            resultados[indice] = (nome, None, mensagens)
+
+    return resultados
+
+
+def validar_registros(registros):
+    """
+    Prepara e valida um lote de registros do JSON, sem acessar o banco de dados
+    (exceto a leitura única do catálogo de órgãos, REGISTRO_ORGAOS, que nos processos
+    do modo --workers já vem preenchido pelo processo principal; ver validar_lotes).
+
+    Retorna uma lista de tuplas (nome, dados_doador, mensagens_erro) na ordem dos
+    registros; dados_doador é None quando o registro é inválido. O bloco "intencao"
+    do registro vai em dados_doador['intencao'] (ver Doador.cadastrar_em_lote).
+    """
+    resultados = _validar_pessoas(registros, Doador, preparar_doador)
+    for indice, (registro, (nome, dados_doador, _)) in enumerate(zip(registros, resultados)):
+        if dados_doador is None:
+            continue
+        try:
+            dados_doador['intencao'] = preparar_intencao(registro.get('intencao'))
+        except LookupError as e:
+            resultados[indice] = (nome, None, [f"Erro ao processar doador '{nome}': {e}"])
+    return resultados
+
+
+def validar_receptores(registros):
+    """
+    Mesmo que validar_registros, para um lote do JSON de receptores. O nome do órgão
+    é traduzido no seu id pelo REGISTRO_ORGAOS.
+    """
+    orgaos = REGISTRO_ORGAOS.ids_por_nome()
+    return _validar_pessoas(registros, Receptor, functools.partial(preparar_receptor, orgaos=orgaos))
+
+
+def dividir_em_lotes(registros, tamanho_lote):
+    """Agrupa um iterável de registros em listas de até tamanho_lote itens."""
+    registros = iter(registros)
+    while True:
+        lote = list(islice(registros, tamanho_lote))
+        if not lote:
+            return
+        yield lote
+
+
+# Conexões com o banco herdadas do processo principal pelos processos do pool (fork)
+_CONEXOES_HERDADAS = []
+
+
+def _inicializar_worker(orgaos):
+    """
+    Prepara os processos do pool: configura o Django quando eles não herdam o estado
+    do pai (spawn) e usa o catálogo de órgãos lido pelo processo principal, para que a
+    validação não acesse o banco.
+
+    Uma conexão herdada pelo fork não é usada nem fechada (fechá-la encerraria a
+    conexão do pai no PostgreSQL e poderia corromper o WAL do SQLite): ela só é
+    guardada, e um acesso ao banco neste processo abriria uma conexão própria.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    for conexao in connections.all(initialized_only=True):
+        if conexao.connection is not None:
+            _CONEXOES_HERDADAS.append(conexao.connection)
+            conexao.connection = None
+    REGISTRO_ORGAOS.preencher(orgaos)
+
+
+def validar_lotes(lotes, workers=1, validar=validar_registros):
+    """
+    Valida os lotes com `validar` (validar_registros para doadores ou
+    validar_receptores para receptores), em paralelo quando workers > 1.
+
+    Os resultados são devolvidos na mesma ordem dos lotes. No máximo 2 * workers
+    lotes ficam pendentes ao mesmo tempo, para que a leitura do arquivo não se
+    adiante à gravação e o consumo de memória continue constante.
+    """
+    if workers <= 1:
+        for lote in lotes:
+            yield validar(lote)
+        return
+
+    # O catálogo de órgãos é lido aqui, uma vez, e repassado aos processos. As conexões
+    # são fechadas antes de criar o pool para que os processos não herdem conexões abertas
+    # (elas são reabertas pela próxima consulta deste processo).
+    orgaos = REGISTRO_ORGAOS.todos()
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker, initargs=(orgaos,)) as executor:
+        pendentes = deque()
+        for lote in lotes:
+            pendentes.append(executor.submit(validar, lote))
+            if len(pendentes) >= 2 * workers:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+def importar_em_lotes(comando, registros, gravar_lote, batch_size, workers=1, validar=validar_registros,
+                      checkpoint=None, retomar=False, progresso=None):
+    """
+    Pipeline comum dos comandos import_doadores e import_receptores: divide os
+    registros em lotes, valida-os com `validar` (em paralelo com workers > 1, ver
+    validar_lotes) e grava cada lote com gravar_lote(resultado), que escreve o
+    resultado de cada registro e retorna as quantidades (criados, atualizados, com_erro).
+
+    Após cada lote o número de registros processados é salvo no arquivo de checkpoint,
+    se informado, e a função progresso (se informada) recebe as contagens do lote.
+    Com retomar=True, os registros já gravados segundo o checkpoint são pulados.
+    O andamento é escrito no stdout do `comando`.
+    Retorna a quantidade de registros processados nesta execução.
+    """
+    inicio = time.perf_counter()
+    ja_processados = 0
+
+    if checkpoint and retomar:
+        ja_processados = ler_checkpoint(checkpoint)
+        if ja_processados:
+            comando.stdout.write(comando.style.WARNING(f'Retomando a importação a partir do registro {ja_processados + 1}.'))
+            registros = islice(registros, ja_processados, None)
+
+    processados = ja_processados
+    for resultado in validar_lotes(dividir_em_lotes(registros, batch_size), workers, validar=validar):
+        criados, atualizados, com_erro = gravar_lote(resultado)
+        processados += len(resultado)
+        if checkpoint:
+            salvar_checkpoint(checkpoint, processados)
+        if progresso:
+            progresso({
+                'registros_processados': len(resultado),
+                'registros_criados': criados,
+                'registros_atualizados': atualizados,
+                'registros_com_erro': com_erro,
+            })
+
+        duracao = time.perf_counter() - inicio
+        taxa = (processados - ja_processados) / duracao if duracao > 0 else 0
+        comando.stdout.write(f'{processados} registros processados ({taxa:.0f} registros/s).')
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)  # Importação concluída: não há o que retomar
+
+    total = processados - ja_processados
+    duracao = time.perf_counter() - inicio
+    taxa = total / duracao if duracao > 0 else 0
+    comando.stdout.write(comando.style.SUCCESS(f'{total} registros processados em {duracao:.2f}s ({taxa:.0f} registros/s).'))
+    return total
+
+
+def ler_checkpoint(caminho):
+    """Retorna quantos registros já foram gravados segundo o arquivo de checkpoint (0 se não existir)."""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return int(json.load(f)['registros_processados'])
+    except FileNotFoundError:
+        return 0
+
+
+def salvar_checkpoint(caminho, registros_processados):
+    """
+    Grava o checkpoint de forma atômica (arquivo temporário + os.replace), para que
+    uma interrupção durante a escrita não deixe um checkpoint corrompido.
+    """
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'registros_processados': registros_processados}, f)
+    os.replace(temporario, caminho)
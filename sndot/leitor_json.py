@@ -0,0 +1,139 @@
+import codecs
+import json
+
+TAMANHO_BLOCO = 64 * 1024  # Quantidade de caracteres lidos do arquivo por vez
+
+
+def _blocos_texto(arquivo, tamanho_bloco):
+    """
+    Lê o arquivo em blocos, decodificando para str se ele estiver aberto em modo binário
+    (como os arquivos enviados por upload no Django).
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        bloco = arquivo.read(tamanho_bloco)
+        if not bloco:
+            if isinstance(bloco, bytes):
+                resto = decodificador.decode(b'', final=True)
+                if resto:
+                    yield resto
+            return
+        if isinstance(bloco, bytes):
+            bloco = decodificador.decode(bloco)
+        yield bloco
+
+
+def _pular_espacos(texto, posicao):
+    while posicao < len(texto) and texto[posicao] in ' \t\n\r':
+        posicao += 1
+    return posicao
+
+
+def ler_registros(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê registros de um arquivo JSON de forma incremental, um objeto por vez.
+
+    Aceita dois formatos:
+        - um array JSON no nível superior: [{"dados": ..., "intencao": ...}, ...]
+        - JSON Lines: um objeto JSON por linha
+
+    Apenas o registro atual (e o bloco lido do arquivo) fica em memória, então o
+    consumo de memória não depende do tamanho do arquivo.
+
+    Raises:
+        json.JSONDecodeError: Se o conteúdo não for JSON válido.
+    """
+    blocos = _blocos_texto(arquivo, tamanho_bloco)
+    buffer = ''
+
+    # Descobre o formato pelo primeiro caractere não branco
+    posicao = 0
+    while True:
+        posicao = _pular_espacos(buffer, posicao)
+        if posicao < len(buffer):
+            break
+        bloco = next(blocos, None)
+        if bloco is None:
+            return  # Arquivo vazio
+        buffer, posicao = bloco, 0
+
+    if buffer[posicao] == '[':
+        yield from _ler_array(blocos, buffer, posicao + 1)
+    else:
+        yield from _ler_json_lines(blocos, buffer[posicao:])
+
+
+def _ler_array(blocos, buffer, posicao):
+    """Percorre os elementos de um array JSON no nível superior."""
+    decodificador = json.JSONDecoder()
+    fim_arquivo = False
+    esperando_virgula = False
+
+    while True:
+        posicao = _pular_espacos(buffer, posicao)
+
+        # Garante que há conteúdo suficiente no buffer
+        if posicao >= len(buffer):
+            if fim_arquivo:
+                raise json.JSONDecodeError('Fim inesperado do arquivo: array não foi fechado', buffer, posicao)
+            bloco = next(blocos, None)
+            if bloco is None:
+                fim_arquivo = True
+            else:
+                buffer = buffer[posicao:] + bloco
+                posicao = 0
+            continue
+
+        caractere = buffer[posicao]
+        if caractere == ']':
+            return
+        if esperando_virgula:
+            if caractere != ',':
+                raise json.JSONDecodeError("Esperado ',' ou ']' entre os elementos", buffer, posicao)
+            posicao += 1
+            esperando_virgula = False
+            continue
+
+        try:
+            registro, fim = decodificador.raw_decode(buffer, posicao)
+        except json.JSONDecodeError:
+            registro, fim = None, None
+
+        # Objeto incompleto (ou terminado exatamente no fim do bloco): lê mais e tenta de novo
+        if fim is None or (fim >= len(buffer) and not fim_arquivo):
+            bloco = None if fim_arquivo else next(blocos, None)
+            if bloco is None:
+                if fim is None:
+                    # Sem mais dados: o erro é real, decodifica de novo para propagá-lo
+                    decodificador.raw_decode(buffer, posicao)
+                fim_arquivo = True
+            else:
+                buffer = buffer[posicao:] + bloco
+                posicao = 0
+            continue
+
+        yield registro
+        # O que já foi lido é descartado na próxima leitura de bloco (buffer[posicao:])
+        posicao = fim
+        esperando_virgula = True
+
+
+def _ler_json_lines(blocos, buffer):
+    """Percorre um arquivo JSON Lines, ignorando linhas em branco."""
+    inicio = 0
+    while True:
+        quebra = buffer.find('\n', inicio)
+        while quebra == -1:
+            bloco = next(blocos, None)
+            if bloco is None:
+                if buffer[inicio:].strip():
+                    yield json.loads(buffer[inicio:])
+                return
+            # Descarta as linhas já lidas antes de acrescentar o novo bloco
+            buffer, inicio = buffer[inicio:] + bloco, 0
+            quebra = buffer.find('\n')
+
+        linha = buffer[inicio:quebra]
+        inicio = quebra + 1
+        if linha.strip():
+            yield json.loads(linha)
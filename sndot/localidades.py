@@ -0,0 +1,26 @@
+import hashlib
+import json
+from .municipios import carregar_municipios
+
+# Índice dos municípios (ver municipios.py), compartilhado pelo processo
+MUNICIPIOS = carregar_municipios()
+
+# Define Brazilian states and their cities
+BRAZILIAN_STATES_AND_CITIES = {uf: MUNICIPIOS.cidades(uf) for uf in MUNICIPIOS.estados()}
+
+# Dados de referência pré-calculados uma única vez, na importação do módulo:
+#   - ESTADOS_CIDADES_JSON: o JSON servido pelo endpoint estados_cidades (com ETag)
+#   - ESTADOS_CIDADES_VERSAO: hash do conteúdo, usado como ETag e na URL (?v=)
+#   - CHOICES_CIDADES: choices de cidade de cada estado, reaproveitadas por todos os formulários
+#   - CIDADES_POR_ESTADO: conjuntos para validar uma cidade em O(1)
+ESTADOS_CIDADES_JSON = json.dumps(
+    BRAZILIAN_STATES_AND_CITIES, ensure_ascii=False, separators=(',', ':'), sort_keys=True
+).encode('utf-8')
+ESTADOS_CIDADES_VERSAO = hashlib.sha256(ESTADOS_CIDADES_JSON).hexdigest()[:16]
+
+OPCAO_SELECIONE_CIDADE = ('', 'Selecione a Cidade')
+CHOICES_CIDADES = {
+    uf: (OPCAO_SELECIONE_CIDADE,) + tuple((cidade, cidade) for cidade in cidades)
+    for uf, cidades in BRAZILIAN_STATES_AND_CITIES.items()
+}
+CIDADES_POR_ESTADO = {uf: frozenset(cidades) for uf, cidades in BRAZILIAN_STATES_AND_CITIES.items()}
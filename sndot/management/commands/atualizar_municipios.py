@@ -0,0 +1,55 @@
+import json
+import os
+from urllib.request import urlopen
+from django.core.management.base import BaseCommand, CommandError
+from sndot.municipios import ARQUIVO_MUNICIPIOS
+from sndot.texto import normalizar_texto
+
+URL_IBGE = 'https://servicodados.ibge.gov.br/api/v1/localidades/municipios'
+
+
+def _sigla_uf(municipio):
+    """A UF vem aninhada na microrregião ou, nos municípios mais recentes, na região imediata."""
+    microrregiao = municipio.get('microrregiao')
+    if microrregiao:
+        return microrregiao['mesorregiao']['UF']['sigla']
+    return municipio['regiao-imediata']['regiao-intermediaria']['UF']['sigla']
+
+
+class Command(BaseCommand):
+    help = 'Regera o arquivo de municípios (sndot/dados/municipios.tsv) a partir da API de localidades do IBGE'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'origem', nargs='?', default=URL_IBGE,
+            help='URL ou caminho de um JSON no formato de /api/v1/localidades/municipios (padrão: API do IBGE)'
+        )
+        parser.add_argument('--saida', default=ARQUIVO_MUNICIPIOS, help='Arquivo gerado')
+
+    def handle(self, *args, **options):
+        origem = options['origem']
+        try:
+            if origem.startswith(('http://', 'https://')):
+                with urlopen(origem, timeout=60) as resposta:
+                    dados = json.load(resposta)
+            else:
+                with open(origem, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Não foi possível ler os municípios de {origem}: {e}')
+
+        try:
+            municipios = sorted(
+                ((_sigla_uf(m), normalizar_texto(m['nome']), str(m['id']), m['nome']) for m in dados),
+            )
+        except (KeyError, TypeError) as e:
+            raise CommandError(f'Formato inesperado no JSON de municípios: {e}')
+
+        temporario = f"{options['saida']}.tmp"
+        with open(temporario, 'w', encoding='utf-8', newline='\n') as f:
+            f.write('codigo_ibge\tuf\tnome\n')
+            for uf, _, codigo, nome in municipios:
+                f.write(f'{codigo}\t{uf}\t{nome}\n')
+        os.replace(temporario, options['saida'])
+
+        self.stdout.write(self.style.SUCCESS(f"{len(municipios)} municípios gravados em {options['saida']}."))
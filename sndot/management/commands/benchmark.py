@@ -0,0 +1,92 @@
+import json
+import platform
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from sndot.benchmark import comparar_resultados, executar_cenarios
+from sndot.models import np
+
+# Cache em memória do próprio processo durante o benchmark, para não misturar
+# páginas do banco de teste com as do cache compartilhado do servidor
+CACHE_BENCHMARK = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sndot-benchmark'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa os cenários de desempenho do sndot (importação, listagem, admin, formulário, '
+        'validação de CPF e validadores) em um banco de teste descartável e grava os resultados em JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanhos', type=int, nargs='+', default=[10000],
+            help='Quantidades de doadores importadas, em sequência (ex.: 10000 100000 1000000)'
+        )
+        parser.add_argument('--repeticoes', type=int, default=20, help='Repetições medidas de cada cenário (exceto importação)')
+        parser.add_argument('--valores-validacao', type=int, default=10000, help='CPFs/textos validados em cada repetição')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tamanho do lote da importação')
+        parser.add_argument('--workers', type=int, default=1, help='Processos de validação da importação')
+        parser.add_argument('--saida', help='Arquivo JSON onde os resultados são gravados')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior: falha se algum cenário regredir')
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.2,
+            help='Aumento máximo aceito no p50 de um cenário em relação a --comparar (0.2 = 20%%)'
+        )
+
+    def handle(self, *args, **options):
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], 'r', encoding='utf-8') as f:
+                    base = json.load(f)['cenarios']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Não foi possível ler os resultados de {options['comparar']}: {e}")
+
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=CACHE_BENCHMARK, ALLOWED_HOSTS=['testserver']):
+                cenarios = executar_cenarios(
+                    options['tamanhos'],
+                    repeticoes=options['repeticoes'],
+                    valores_validacao=options['valores_validacao'],
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    log=self.stdout.write,
+                )
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        resultado = {
+            'gerado_em': timezone.now().isoformat(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'banco': connection.vendor,
+                'numpy': np is not None,
+                'plataforma': platform.platform(),
+            },
+            'parametros': {campo: options[campo] for campo in ('tamanhos', 'repeticoes', 'valores_validacao', 'batch_size', 'workers')},
+            'cenarios': cenarios,
+        }
+
+        cabecalho = f"{'cenário':<28}{'p50 ms':>12}{'p95 ms':>12}{'consultas':>11}"
+        self.stdout.write(cabecalho)
+        self.stdout.write('-' * len(cabecalho))
+        for nome, dados in cenarios.items():
+            extra = f"  ({dados['registros_por_segundo']} registros/s)" if 'registros_por_segundo' in dados else ''
+            self.stdout.write(f"{nome:<28}{dados['p50_ms']:>12.3f}{dados['p95_ms']:>12.3f}{dados.get('consultas', ''):>11}{extra}")
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida']}."))
+
+        if base is not None:
+            regressoes = comparar_resultados(cenarios, base, options['tolerancia'])
+            for nome, anterior, atual, variacao in regressoes:
+                self.stdout.write(self.style.ERROR(f'{nome}: p50 {anterior:.3f} ms -> {atual:.3f} ms (+{variacao:.0%})'))
+            if regressoes:
+                raise CommandError(f"{len(regressoes)} cenário(s) com regressão acima de {options['tolerancia']:.0%}.")
+            self.stdout.write(self.style.SUCCESS('Nenhuma regressão em relação a ' + options['comparar'] + '.'))
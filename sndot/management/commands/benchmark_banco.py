@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from sndot.benchmark import gerar_registros
+from sndot.importacao import preparar_doador
+from sndot.metricas import percentil
+from sndot.models import Doador
+
+CACHE_BENCHMARK = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sndot-benchmark-banco'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de escritas concorrentes (cadastros de doadores, como os POSTs do formulário) '
+        'no perfil de banco em uso (settings SNDOT_BANCO), em um banco de teste descartável'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=8, help='Threads gravando ao mesmo tempo')
+        parser.add_argument('--operacoes', type=int, default=200, help='Cadastros feitos por cada escritor')
+        parser.add_argument('--saida', help='Arquivo JSON onde o resultado é gravado')
+
+    def handle(self, *args, **options):
+        escritores, operacoes = options['escritores'], options['operacoes']
+        registros = list(gerar_registros(escritores * operacoes))
+
+        diretorio = None
+        if connection.vendor == 'sqlite':
+            # Banco de teste em arquivo: o banco em memória não tem os locks do arquivo
+            diretorio = tempfile.mkdtemp(prefix='sndot-benchmark-banco-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(diretorio, 'benchmark.sqlite3')
+
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=CACHE_BENCHMARK):
+                contagens, tempos, duracao = self.executar(registros, escritores, operacoes)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            if diretorio:
+                for arquivo in os.listdir(diretorio):
+                    os.remove(os.path.join(diretorio, arquivo))
+                os.rmdir(diretorio)
+
+        tempos.sort()
+        resultado = {
+            'perfil': settings.SNDOT_BANCO,
+            'banco': connection.vendor,
+            'escritores': escritores,
+            'operacoes': escritores * operacoes,
+            'gravadas': contagens['ok'],
+            'bloqueios': contagens['bloqueio'],
+            'erros': contagens['erro'],
+            'duracao_s': round(duracao, 3),
+            'gravacoes_por_segundo': round(contagens['ok'] / duracao, 1) if duracao else 0,
+            'latencia_ms': {
+                'p50': round(percentil(tempos, 50), 2),
+                'p95': round(percentil(tempos, 95), 2),
+                'p99': round(percentil(tempos, 99), 2),
+            },
+        }
+
+        self.stdout.write(
+            f"perfil {resultado['perfil']}: {resultado['gravadas']}/{resultado['operacoes']} gravações em "
+            f"{resultado['duracao_s']}s ({resultado['gravacoes_por_segundo']}/s), "
+            f"latência p50 {resultado['latencia_ms']['p50']} ms, p95 {resultado['latencia_ms']['p95']} ms, "
+            f"p99 {resultado['latencia_ms']['p99']} ms"
+        )
+        estilo = self.style.ERROR if resultado['bloqueios'] or resultado['erros'] else self.style.SUCCESS
+        self.stdout.write(estilo(f"{resultado['bloqueios']} falhas com 'database is locked', {resultado['erros']} outros erros."))
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+    def executar(self, registros, escritores, operacoes):
+        """Dispara os escritores juntos (barreira) e retorna as contagens, as latências e a duração total."""
+        contagens = Counter()
+        tempos = []
+        lock = threading.Lock()
+        barreira = threading.Barrier(escritores + 1)
+
+        def escritor(lote):
+            # Cada thread usa a sua própria conexão com o banco
+            try:
+                barreira.wait()
+                for registro in lote:
+                    inicio = time.perf_counter()
+                    try:
+                        _, _, erros = Doador.cadastrar(preparar_doador(registro['dados']))
+                        situacao = 'erro' if erros else 'ok'
+                    except OperationalError as e:
+                        situacao = 'bloqueio' if 'locked' in str(e) else 'erro'
+                    decorrido = (time.perf_counter() - inicio) * 1000
+                    with lock:
+                        contagens[situacao] += 1
+                        tempos.append(decorrido)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=escritor, args=(registros[i * operacoes:(i + 1) * operacoes],))
+            for i in range(escritores)
+        ]
+        for thread in threads:
+            thread.start()
+        barreira.wait()
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return contagens, tempos, time.perf_counter() - inicio
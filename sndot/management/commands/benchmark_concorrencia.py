@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from sndot.benchmark import cenario_asgi, cenario_importacao, cenario_wsgi, requisicoes_concorrencia
+from sndot.cache import invalidar
+from sndot.models import Doador
+from sndot.orgaos import REGISTRO_ORGAOS
+
+CACHE_BENCHMARK = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sndot-benchmark-concorrencia'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de requisições concorrentes às views de doadores servidas pelo '
+        'WSGIHandler (threads) e pelo ASGIHandler (event loop), no mesmo processo e em um banco de teste descartável'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doadores', type=int, default=2000, help='Doadores importados antes das medições')
+        parser.add_argument('--requisicoes', type=int, default=500, help='Requisições feitas em cada modo')
+        parser.add_argument('--concorrencia', type=int, default=16, help='Requisições em andamento ao mesmo tempo')
+        parser.add_argument('--saida', help='Arquivo JSON onde o resultado é gravado')
+
+    def handle(self, *args, **options):
+        diretorio = None
+        if connection.vendor == 'sqlite':
+            # Banco de teste em arquivo: cada thread abre a sua própria conexão
+            diretorio = tempfile.mkdtemp(prefix='sndot-benchmark-concorrencia-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(diretorio, 'benchmark.sqlite3')
+
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=CACHE_BENCHMARK, ALLOWED_HOSTS=['testserver']):
+                modos = self.executar(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            if diretorio:
+                for arquivo in os.listdir(diretorio):
+                    os.remove(os.path.join(diretorio, arquivo))
+                os.rmdir(diretorio)
+
+        resultado = {
+            'banco': connection.vendor,
+            'perfil': settings.SNDOT_BANCO,
+            'parametros': {campo: options[campo] for campo in ('doadores', 'requisicoes', 'concorrencia')},
+            'modos': modos,
+        }
+
+        cabecalho = f"{'modo':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}"
+        self.stdout.write(cabecalho)
+        self.stdout.write('-' * len(cabecalho))
+        for modo, dados in modos.items():
+            self.stdout.write(
+                f"{modo:<8}{dados['requisicoes_por_segundo']:>10}{dados['p50_ms']:>10}"
+                f"{dados['p95_ms']:>10}{dados['p99_ms']:>10}{dados['erros']:>8}"
+            )
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado gravado em {options['saida']}."))
+
+    def executar(self, options):
+        """Importa os doadores e mede os dois modos com a mesma sequência de requisições."""
+        call_command('populate_orgaos', stdout=io.StringIO())
+        REGISTRO_ORGAOS.invalidar()
+        orgao_ids = [orgao.pk for orgao in REGISTRO_ORGAOS.todos()]
+        self.stdout.write(f"Importando {options['doadores']} doadores...")
+        cenario_importacao(options['doadores'], orgao_ids, inicio=0)
+        doador_ids = list(Doador.objects.values_list('id', flat=True))
+        connection.close()  # As requisições abrem as suas próprias conexões
+
+        requisicoes = requisicoes_concorrencia(options['requisicoes'], doador_ids)
+        modos = {}
+        for modo, cenario in (('wsgi', cenario_wsgi), ('asgi', cenario_asgi)):
+            self.stdout.write(f'{modo}...')
+            invalidar('doadores')  # Os dois modos começam com o cache de páginas vazio
+            modos[modo] = cenario(requisicoes, options['concorrencia'])
+        return modos
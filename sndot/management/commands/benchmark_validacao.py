@@ -0,0 +1,67 @@
+import json
+import os
+import re
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from sndot.importacao import preparar_doador
+from sndot.models import Doador, campos_texto_livre
+from sndot.validador import VALIDADOR_SEGURANCA, REGEX_SQL
+
+def validacao_seguranca_original(doador):
+    """
+    Reprodução da validação de segurança anterior de Doador.clean, usada como referência:
+    cadeia montada a cada chamada, re.search com padrões não compilados e todos os campos verificados.
+    """
+    for field in doador._meta.fields:
+        if field.name != 'id':
+            value = getattr(doador, field.name)
+            if value:
+                value = str(value)
+                if re.search(r'<[^>]+>', value):
+                    raise ValidationError(f"{field.name} contém tags HTML e não é permitido.")
+                if re.search(r'<script.*?>.*?</script>', value, re.IGNORECASE):
+                    raise ValidationError(f"{field.name} contém tags de script e não é permitido.")
+                if re.search(REGEX_SQL, value, re.IGNORECASE):
+                    raise ValidationError(f"{str(field.name).title()} contém caracteres que podem ser usados para injeção SQL.")
+
+def validacao_seguranca_atual(doador):
+    """Validação de segurança atual de Doador.clean (padrão combinado e só campos de texto livre)."""
+    for field_name in campos_texto_livre(type(doador)):
+        value = getattr(doador, field_name)
+        if value:
+            VALIDADOR_SEGURANCA.validar(str(value), field_name)
+
+class Command(BaseCommand):
+    help = 'Mede o custo por registro da validação de segurança de Doador, antes e depois do validador combinado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registros', type=int, default=10000, help='Quantidade de doadores validados em cada cenário')
+
+    def handle(self, *args, **options):
+        total = options['registros']
+
+        # Usa os doadores de exemplo como base (apenas os que têm data válida)
+        caminho = os.path.join(settings.BASE_DIR, 'dados_json', 'potenciais_doadores.json')
+        with open(caminho, 'r', encoding='utf-8') as f:
+            exemplos = []
+            for registro in json.load(f):
+                try:
+                    exemplos.append(Doador(**preparar_doador(registro['dados'])))
+                except ValueError:
+                    continue
+        doadores = [exemplos[i % len(exemplos)] for i in range(total)]
+
+        resultados = {}
+        for nome, funcao in [('antes', validacao_seguranca_original), ('depois', validacao_seguranca_atual)]:
+            inicio = time.perf_counter()
+            for doador in doadores:
+                try:
+                    funcao(doador)
+                except ValidationError:
+                    pass
+            resultados[nome] = (time.perf_counter() - inicio) / total * 1e6
+            self.stdout.write(f'{nome}: {resultados[nome]:.1f} µs por registro')
+
+        self.stdout.write(self.style.SUCCESS(f"Ganho: {resultados['antes'] / resultados['depois']:.1f}x"))
@@ -0,0 +1,37 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sndot.metricas import ler_snapshots, resumir_exportacao
+
+class Command(BaseCommand):
+    help = 'Mostra as métricas por view (tempo, consultas SQL, consultas lentas) gravadas pelos processos do servidor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Imprime o resumo completo em JSON')
+        parser.add_argument('--idade-maxima', type=int, default=3600, help='Ignora snapshots mais antigos que estes segundos (0 = todos)')
+
+    def handle(self, *args, **options):
+        diretorio = getattr(settings, 'SNDOT_METRICAS_DIR', None)
+        snapshots = ler_snapshots(diretorio, options['idade_maxima'] or None)
+        resumo = resumir_exportacao(snapshots)
+
+        if options['json']:
+            self.stdout.write(json.dumps(resumo, indent=2, ensure_ascii=False))
+            return
+
+        if not resumo:
+            self.stdout.write(self.style.WARNING(f'Nenhuma métrica encontrada em {diretorio}.'))
+            return
+
+        self.stdout.write(f'{len(snapshots)} processo(s)')
+        cabecalho = f"{'view':<32}{'req':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'sql p95':>9}{'sql ms p95':>12}"
+        self.stdout.write(cabecalho)
+        self.stdout.write('-' * len(cabecalho))
+        for view, dados in resumo.items():
+            self.stdout.write(
+                f"{view:<32}{dados['requisicoes']:>8}"
+                f"{dados['tempo_ms']['p50']:>10}{dados['tempo_ms']['p95']:>10}{dados['tempo_ms']['p99']:>10}"
+                f"{dados['consultas']['p95']:>9}{dados['tempo_sql_ms']['p95']:>12}"
+            )
+            for consulta in dados['consultas_lentas'][:1]:
+                self.stdout.write(f"    mais lenta ({consulta['tempo_ms']} ms): {consulta['sql'][:100]}")
@@ -0,0 +1,48 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+from sndot.busca import PARAMETROS_BUSCA, buscar_doadores
+from sndot.exportacao import FORMATOS, TAMANHO_BLOCO, banco_de_leitura, gerar_exportacao
+from sndot.models import Doador
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta os doadores e as suas intenções de doar em CSV ou JSON Lines (opcionalmente com gzip), '
+        'em streaming e com memória constante'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv', help='Formato da exportação')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída com gzip')
+        parser.add_argument('--saida', default='-', help="Arquivo de saída ('-' para a saída padrão)")
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO, help='Doadores lidos do banco por vez')
+        parser.add_argument('--replicas', action='store_true', help='Lê de uma réplica saudável, se houver (SNDOT_REPLICAS)')
+        for parametro in PARAMETROS_BUSCA:
+            parser.add_argument(f"--{parametro.replace('_', '-')}", default='', help=f'Filtro de busca: {parametro}')
+
+    def handle(self, *args, **options):
+        banco = banco_de_leitura() if options['replicas'] else router.db_for_read(Doador)
+        filtros = {parametro: options[parametro] for parametro in PARAMETROS_BUSCA if options[parametro]}
+        doadores = buscar_doadores(Doador.objects.using(banco), **filtros)
+        partes = gerar_exportacao(options['formato'], options['gzip'], doadores, options['tamanho_bloco'])
+
+        if options['saida'] == '-':
+            destino = sys.stdout.buffer
+            self._gravar(partes, destino)
+            destino.flush()
+            return
+
+        try:
+            with open(options['saida'], 'wb') as destino:
+                total = self._gravar(partes, destino)
+        except OSError as e:
+            raise CommandError(f"Não foi possível gravar {options['saida']}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"{total} bytes gravados em {options['saida']} (banco '{banco}')."))
+
+    def _gravar(self, partes, destino):
+        total = 0
+        for parte in partes:
+            destino.write(parte)
+            total += len(parte)
+        return total
@@ -1,6 +1,8 @@
 import json
 from django.core.management.base import BaseCommand, CommandError
 from sndot.models import Doador
+from sndot.leitor_json import ler_registros
+from sndot.importacao import importar_em_lotes, preparar_intencao
 from datetime import datetime, date
 import os
 
@@ -8,26 +10,56 @@ class Command(BaseCommand):
     help = 'Importa doadores do arquivo JSON para o banco de dados'
 
     def add_arguments(self, parser):
-        parser.add_argument('json_file_name', type=str, help='Nome do arquivo JSON')  # Altera para receber o nome do arquivo
+        parser.add_argument('json_file_name', type=str, help='Nome do arquivo JSON (array JSON ou JSON Lines)')  # Altera para receber o nome do arquivo
+        parser.add_argument('--bulk', action='store_true', help='Valida em memória e grava os doadores em lotes (bulk_create com upsert no CPF)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quantidade de doadores por lote/transação no modo --bulk')
+        parser.add_argument('--workers', type=int, default=1, help='Número de processos para validar os lotes em paralelo (implica --bulk)')
+        parser.add_argument('--checkpoint', type=str, help='Arquivo onde é salvo o número de registros já gravados (modo --bulk)')
+        parser.add_argument('--resume', action='store_true', help='Retoma a importação a partir do arquivo de --checkpoint')
+
+    # Opções usadas apenas via call_command:
+    #   registros: iterável com os registros já em streaming, ex.: ler_registros(upload)
+    #   progresso: função chamada após cada lote gravado no modo --bulk com as contagens
+    #              do lote (usada pelos jobs de importação em segundo plano)
+    stealth_options = ('registros', 'progresso')
 
     def handle(self, *args, **options):
         json_file_name = options['json_file_name']
-        print(f"json_file_name: {json_file_name}") # apenas para debug
+
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError('--resume exige o arquivo de --checkpoint.')
+
+        arquivo = None
+        data = options.get('registros')
+        if data is None:
+            try:
+                arquivo = open(json_file_name, 'rb')
+            except FileNotFoundError:
+                raise CommandError(f'Arquivo JSON não encontrado: {json_file_name}')
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'Lendo {os.path.abspath(json_file_name)}.')
+            # Os registros são lidos um a um, sem carregar o arquivo inteiro em memória
+            data = ler_registros(arquivo)
 
         try:
-            with open(json_file_name, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                print(f"carregado: {json_file_name}") # apenas para debug
-        except FileNotFoundError:
-            print(f"carregado1: {json_file_name}: Diretório atual: {os.getcwd()}") # apenas para debug
-            raise CommandError(f'Arquivo JSON não encontrado: {json_file_name}')
+            if options['bulk'] or options['workers'] > 1:
+                self.importar_em_lote(
+                    data, options['batch_size'], workers=options['workers'],
+                    checkpoint=options['checkpoint'], retomar=options['resume'],
+                    progresso=options.get('progresso'),
+                )
+            else:
+                self.importar_registro_a_registro(data)
         except json.JSONDecodeError:
-            print(f"carregado2: {json_file_name}") # apenas para debug
             raise CommandError(f'Erro ao decodificar o arquivo JSON: {json_file_name}')
+        finally:
+            if arquivo is not None:
+                arquivo.close()
 
+    def importar_registro_a_registro(self, data):
+        """Importa os doadores (e suas intenções de doar) um a um usando Doador.cadastrar."""
         for doador_data in data:
             dados_doador = doador_data['dados']
-            #intencao_doador = doador_data['intencao'] # Não estamos usando intencao aqui, mas pode ser útil no futuro
 
             # Converta a data de string para objeto date e calcule a idade
             try:
@@ -57,7 +89,8 @@ class Command(BaseCommand):
                     "tipo_sanguineo":dados_doador['tipo_sanguineo'],
                 }
 
-                doador, criado, erros = Doador.cadastrar(doador)
+                intencao = preparar_intencao(doador_data.get('intencao'))
+                doador, criado, erros = Doador.cadastrar(doador, intencao)
 
                 if not erros:
                     if criado:
@@ -99,3 +132,52 @@ class Command(BaseCommand):
                 continue  # Pula para o próximo doador
 
         self.stdout.write(self.style.SUCCESS('Importação de doadores concluída com sucesso.'))
+
+    def importar_em_lote(self, data, batch_size, workers=1, checkpoint=None, retomar=False, progresso=None):
+        """
+        Importa os doadores e suas intenções de doar em lotes usando Doador.cadastrar_em_lote.
+
+        A validação (CPF, campos e validadores de segurança) roda em um pool de
+        processos quando workers > 1; a gravação é feita sempre por este processo,
+        que é o único a usar a conexão com o banco. Checkpoint, retomada e progresso
+        ficam em importar_em_lotes (sndot/importacao.py), comum aos receptores.
+        As mensagens por registro são as mesmas do modo registro a registro.
+        """
+        importar_em_lotes(
+            self, data, self.gravar_lote, batch_size, workers=workers,
+            checkpoint=checkpoint, retomar=retomar, progresso=progresso,
+        )
+        self.stdout.write(self.style.SUCCESS('Importação de doadores concluída com sucesso.'))
+
+    def gravar_lote(self, resultado):
+        """
+        Grava os registros válidos de um lote já validado por validar_registros
+        e escreve o resultado de cada registro, na ordem do arquivo.
+        Retorna a quantidade de registros criados, atualizados e com erro.
+        """
+        validos = [dados for _, dados, _ in resultado if dados is not None]
+        try:
+            gravados = iter(Doador.cadastrar_em_lote(validos, validar=False))
+        except Exception as e:
+            for nome, dados, mensagens in resultado:
+                for mensagem in mensagens or [f"Erro ao processar doador '{nome}': {e}"]:
+                    self.stdout.write(self.style.ERROR(mensagem))
+            return 0, 0, len(resultado)
+
+        criados = atualizados = 0
+
+        for nome, dados, mensagens in resultado:
+            if dados is None:
+                for mensagem in mensagens:
+                    self.stdout.write(self.style.ERROR(mensagem))
+                continue
+
+            doador, criado, erros = next(gravados)
+            if criado:
+                criados += 1
+                self.stdout.write(self.style.SUCCESS(f"Doador '{doador.nome}' cadastrado com sucesso."))
+            else:
+                atualizados += 1
+                self.stdout.write(self.style.SUCCESS(f"Doador '{doador.nome}' atualizado com sucesso."))
+
+        return criados, atualizados, len(resultado) - criados - atualizados
@@ -0,0 +1,79 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from sndot.models import Receptor
+from sndot.leitor_json import ler_registros
+from sndot.importacao import importar_em_lotes, validar_receptores
+
+class Command(BaseCommand):
+    help = 'Importa receptores (fila de espera) do arquivo JSON para o banco de dados, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('json_file_name', type=str, help='Nome do arquivo JSON (array JSON ou JSON Lines)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quantidade de receptores por lote/transação')
+        parser.add_argument('--workers', type=int, default=1, help='Número de processos para validar os lotes em paralelo')
+        parser.add_argument('--checkpoint', type=str, help='Arquivo onde é salvo o número de registros já gravados')
+        parser.add_argument('--resume', action='store_true', help='Retoma a importação a partir do arquivo de --checkpoint')
+
+    def handle(self, *args, **options):
+        """
+        Mesmo pipeline do import_doadores --bulk (importar_em_lotes): leitura em
+        streaming, validação dos lotes (em paralelo com --workers), gravação com
+        bulk_create e upsert no CPF (Receptor.cadastrar_em_lote) e checkpoint após cada lote.
+
+        Cada registro tem o formato {"dados": {...}}, com os campos de um doador
+        (exceto contato_emergencia) mais "orgao" (nome do órgão), "urgencia" (1 a 4)
+        e, opcionalmente, "data_inclusao" na fila (ISO 8601).
+        """
+        json_file_name = options['json_file_name']
+        checkpoint = options['checkpoint']
+        if options['resume'] and not checkpoint:
+            raise CommandError('--resume exige o arquivo de --checkpoint.')
+
+        try:
+            arquivo = open(json_file_name, 'rb')
+        except FileNotFoundError:
+            raise CommandError(f'Arquivo JSON não encontrado: {json_file_name}')
+
+        with arquivo:
+            try:
+                importar_em_lotes(
+                    self, ler_registros(arquivo), self.gravar_lote, options['batch_size'],
+                    workers=options['workers'], validar=validar_receptores,
+                    checkpoint=checkpoint, retomar=options['resume'],
+                )
+            except json.JSONDecodeError:
+                raise CommandError(f'Erro ao decodificar o arquivo JSON: {json_file_name}')
+
+        self.stdout.write(self.style.SUCCESS('Importação de receptores concluída com sucesso.'))
+
+    def gravar_lote(self, resultado):
+        """
+        Grava os registros válidos de um lote já validado e escreve o resultado de cada registro.
+        Retorna a quantidade de registros criados, atualizados e com erro.
+        """
+        validos = [dados for _, dados, _ in resultado if dados is not None]
+        try:
+            gravados = iter(Receptor.cadastrar_em_lote(validos, validar=False))
+        except Exception as e:
+            for nome, dados, mensagens in resultado:
+                for mensagem in mensagens or [f"Erro ao processar receptor '{nome}': {e}"]:
+                    self.stdout.write(self.style.ERROR(mensagem))
+            return 0, 0, len(resultado)
+
+        criados = atualizados = 0
+
+        for nome, dados, mensagens in resultado:
+            if dados is None:
+                for mensagem in mensagens:
+                    self.stdout.write(self.style.ERROR(mensagem))
+                continue
+
+            receptor, criado, erros = next(gravados)
+            if criado:
+                criados += 1
+            else:
+                atualizados += 1
+            acao = 'cadastrado' if criado else 'atualizado'
+            self.stdout.write(self.style.SUCCESS(f"Receptor '{receptor.nome}' {acao} com sucesso."))
+
+        return criados, atualizados, len(resultado) - criados - atualizados
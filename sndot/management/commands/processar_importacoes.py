@@ -0,0 +1,70 @@
+import os
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sndot.models import ImportacaoDoadores
+
+class Command(BaseCommand):
+    help = 'Worker local que processa os jobs de importação de doadores enviados pelo upload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Processa os jobs pendentes e termina, em vez de ficar aguardando novos jobs')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre as consultas por novos jobs')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quantidade de doadores por lote/transação')
+        parser.add_argument('--workers', type=int, default=1, help='Número de processos de validação por importação')
+
+    def handle(self, *args, **options):
+        # Jobs que ficaram 'Processando' foram interrompidos (queda do worker).
+        # Eles voltam para a fila e são retomados a partir do checkpoint.
+        # Este comando assume um único worker em execução.
+        interrompidos = ImportacaoDoadores.objects.filter(status='Processando').update(status='Pendente')
+        if interrompidos:
+            self.stdout.write(self.style.WARNING(f'{interrompidos} importação(ões) interrompida(s) voltaram para a fila.'))
+
+        self.stdout.write(self.style.SUCCESS('Aguardando importações...'))
+        while True:
+            job = ImportacaoDoadores.reservar_proxima()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            self.processar(job, options['batch_size'], options['workers'])
+
+    def processar(self, job, batch_size, workers):
+        """Executa o import_doadores para um job, registrando o progresso a cada lote."""
+        self.stdout.write(f'Processando {job}...')
+        checkpoint = f'{job.arquivo}.checkpoint'
+        inicio = time.perf_counter()
+
+        # As mensagens por registro vão para um log ao lado do arquivo, não para a memória
+        with open(f'{job.arquivo}.log', 'a', encoding='utf-8') as log:
+            try:
+                call_command(
+                    'import_doadores', job.arquivo, bulk=True, batch_size=batch_size,
+                    workers=workers, checkpoint=checkpoint, resume=True,
+                    progresso=job.registrar_progresso, stdout=log, stderr=log,
+                )
+            except Exception as e:
+                job.status = 'Falhou'
+                job.resumo = f'Ocorreu um erro durante a importação: {e}'
+            else:
+                job.status = 'Concluída'
+
+        job.concluido_em = timezone.now()
+        job.save(update_fields=['status', 'resumo', 'concluido_em'])
+        job.refresh_from_db()
+
+        if job.status == 'Concluída':
+            duracao = time.perf_counter() - inicio
+            job.resumo = (
+                f'{job.registros_processados} registros processados em {duracao:.2f}s '
+                f'({job.registros_por_segundo:.0f} registros/s): {job.registros_criados} cadastrados, '
+                f'{job.registros_atualizados} atualizados, {job.registros_com_erro} com erro.'
+            )
+            job.save(update_fields=['resumo'])
+            os.remove(job.arquivo)  # O arquivo enviado não é mais necessário; o log é mantido
+
+        style = self.style.SUCCESS if job.status == 'Concluída' else self.style.ERROR
+        self.stdout.write(style(f'{job}: {job.resumo}'))
@@ -0,0 +1,29 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from sndot.replicas import registrar_pulso
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava periodicamente o horário atual no banco principal (PulsoReplicacao), '
+        'usado para medir o atraso das réplicas de leitura'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float, default=None,
+            help='Segundos entre os pulsos (padrão: SNDOT_REPLICA_INTERVALO)'
+        )
+        parser.add_argument('--once', action='store_true', help='Grava um único pulso e termina')
+
+    def handle(self, *args, **options):
+        if not settings.SNDOT_REPLICAS:
+            raise CommandError('Nenhuma réplica configurada (variável de ambiente SNDOT_REPLICAS).')
+        intervalo = options['intervalo'] or getattr(settings, 'SNDOT_REPLICA_INTERVALO', 5)
+
+        while True:
+            registrar_pulso()
+            if options['once']:
+                return
+            time.sleep(intervalo)
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from sndot.estatisticas import calcular_estatisticas
+from sndot.models import Doador, EstatisticaDoadores, IntencaoDeDoar
+
+class Command(BaseCommand):
+    help = 'Reconstrói as estatísticas do painel administrativo (EstatisticaDoadores) a partir dos doadores e intenções'
+
+    def handle(self, *args, **options):
+        totais = calcular_estatisticas(Doador, IntencaoDeDoar)
+        with transaction.atomic():
+            # Os doadores importados por dia só existem nos contadores: são mantidos
+            EstatisticaDoadores.objects.exclude(dimensao='importacao_dia').delete()
+            EstatisticaDoadores.objects.bulk_create([
+                EstatisticaDoadores(dimensao=dimensao, valor=valor, total=total)
+                for (dimensao, valor), total in totais.items() if total
+            ])
+        self.stdout.write(self.style.SUCCESS(f'{len(totais)} estatísticas recalculadas.'))
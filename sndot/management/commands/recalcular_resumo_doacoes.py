@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncMonth
+from django.core.management.base import BaseCommand
+from sndot.models import Doacao, ResumoMensalDoacoes
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos mensais de doações (ResumoMensalDoacoes) a partir das doações registradas'
+
+    def handle(self, *args, **options):
+        totais = (
+            Doacao.objects.annotate(mes=TruncMonth('data', output_field=DateField()))
+            .values('mes', 'orgao_id')
+            .annotate(total=Count('id'))
+        )
+        resumos = [
+            ResumoMensalDoacoes(mes=linha['mes'], orgao_id=linha['orgao_id'], total=linha['total'])
+            for linha in totais
+        ]
+        with transaction.atomic():
+            ResumoMensalDoacoes.objects.all().delete()
+            ResumoMensalDoacoes.objects.bulk_create(resumos)
+        self.stdout.write(self.style.SUCCESS(f'{len(resumos)} resumos mensais gravados.'))
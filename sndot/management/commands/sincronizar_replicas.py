@@ -0,0 +1,46 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from sndot.replicas import MONITOR_REPLICAS, PRINCIPAL, registrar_pulso
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco SQLite principal para os arquivos das réplicas (settings SNDOT_REPLICAS), '
+        'simulando a replicação para testar o roteamento de leituras localmente'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float,
+            help='Repete a cópia a cada N segundos (as réplicas ficam até N segundos atrasadas)'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SNDOT_REPLICAS:
+            raise CommandError('Nenhuma réplica configurada (variável de ambiente SNDOT_REPLICAS).')
+        for alias in [PRINCIPAL, *settings.SNDOT_REPLICAS]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"O banco '{alias}' não é SQLite: use a replicação do próprio banco de dados.")
+
+        while True:
+            self.sincronizar()
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
+
+    def sincronizar(self):
+        registrar_pulso()  # As réplicas recebem o pulso junto com a cópia
+        origem = connections[PRINCIPAL]
+        origem.ensure_connection()
+        for alias in settings.SNDOT_REPLICAS:
+            connections[alias].close()
+            destino = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                origem.connection.backup(destino)  # Cópia consistente, mesmo com o principal em uso
+            finally:
+                destino.close()
+            self.stdout.write(f"{alias} sincronizada com o principal.")
+        MONITOR_REPLICAS.invalidar()
@@ -0,0 +1,27 @@
+from itertools import islice
+from django.core.management.base import BaseCommand
+from sndot.models import Doador, validar_cpfs
+
+class Command(BaseCommand):
+    help = 'Verifica os CPFs de todos os doadores cadastrados, em lotes, e lista os inválidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100000, help='Quantidade de CPFs validados por vez')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        linhas = Doador.objects.order_by('id').values_list('id', 'nome', 'cpf').iterator(chunk_size=batch_size)
+
+        total = invalidos = 0
+        while True:
+            lote = list(islice(linhas, batch_size))
+            if not lote:
+                break
+            mascara, erros = validar_cpfs([cpf for _, _, cpf in lote])
+            for (doador_id, nome, cpf), valido, erro in zip(lote, mascara, erros):
+                if not valido:
+                    invalidos += 1
+                    self.stdout.write(self.style.ERROR(f"Doador #{doador_id} '{nome}' ({cpf}): {erro}"))
+            total += len(lote)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} CPFs verificados, {invalidos} inválido(s).'))
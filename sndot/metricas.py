@@ -0,0 +1,201 @@
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+TAMANHO_JANELA = 1000  # Amostras mantidas por view (janela móvel)
+MAX_CONSULTAS_LENTAS = 5  # Consultas mais lentas guardadas por view
+
+
+def percentil(valores_ordenados, p):
+    """
+    Percentil pelo método do posto mais próximo (valores já ordenados): o menor valor
+    com pelo menos p% das amostras menores ou iguais a ele (posto ceil(p/100 * n)).
+    """
+    if not valores_ordenados:
+        return 0
+    posicao = max(0, min(len(valores_ordenados) - 1, math.ceil(p * len(valores_ordenados) / 100) - 1))
+    return valores_ordenados[posicao]
+
+
+def resumir(amostras, consultas_lentas, total_requisicoes):
+    """
+    Resume as amostras de uma view: p50/p95/p99 de tempo total, número de
+    consultas e tempo de SQL, mais as consultas mais lentas.
+    Cada amostra é uma tupla (tempo_ms, consultas, tempo_sql_ms).
+    """
+    tempos = sorted(a[0] for a in amostras)
+    consultas = sorted(a[1] for a in amostras)
+    tempos_sql = sorted(a[2] for a in amostras)
+
+    def distribuicao(valores):
+        return {
+            'p50': round(percentil(valores, 50), 2),
+            'p95': round(percentil(valores, 95), 2),
+            'p99': round(percentil(valores, 99), 2),
+            'max': round(valores[-1], 2) if valores else 0,
+        }
+
+    return {
+        'requisicoes': total_requisicoes,
+        'amostras': len(tempos),
+        'tempo_ms': distribuicao(tempos),
+        'consultas': distribuicao(consultas),
+        'tempo_sql_ms': distribuicao(tempos_sql),
+        'consultas_lentas': [
+            {'tempo_ms': round(duracao, 2), 'sql': sql}
+            for duracao, sql in sorted(consultas_lentas, reverse=True)
+        ],
+    }
+
+
+class JanelaMetricas:
+    """Últimas TAMANHO_JANELA amostras de uma view e as suas consultas mais lentas."""
+
+    def __init__(self, tamanho=TAMANHO_JANELA):
+        self.amostras = deque(maxlen=tamanho)
+        self.consultas_lentas = []  # heap de (tempo_ms, sql) com as mais lentas
+        self.total_requisicoes = 0
+
+    def registrar(self, tempo_ms, consultas, tempo_sql_ms, consultas_lentas):
+        self.amostras.append((tempo_ms, consultas, tempo_sql_ms))
+        self.total_requisicoes += 1
+        for consulta in consultas_lentas:
+            if len(self.consultas_lentas) < MAX_CONSULTAS_LENTAS:
+                heapq.heappush(self.consultas_lentas, consulta)
+            elif consulta > self.consultas_lentas[0]:
+                heapq.heapreplace(self.consultas_lentas, consulta)
+
+
+class RegistroMetricas:
+    """
+    Métricas por view mantidas em memória, no próprio processo.
+
+    Se um diretório for informado, o processo grava periodicamente um snapshot
+    (metricas-<pid>.json) com as amostras, lido pelo comando dump_metricas.
+    """
+
+    def __init__(self, diretorio=None, intervalo_snapshot=10):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.diretorio = diretorio
+        self.intervalo_snapshot = intervalo_snapshot
+        self._ultimo_snapshot = time.monotonic()
+
+    def registrar(self, view, tempo_ms, consultas, tempo_sql_ms, consultas_lentas=()):
+        with self._lock:
+            janela = self._views.get(view)
+            if janela is None:
+                janela = self._views[view] = JanelaMetricas()
+            janela.registrar(tempo_ms, consultas, tempo_sql_ms, consultas_lentas)
+
+            salvar = self.diretorio and time.monotonic() - self._ultimo_snapshot >= self.intervalo_snapshot
+            if salvar:
+                self._ultimo_snapshot = time.monotonic()
+                dados = self._exportar()
+        if salvar:
+            self._salvar_snapshot(dados)
+
+    def _exportar(self):
+        return {
+            view: {
+                'amostras': list(janela.amostras),
+                'consultas_lentas': list(janela.consultas_lentas),
+                'requisicoes': janela.total_requisicoes,
+            }
+            for view, janela in self._views.items()
+        }
+
+    def exportar(self):
+        """Amostras brutas de todas as views (formato dos snapshots)."""
+        with self._lock:
+            return self._exportar()
+
+    def resumo(self):
+        """Resumo (percentis e consultas lentas) de todas as views."""
+        return resumir_exportacao([self.exportar()])
+
+    def limpar(self):
+        with self._lock:
+            self._views = {}
+
+    def _salvar_snapshot(self, dados):
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho = os.path.join(self.diretorio, f'metricas-{os.getpid()}.json')
+            temporario = f'{caminho}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f)
+            os.replace(temporario, caminho)
+        except OSError:
+            pass  # Métricas nunca devem derrubar uma requisição
+
+
+def resumir_exportacao(exportacoes):
+    """Junta as amostras de um ou mais processos (ver RegistroMetricas.exportar) e resume por view."""
+    por_view = {}
+    for exportacao in exportacoes:
+        for view, dados in exportacao.items():
+            atual = por_view.setdefault(view, {'amostras': [], 'consultas_lentas': [], 'requisicoes': 0})
+            atual['amostras'].extend(tuple(a) for a in dados['amostras'])
+            atual['consultas_lentas'].extend(tuple(c) for c in dados['consultas_lentas'])
+            atual['requisicoes'] += dados['requisicoes']
+
+    return {
+        view: resumir(
+            dados['amostras'],
+            heapq.nlargest(MAX_CONSULTAS_LENTAS, dados['consultas_lentas']),
+            dados['requisicoes'],
+        )
+        for view, dados in sorted(por_view.items())
+    }
+
+
+def ler_snapshots(diretorio, idade_maxima=None):
+    """Lê os snapshots gravados pelos processos (ignora os mais antigos que idade_maxima segundos)."""
+    exportacoes = []
+    if not diretorio or not os.path.isdir(diretorio):
+        return exportacoes
+    agora = time.time()
+    for nome in os.listdir(diretorio):
+        if not (nome.startswith('metricas-') and nome.endswith('.json')):
+            continue
+        caminho = os.path.join(diretorio, nome)
+        if idade_maxima and agora - os.path.getmtime(caminho) > idade_maxima:
+            continue
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                exportacoes.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return exportacoes
+
+
+class ColetorConsultas:
+    """
+    execute_wrapper que mede as consultas SQL de uma requisição:
+    quantidade, tempo total e as mais lentas.
+    """
+    TAMANHO_MAXIMO_SQL = 500
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_ms = 0.0
+        self.lentas = []  # heap de (tempo_ms, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = (time.perf_counter() - inicio) * 1000
+            self.consultas += 1
+            self.tempo_ms += duracao
+            consulta = (duracao, sql[:self.TAMANHO_MAXIMO_SQL])
+            if len(self.lentas) < MAX_CONSULTAS_LENTAS:
+                heapq.heappush(self.lentas, consulta)
+            elif consulta > self.lentas[0]:
+                heapq.heapreplace(self.lentas, consulta)
@@ -0,0 +1,119 @@
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from .metricas import ColetorConsultas, RegistroMetricas
+from .replicas import usar_replicas
+
+# Views monitoradas por padrão (nomes das URLs) e namespaces monitorados por inteiro
+VIEWS_MONITORADAS = [
+    'listar_doadores', 'listar_doadores_json', 'doadores_em_lote_json', 'cadastrar_doador', 'editar_doador',
+    'importar_doadores',
+]
+NAMESPACES_MONITORADOS = ['sndot_admin']
+
+# Registro do processo, lido pelo endpoint de métricas do sndot_admin
+METRICAS = RegistroMetricas(diretorio=getattr(settings, 'SNDOT_METRICAS_DIR', None))
+
+
+class MetricasMiddleware:
+    """
+    Mede, por view, o tempo total da requisição, a quantidade de consultas SQL,
+    o tempo total de SQL e as consultas mais lentas, sem precisar de DEBUG=True.
+
+    As consultas são medidas com connection.execute_wrapper; apenas as views de
+    SNDOT_METRICAS_VIEWS e dos namespaces de SNDOT_METRICAS_NAMESPACES são registradas.
+
+    Funciona em WSGI e em ASGI. No ASGI as conexões pertencem à thread onde o
+    Django executa o código síncrono da requisição (ORM, views síncronas), então
+    os wrappers são instalados e removidos nela, via sync_to_async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = set(getattr(settings, 'SNDOT_METRICAS_VIEWS', VIEWS_MONITORADAS))
+        self.namespaces = set(getattr(settings, 'SNDOT_METRICAS_NAMESPACES', NAMESPACES_MONITORADOS))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _monitorada(self, match):
+        return match.url_name in self.views or bool(set(match.namespaces) & self.namespaces)
+
+    @staticmethod
+    def _instalar(stack, coletor):
+        for conexao in connections.all():
+            stack.enter_context(conexao.execute_wrapper(coletor))
+
+    def _registrar(self, request, coletor, inicio):
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and self._monitorada(match):
+            METRICAS.registrar(match.view_name, tempo_ms, coletor.consultas, coletor.tempo_ms, coletor.lentas)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        coletor = ColetorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as stack:
+            self._instalar(stack, coletor)
+            response = self.get_response(request)
+        self._registrar(request, coletor, inicio)
+        return response
+
+    async def __acall__(self, request):
+        coletor = ColetorConsultas()
+        inicio = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self._instalar)(stack, coletor)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self._registrar(request, coletor, inicio)
+        return response
+
+
+class ReplicasMiddleware:
+    """
+    Habilita o roteamento de leituras para as réplicas (sndot/replicas.py) durante
+    a requisição. Requisições que podem gravar (métodos diferentes de GET, HEAD e
+    OPTIONS) usam só o principal. Quando a requisição grava, um cookie fixa as
+    requisições seguintes do mesmo navegador no principal por
+    SNDOT_REPLICA_FIXAR_SEGUNDOS, para que o redirect após um POST já veja o que foi gravado.
+
+    No ASGI o estado fica na ContextVar, copiada para o código síncrono executado
+    via sync_to_async: o roteador enxerga o mesmo estado em qualquer thread.
+    """
+    COOKIE = 'sndot_principal'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.fixar_segundos = getattr(settings, 'SNDOT_REPLICA_FIXAR_SEGUNDOS', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _fixar(self, request):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') or self.COOKIE in request.COOKIES
+
+    def _marcar(self, response, estado):
+        if estado['escreveu']:
+            response.set_cookie(self.COOKIE, '1', max_age=self.fixar_segundos, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with usar_replicas(fixar_no_principal=self._fixar(request)) as estado:
+            response = self.get_response(request)
+        return self._marcar(response, estado)
+
+    async def __acall__(self, request):
+        with usar_replicas(fixar_no_principal=self._fixar(request)) as estado:
+            response = await self.get_response(request)
+        return self._marcar(response, estado)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0003_orgao_alter_doador_estado_civil_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoDoadores',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.CharField(max_length=500)),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('Pendente', 'Pendente'), ('Processando', 'Processando'), ('Concluída', 'Concluída'), ('Falhou', 'Falhou')], default='Pendente', max_length=12)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('registros_processados', models.PositiveIntegerField(default=0)),
+                ('registros_criados', models.PositiveIntegerField(default=0)),
+                ('registros_atualizados', models.PositiveIntegerField(default=0)),
+                ('registros_com_erro', models.PositiveIntegerField(default=0)),
+                ('resumo', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Importação de Doadores',
+                'verbose_name_plural': 'Importações de Doadores',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='intencaodedoar',
+            name='orgaos',
+            field=models.ManyToManyField(blank=True, null=True, to='sndot.orgao'),
+        ),
+        migrations.AlterField(
+            model_name='intencaodedoar',
+            name='status',
+            field=models.CharField(choices=[('Ativa', 'Ativa'), ('Inativa', 'Inativa'), ('Concluída', 'Concluída')], default='Ativa', max_length=10),
+        ),
+    ]
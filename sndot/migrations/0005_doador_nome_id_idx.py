@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0004_importacaodoadores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['nome', 'id'], name='doador_nome_id_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:18
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).lower().split())
+
+
+def preencher_nome_normalizado(apps, schema_editor):
+    Doador = apps.get_model('sndot', 'Doador')
+    lote = []
+    for doador in Doador.objects.only('id', 'nome').iterator(chunk_size=2000):
+        doador.nome_normalizado = normalizar(doador.nome)
+        lote.append(doador)
+        if len(lote) >= 2000:
+            Doador.objects.bulk_update(lote, ['nome_normalizado'])
+            lote = []
+    if lote:
+        Doador.objects.bulk_update(lote, ['nome_normalizado'])
+
+
+# Índice de texto completo (FTS5) dos nomes, apenas no SQLite. A tabela usa o
+# conteúdo de sndot_doador e é mantida em sincronia por triggers, que também
+# valem para bulk_create/upsert e exclusões em massa.
+SQL_CRIAR_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS sndot_doador_fts USING fts5(
+        nome, content='sndot_doador', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS sndot_doador_fts_ai AFTER INSERT ON sndot_doador BEGIN
+        INSERT INTO sndot_doador_fts(rowid, nome) VALUES (new.id, new.nome);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sndot_doador_fts_ad AFTER DELETE ON sndot_doador BEGIN
+        INSERT INTO sndot_doador_fts(sndot_doador_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sndot_doador_fts_au AFTER UPDATE OF nome ON sndot_doador BEGIN
+        INSERT INTO sndot_doador_fts(sndot_doador_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+        INSERT INTO sndot_doador_fts(rowid, nome) VALUES (new.id, new.nome);
+    END""",
+    "INSERT INTO sndot_doador_fts(sndot_doador_fts) VALUES ('rebuild')",
+]
+
+SQL_REMOVER_FTS = [
+    "DROP TRIGGER IF EXISTS sndot_doador_fts_ai",
+    "DROP TRIGGER IF EXISTS sndot_doador_fts_ad",
+    "DROP TRIGGER IF EXISTS sndot_doador_fts_au",
+    "DROP TABLE IF EXISTS sndot_doador_fts",
+]
+
+
+def criar_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQL_CRIAR_FTS:
+            schema_editor.execute(sql)
+
+
+def remover_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQL_REMOVER_FTS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0005_doador_nome_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doador',
+            name='nome_normalizado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['nome_normalizado', 'id'], name='doador_nome_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['estado_residencia', 'cidade_residencia', 'nome_normalizado'], name='doador_residencia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doador',
+            index=models.Index(fields=['tipo_sanguineo', 'estado_residencia', 'nome_normalizado'], name='doador_tipo_estado_idx'),
+        ),
+        migrations.RunPython(preencher_nome_normalizado, migrations.RunPython.noop),
+        migrations.RunPython(criar_fts, remover_fts),
+    ]
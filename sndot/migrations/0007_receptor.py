@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:26
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import sndot.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0006_busca_doadores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Receptor',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('nome', models.CharField(max_length=255)),
+                ('nome_normalizado', models.CharField(blank=True, default='', editable=False, max_length=255)),
+                ('idade', models.IntegerField(validators=[django.core.validators.MinValueValidator(0, message='A idade deve ser maior ou igual a 0.'), django.core.validators.MaxValueValidator(125, message='A idade deve ser menor ou igual a 125.')])),
+                ('sexo', models.CharField(choices=[('M', 'Masculino'), ('F', 'Feminino')], max_length=1)),
+                ('data_nascimento', models.DateField()),
+                ('cidade_natal', models.CharField(max_length=100)),
+                ('estado_natal', models.CharField(max_length=2)),
+                ('cpf', models.CharField(max_length=14, unique=True, validators=[sndot.models.validar_cpf])),
+                ('profissao', models.CharField(blank=True, max_length=100, null=True)),
+                ('cidade_residencia', models.CharField(max_length=100)),
+                ('estado_residencia', models.CharField(max_length=2)),
+                ('estado_civil', models.CharField(blank=True, choices=[('Solteiro', 'Solteiro'), ('Casado', 'Casado'), ('Divorciado', 'Divorciado'), ('Viuvo', 'Viuvo'), ('Uniao Estavel', 'Uniao Estavel')], max_length=50, null=True)),
+                ('tipo_sanguineo', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=5)),
+                ('urgencia', models.PositiveSmallIntegerField(choices=[(1, 'Eletiva'), (2, 'Moderada'), (3, 'Alta'), (4, 'Emergência')], default=1)),
+                ('data_inclusao', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('Aguardando', 'Aguardando'), ('Transplantado', 'Transplantado'), ('Removido', 'Removido')], default='Aguardando', max_length=15)),
+                ('orgao', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='receptores', to='sndot.orgao')),
+            ],
+            options={
+                'verbose_name': 'Receptor',
+                'verbose_name_plural': 'Receptores',
+                'indexes': [models.Index(condition=models.Q(('status', 'Aguardando')), fields=['orgao', 'tipo_sanguineo', '-urgencia', 'data_inclusao', 'id'], name='receptor_fila_tipo_idx'), models.Index(condition=models.Q(('status', 'Aguardando')), fields=['orgao', '-urgencia', 'data_inclusao', 'id'], name='receptor_fila_idx')],
+            },
+        ),
+    ]
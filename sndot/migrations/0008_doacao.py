@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0007_receptor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Doacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateTimeField(default=django.utils.timezone.now)),
+                ('doador', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='doacoes', to='sndot.doador')),
+                ('orgao', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='doacoes', to='sndot.orgao')),
+                ('receptor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='doacoes', to='sndot.receptor')),
+            ],
+            options={
+                'verbose_name': 'Doação',
+                'verbose_name_plural': 'Doações',
+                'indexes': [models.Index(fields=['doador', 'data'], name='doacao_doador_data_idx'), models.Index(fields=['receptor', 'data'], name='doacao_receptor_data_idx'), models.Index(fields=['orgao', 'data'], name='doacao_orgao_data_idx'), models.Index(fields=['data', 'id'], name='doacao_data_id_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doador', 'orgao'), name='doacao_doador_orgao_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoMensalDoacoes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('orgao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='sndot.orgao')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal de Doações',
+                'verbose_name_plural': 'Resumos Mensais de Doações',
+                'ordering': ['-mes', 'orgao'],
+                'constraints': [models.UniqueConstraint(fields=('mes', 'orgao'), name='resumo_doacoes_mes_orgao_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+from sndot.estatisticas import calcular_estatisticas
+
+
+def preencher_estatisticas(apps, schema_editor):
+    EstatisticaDoadores = apps.get_model('sndot', 'EstatisticaDoadores')
+    totais = calcular_estatisticas(apps.get_model('sndot', 'Doador'), apps.get_model('sndot', 'IntencaoDeDoar'))
+    EstatisticaDoadores.objects.bulk_create([
+        EstatisticaDoadores(dimensao=dimensao, valor=valor, total=total)
+        for (dimensao, valor), total in totais.items() if total
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0008_doacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaDoadores',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('tipo_sanguineo', 'Doadores por tipo sanguíneo'), ('estado', 'Doadores por estado de residência'), ('faixa_etaria', 'Doadores por faixa etária'), ('orgao', 'Intenções ativas por órgão'), ('importacao_dia', 'Doadores importados por dia')], max_length=20)),
+                ('valor', models.CharField(max_length=100)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estatística de Doadores',
+                'verbose_name_plural': 'Estatísticas de Doadores',
+                'constraints': [models.UniqueConstraint(fields=('dimensao', 'valor'), name='estatistica_dimensao_valor_unica')],
+            },
+        ),
+        migrations.RunPython(preencher_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0009_estatisticadoadores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulsoReplicacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('atualizado_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pulso de Replicação',
+                'verbose_name_plural': 'Pulsos de Replicação',
+            },
+        ),
+    ]
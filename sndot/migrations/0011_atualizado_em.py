@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:04
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Os AddField abaixo recriam a tabela sndot_doador no SQLite (cópia + DROP + RENAME),
+# o que remove os triggers que mantêm o índice FTS5 da busca por nome (0006).
+# Os triggers são recriados e o índice, reconstruído a partir da tabela. Toda
+# migração futura que recriar sndot_doador no SQLite precisa fazer o mesmo.
+busca_doadores = import_module('sndot.migrations.0006_busca_doadores')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0010_pulsoreplicacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doador',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='intencaodedoar',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(busca_doadores.criar_fts, migrations.RunPython.noop),
+    ]
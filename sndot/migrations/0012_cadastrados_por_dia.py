@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sndot', '0011_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='estatisticadoadores',
+            name='dimensao',
+            field=models.CharField(choices=[('tipo_sanguineo', 'Doadores por tipo sanguíneo'), ('estado', 'Doadores por estado de residência'), ('faixa_etaria', 'Doadores por faixa etária'), ('orgao', 'Intenções ativas por órgão'), ('importacao_dia', 'Doadores cadastrados por dia')], max_length=20),
+        ),
+    ]
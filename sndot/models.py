@@ -1,45 +1,146 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import ProtectedError
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator, ValidationError
-from .validador import ValidadorNome, ValidadorScriptInjection, ValidadorXSS, ValidadorSQLInjection # Importe os validadores do arquivo validators.py
+from .validador import ValidadorNome, VALIDADOR_SEGURANCA # Importe os validadores do arquivo validators.py
+from .texto import normalizar_texto
+from .estatisticas import variacao_doador
+from .cache import invalidar as invalidar_cache
+from collections import Counter
+import functools
 import re
 
-def validar_cpf(value):
-    """Função para validar o CPF."""
-    # Remove caracteres não numéricos
-    cpf = ''.join(filter(str.isdigit, value))
+try:
+    import numpy as np  # Opcional: acelera a validação de CPFs em lote
+except ImportError:
+    np = None
 
-    # Lógica de validação do CPF (adaptada de https://www.pythonbrasil.org.br/wiki/VerificadorDeCPF)
-    try:
-        int(cpf)  # Verifica se todos os caracteres são números
-    except ValueError:
-        raise ValidationError("CPF deve conter apenas números.")
+MENSAGEM_CPF_NAO_NUMERICO = "CPF deve conter apenas números."
+MENSAGEM_CPF_INVALIDO = "CPF inválido."
+
+def _apenas_digitos(value):
+    """Remove tudo o que não for dígito ASCII (str.isdigit também aceita '²', que int() não converte)."""
+    if value.isascii() and value.isdigit():
+        return value
+    return ''.join(c for c in value if c in '0123456789')
+
+def _erro_cpf(cpf):
+    """
+    Valida um CPF já sem formatação e retorna a mensagem de erro, ou None se ele for válido.
+    (adaptado de https://www.pythonbrasil.org.br/wiki/VerificadorDeCPF)
+    """
+    if not cpf:
+        return MENSAGEM_CPF_NAO_NUMERICO
+    if len(cpf) != 11:
+        return MENSAGEM_CPF_INVALIDO
+
+    digitos = [int(c) for c in cpf]
 
     # Cálculo do primeiro dígito verificador
-    soma = 0
-    for i in range(9):
-        soma += int(cpf[i]) * (10 - i)
-    resto = soma % 11
+    resto = sum(d * (10 - i) for i, d in enumerate(digitos[:9])) % 11
     digito1 = 0 if resto < 2 else 11 - resto
-
-    if digito1 != int(cpf[9]):
-        raise ValidationError("CPF inválido.")
+    if digito1 != digitos[9]:
+        return MENSAGEM_CPF_INVALIDO
 
     # Cálculo do segundo dígito verificador
-    soma = 0
-    for i in range(10):
-        soma += int(cpf[i]) * (11 - i)
-    resto = soma % 11
+    resto = sum(d * (11 - i) for i, d in enumerate(digitos[:10])) % 11
     digito2 = 0 if resto < 2 else 11 - resto
+    if digito2 != digitos[10]:
+        return MENSAGEM_CPF_INVALIDO
+
+    return None
+
+def validar_cpfs(cpfs):
+    """
+    Valida vários CPFs de uma vez.
+
+    Com o NumPy instalado, os CPFs de 11 dígitos ASCII são convertidos em uma
+    matriz de dígitos (um CPF por linha) e os dois dígitos verificadores são
+    calculados para todas as linhas com aritmética de arrays. Sem o NumPy (ou
+    para valores fora desse formato), cada CPF é validado em Python puro.
+
+    Returns:
+        tuple: (mascara, erros), onde mascara[i] indica se o i-ésimo CPF é válido
+        e erros[i] é a mensagem de erro correspondente (None quando válido).
+    """
+    limpos = [_apenas_digitos(cpf) for cpf in cpfs]
+    erros = [None] * len(limpos)
+
+    if np is not None:
+        indices = [i for i, cpf in enumerate(limpos) if len(cpf) == 11 and cpf.isascii()]
+    else:
+        indices = []
+
+    if indices:
+        matriz = np.frombuffer(
+            ''.join(limpos[i] for i in indices).encode('ascii'), dtype=np.uint8
+        ).reshape(-1, 11).astype(np.int64) - ord('0')
+
+        resto = (matriz[:, :9] @ np.arange(10, 1, -1)) % 11
+        digito1 = np.where(resto < 2, 0, 11 - resto)
+        resto = (matriz[:, :10] @ np.arange(11, 1, -1)) % 11
+        digito2 = np.where(resto < 2, 0, 11 - resto)
+
+        invalidos = (digito1 != matriz[:, 9]) | (digito2 != matriz[:, 10])
+        for posicao in np.flatnonzero(invalidos):
+            erros[indices[posicao]] = MENSAGEM_CPF_INVALIDO
+
+    vetorizados = set(indices)
+    for i, cpf in enumerate(limpos):
+        if i not in vetorizados:
+            erros[i] = _erro_cpf(cpf)
+
+    mascara = [erro is None for erro in erros]
+    return mascara, erros
+
+def validar_cpf(value):
+    """Função para validar o CPF."""
+    # Remove caracteres não numéricos
+    cpf = _apenas_digitos(value)
+
+    erro = _erro_cpf(cpf)
+    if erro:
+        raise ValidationError(erro)
 
-    if digito2 != int(cpf[10]):
-        raise ValidationError("CPF inválido.")
-    
     # Se o CPF for válido, retorna o valor original
     return cpf
 
+@functools.cache
+def campos_texto_livre(model):
+    """
+    Nomes dos campos de texto livre do model (CharField/TextField editáveis e sem choices).
+    Calculado uma vez por model.
+    """
+    return tuple(
+        field.name for field in model._meta.fields
+        if isinstance(field, (models.CharField, models.TextField)) and not field.choices and field.editable
+    )
+
+def _atualizar_compatibilidade(doador_ids):
+    """
+    Reindexa os doadores no motor de compatibilidade depois do commit: as gravações
+    em lote (bulk_create/bulk_update) não disparam os sinais que fazem isso.
+    """
+    from .compatibilidade import MOTOR_COMPATIBILIDADE  # compatibilidade.py importa este módulo
+    doador_ids = list(doador_ids)
+    if None in doador_ids:
+        # Bancos que não retornam os ids do bulk_create (ex.: MySQL): remonta o índice inteiro
+        transaction.on_commit(MOTOR_COMPATIBILIDADE.invalidar)
+    elif doador_ids:
+        transaction.on_commit(lambda: MOTOR_COMPATIBILIDADE.atualizar_doadores(doador_ids))
+
 class Pessoa(models.Model):
+    # Campos dos registros já existentes lidos por cadastrar_em_lote antes do upsert
+    # e repassados a _apos_gravar_lote (ex.: para atualizar estatísticas)
+    CAMPOS_ANTERIORES_LOTE = ()
+    # Campos gravados apenas na inclusão: o upsert de cadastrar_em_lote (e o cadastrar()
+    # das subclasses) não os altera nos registros que já existem (ex.: situação na fila)
+    CAMPOS_PRESERVADOS_UPSERT = ()
+
     id = models.AutoField(primary_key=True)
     nome = models.CharField(max_length=255)
+    # Nome sem acentos e em minúsculas, mantido pelo save(); usado na busca por prefixo
+    nome_normalizado = models.CharField(max_length=255, editable=False, blank=True, default='')
     idade = models.IntegerField(
         validators=[
             MinValueValidator(0, message="A idade deve ser maior ou igual a 0."),
@@ -71,12 +172,146 @@ class Pessoa(models.Model):
         # Validar o nome
         validador_nome.validar(self.nome, 'Nome')
 
+        # Validaçoes de segurança (XSS, script e SQL injection) em uma única passada,
+        # apenas nos campos de texto livre: números, datas e campos com choices
+        # (sexo, tipo_sanguineo, estado_civil) não precisam ser verificados
+        for field_name in campos_texto_livre(type(self)):
+            value = getattr(self, field_name)
+            if value:
+                VALIDADOR_SEGURANCA.validar(str(value), field_name)
+
     class Meta:
         abstract = True  # Classe base abstrata, não será criada tabela no banco
 
     def __str__(self):
         return f"{self.nome} ({self.cpf})"
 
+    def save(self, *args, **kwargs):
+        self.nome_normalizado = normalizar_texto(self.nome)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def validar_em_lote(cls, lista_dados):
+        """
+        Valida um lote de pessoas em memória, sem acessar o banco de dados.
+        A unicidade do CPF não é validada, pois o cadastro em lote faz upsert no CPF.
+
+        Retorna uma lista com os erros (message_dict) de cada registro, ou None se ele for válido.
+        """
+        # Os CPFs do lote são validados de uma vez (validar_cpfs); os demais
+        # validadores do campo cpf (ex.: tamanho máximo) rodam por registro
+        campo_cpf = cls._meta.get_field('cpf')
+        ordem_campos = [field.name for field in cls._meta.fields]
+        _, erros_cpf = validar_cpfs([str(dados.get('cpf') or '') for dados in lista_dados])
+
+        erros = []
+        for dados_pessoa, erro_cpf in zip(lista_dados, erros_cpf):
+            pessoa = cls(**dados_pessoa)
+            erros_registro = {}
+            try:
+                pessoa.full_clean(exclude=['cpf'], validate_unique=False)
+            except ValidationError as e:
+                erros_registro = e.message_dict
+
+            # Mesma sequência de Field.clean(): validate() e, se passar, todos os validadores
+            mensagens_cpf = []
+            try:
+                campo_cpf.validate(pessoa.cpf, pessoa)
+            except ValidationError as e:
+                mensagens_cpf.extend(e.messages)
+            else:
+                for validador in campo_cpf.validators:
+                    if validador is validar_cpf:
+                        if erro_cpf:
+                            mensagens_cpf.append(erro_cpf)
+                        continue
+                    try:
+                        validador(pessoa.cpf)
+                    except ValidationError as e:
+                        mensagens_cpf.extend(e.messages)
+
+            if mensagens_cpf:
+                erros_registro['cpf'] = mensagens_cpf
+                # Mantém a mesma ordem de campos do full_clean() completo
+                erros_registro = {
+                    campo: erros_registro[campo]
+                    for campo in ordem_campos + [c for c in erros_registro if c not in ordem_campos]
+                    if campo in erros_registro
+                }
+            erros.append(erros_registro or None)
+        return erros
+
+    @classmethod
+    def cadastrar_em_lote(cls, lista_dados, validar=True):
+        """
+        Cadastra (ou atualiza, usando o CPF como chave) um lote de pessoas.
+
+        Todos os registros são validados em memória, os CPFs já existentes são
+        carregados em uma única consulta e a gravação é feita com um único
+        bulk_create com upsert no CPF, dentro de uma transação por lote. Nos
+        registros existentes, CAMPOS_PRESERVADOS_UPSERT não são alterados.
+        Use validar=False quando o lote já tiver passado por validar_em_lote().
+
+        Retorna uma lista de tuplas (pessoa, criado, erros) na mesma ordem de
+        lista_dados, no mesmo formato do retorno de cadastrar().
+        """
+        if validar:
+            erros = cls.validar_em_lote(lista_dados)
+        else:
+            erros = [None] * len(lista_dados)
+
+        resultados = [None] * len(lista_dados)
+        validos = {}  # cpf -> (indices, pessoa); o último registro do mesmo CPF prevalece
+
+        for indice, (dados_pessoa, erro) in enumerate(zip(lista_dados, erros)):
+            if erro:
+                resultados[indice] = (None, False, erro)
+                continue
+
+            pessoa = cls(**dados_pessoa)
+            pessoa.nome_normalizado = normalizar_texto(pessoa.nome)  # bulk_create não chama save()
+            indices, _ = validos.get(pessoa.cpf, ([], None))
+            validos[pessoa.cpf] = (indices + [indice], pessoa)
+
+        if not validos:
+            return resultados
+
+        linhas = cls.objects.filter(cpf__in=list(validos)).values_list('cpf', 'id', *cls.CAMPOS_ANTERIORES_LOTE)
+        existentes = {linha[0]: linha[1] for linha in linhas}
+        anteriores = {linha[0]: linha[2:] for linha in linhas}
+        campos = [
+            field.name for field in cls._meta.concrete_fields
+            if not field.primary_key and field.name != 'cpf' and field.name not in cls.CAMPOS_PRESERVADOS_UPSERT
+        ]
+        pessoas = [pessoa for _, pessoa in validos.values()]
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                pessoas,
+                update_conflicts=True,
+                unique_fields=['cpf'],
+                update_fields=campos,
+            )
+            cls._apos_gravar_lote(anteriores, pessoas)
+
+        for cpf, (indices, pessoa) in validos.items():
+            if cpf in existentes:
+                pessoa.pk = existentes[cpf]
+            for posicao, indice in enumerate(indices):
+                # Registros repetidos no mesmo lote contam como atualização do primeiro
+                criado = cpf not in existentes and posicao == 0
+                resultados[indice] = (pessoa, criado, None)
+
+        return resultados
+
+    @classmethod
+    def _apos_gravar_lote(cls, anteriores, pessoas):
+        """
+        Chamado por cadastrar_em_lote dentro da transação do lote, depois do upsert.
+        anteriores: cpf -> valores de CAMPOS_ANTERIORES_LOTE dos registros que já existiam.
+        """
+        pass
+
     @classmethod
     def cadastrar(cls, **kwargs):
         """
@@ -92,27 +327,42 @@ class Pessoa(models.Model):
         """
         raise NotImplementedError("O método editar deve ser implementado na subclasse.")
 
+TIPO_SANGUINEO_CHOICES = [
+    ('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'),
+    ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')
+]
+
+class DoadorQuerySet(models.QuerySet):
+    def com_intencao(self):
+        """
+        Carrega junto a intenção de doar (JOIN) e os órgãos desejados (uma consulta
+        extra para todos os doadores), evitando uma consulta por doador em listagens
+        que mostram obj.intencao_doar e obj.intencao_doar.orgaos.all().
+        """
+        return self.select_related('intencao_doar').prefetch_related('intencao_doar__orgaos')
+
 class Doador(Pessoa):
     contato_emergencia = models.CharField(max_length=255)
-    tipo_sanguineo = models.CharField(max_length=5, choices=[
-        ('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'),
-        ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')
-    ])
+    tipo_sanguineo = models.CharField(max_length=5, choices=TIPO_SANGUINEO_CHOICES)
+    # Última gravação; com a contagem e o maior id, forma o ETag da API (sndot/api.py)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
 
-    def clean(self):
-        super().clean()
-        # Validaçoes de segurança
-        validador_xss       = ValidadorXSS()
-        validador_script    = ValidadorScriptInjection(validador_xss)
-        validador_sql       = ValidadorSQLInjection(validador_script)
-
-        # Valida todos os campos
-        for field in self._meta.fields:
-            if field.name != 'id':
-                value = getattr(self, field.name)
-                if value:
-                    # Valida o valor do campo usando o validador apropriado
-                    validador_sql.validar(str(value), field.name)
+    objects = DoadorQuerySet.as_manager()
+
+    # Campos que definem em quais estatísticas (EstatisticaDoadores) o doador é contado
+    CAMPOS_ESTATISTICAS = ('tipo_sanguineo', 'estado_residencia', 'idade')
+    CAMPOS_ANTERIORES_LOTE = CAMPOS_ESTATISTICAS
+
+    class Meta:
+        indexes = [
+            # Usado pela paginação por cursor da listagem (ORDER BY nome, id)
+            models.Index(fields=['nome', 'id'], name='doador_nome_id_idx'),
+            # Índices da busca (sndot/busca.py): prefixo do nome normalizado,
+            # combinado com estado/cidade de residência ou tipo sanguíneo
+            models.Index(fields=['nome_normalizado', 'id'], name='doador_nome_norm_idx'),
+            models.Index(fields=['estado_residencia', 'cidade_residencia', 'nome_normalizado'], name='doador_residencia_idx'),
+            models.Index(fields=['tipo_sanguineo', 'estado_residencia', 'nome_normalizado'], name='doador_tipo_estado_idx'),
+        ]
 
     @classmethod
     def cadastrar(cls, dados_doador, dados_intencao=None):
@@ -123,26 +373,159 @@ class Doador(Pessoa):
             doador = cls(**dados_doador)
 
             doador.full_clean()  # Valida o model
-            doador, criado_doador = Doador.objects.update_or_create(
-                cpf=dados_doador['cpf'], # Campo chave para identificar o doador
-                defaults={k: v for k, v in dados_doador.items() if k != 'cpf'}
-            )
+            # Doador, intenção e estatísticas (via sinais) são gravados juntos
+            with transaction.atomic():
+                doador, criado_doador = Doador.objects.update_or_create(
+                    cpf=dados_doador['cpf'], # Campo chave para identificar o doador
+                    defaults={k: v for k, v in dados_doador.items() if k != 'cpf'}
+                )
 
-            if dados_intencao:
-                # Cria a intenção de doar associada ao doador
+                if dados_intencao:
+                    # Cria a intenção de doar associada ao doador
 
-                orgaos = dados_intencao.pop('orgaos', None)  # Remove orgaos do dict para não passar no update_or_create
-                
-                intencao, _ = IntencaoDeDoar.objects.update_or_create(
-                    doador=doador,
-                    defaults=dados_intencao
-                )
-                if orgaos:
-                    intencao.orgaos.set(orgaos)
+                    orgaos = dados_intencao.pop('orgaos', None)  # Remove orgaos do dict para não passar no update_or_create
+                    
+                    intencao, _ = IntencaoDeDoar.objects.update_or_create(
+                        doador=doador,
+                        defaults=dados_intencao
+                    )
+                    if orgaos:
+                        intencao.orgaos.set(orgaos)
 
             return doador, criado_doador, None  # Retorna o objeto, se foi criado e nenhum erro
         except ValidationError as e:
             return None, False, e.message_dict # Retorna None, False e os erros de validação
+
+    @classmethod
+    def cadastrar_em_lote(cls, lista_dados, validar=True):
+        """
+        Como Pessoa.cadastrar_em_lote; cada item de lista_dados pode trazer também a
+        chave 'intencao', no formato de dados_intencao de cadastrar(). Os doadores e
+        as intenções do lote são gravados na mesma transação (IntencaoDeDoar.gravar_em_lote).
+        """
+        intencoes = [dados.get('intencao') for dados in lista_dados]
+        lista_dados = [{k: v for k, v in dados.items() if k != 'intencao'} for dados in lista_dados]
+
+        with transaction.atomic():
+            resultados = super().cadastrar_em_lote(lista_dados, validar=validar)
+            gravados = [
+                (doador, intencao) for (doador, _, _), intencao in zip(resultados, intencoes)
+                if doador is not None and intencao is not None
+            ]
+            if gravados:
+                sem_id = [doador for doador, _ in gravados if doador.pk is None]
+                if sem_id:
+                    # Bancos que não retornam os ids do bulk_create (ex.: MySQL)
+                    ids = dict(cls.objects.filter(cpf__in=[d.cpf for d in sem_id]).values_list('cpf', 'id'))
+                    for doador in sem_id:
+                        doador.pk = ids[doador.cpf]
+                # O último registro do mesmo doador prevalece, como no upsert dos doadores
+                IntencaoDeDoar.gravar_em_lote({doador.pk: intencao for doador, intencao in gravados})
+            _atualizar_compatibilidade({doador.pk for doador, _, _ in resultados if doador is not None})
+
+        return resultados
+
+    @classmethod
+    def _apos_gravar_lote(cls, anteriores, pessoas):
+        """Atualiza as estatísticas com os doadores do lote (bulk_create não dispara sinais)."""
+        variacoes = Counter()
+        for doador in pessoas:
+            atual = tuple(getattr(doador, campo) for campo in cls.CAMPOS_ESTATISTICAS)
+            variacoes.update(variacao_doador(anteriores.get(doador.cpf), atual))
+        EstatisticaDoadores.aplicar(variacoes)
+        transaction.on_commit(lambda: invalidar_cache('doadores', 'painel'))
+
+    @classmethod
+    def editar_em_lote(cls, alteracoes):
+        """
+        Edita um lote de doadores existentes. alteracoes mapeia o id de cada doador
+        para os campos alterados, já convertidos (como em cadastrar_em_lote), e
+        opcionalmente a chave 'intencao', no formato de dados_intencao de cadastrar().
+
+        Os doadores são lidos em uma consulta e validados em memória como em editar()
+        (validar_em_lote), com a unicidade dos CPFs verificada em uma consulta para o
+        lote. Os válidos são gravados com um bulk_update, junto com as intenções
+        (IntencaoDeDoar.gravar_em_lote) e as estatísticas, em uma transação.
+
+        Retorna um dicionário id -> (doador, erros); doador é None quando há erros
+        (message_dict, como em editar()) e erros é None quando o doador foi gravado.
+        """
+        doadores = cls.objects.in_bulk(list(alteracoes))
+        campos = [field.name for field in cls._meta.concrete_fields if not field.primary_key and field.editable]
+
+        resultados = {}
+        encontrados = []
+        for doador_id, dados in alteracoes.items():
+            if doador_id in doadores:
+                encontrados.append(doador_id)
+            else:
+                resultados[doador_id] = (None, {'id': ['Doador não encontrado.']})
+
+        completos = [
+            {**{campo: getattr(doadores[doador_id], campo) for campo in campos}, **alteracoes[doador_id]}
+            for doador_id in encontrados
+        ]
+        for dados in completos:
+            dados.pop('intencao', None)
+        erros = cls.validar_em_lote(completos)
+
+        # Unicidade do CPF: não pode pertencer a outro doador, nem se repetir no lote
+        cpfs = [dados['cpf'] for dados in completos]
+        donos = dict(cls.objects.filter(cpf__in=cpfs).values_list('cpf', 'id'))
+        vistos = set()
+        for posicao, (doador_id, cpf) in enumerate(zip(encontrados, cpfs)):
+            if donos.get(cpf, doador_id) != doador_id or cpf in vistos:
+                erro_unico = doadores[doador_id].unique_error_message(cls, ('cpf',))
+                erros[posicao] = {**(erros[posicao] or {}), 'cpf': erro_unico.messages}
+            vistos.add(cpf)
+
+        editados, intencoes = [], {}
+        variacoes = Counter()
+        alterados = {'nome_normalizado', 'atualizado_em'}
+        agora = timezone.now()
+        for doador_id, dados, erro in zip(encontrados, completos, erros):
+            doador = doadores[doador_id]
+            if erro:
+                resultados[doador_id] = (None, erro)
+                continue
+            anterior = tuple(getattr(doador, campo) for campo in cls.CAMPOS_ESTATISTICAS)
+            for campo, valor in alteracoes[doador_id].items():
+                if campo != 'intencao':
+                    setattr(doador, campo, valor)
+                    alterados.add(campo)
+            doador.nome_normalizado = normalizar_texto(doador.nome)  # bulk_update não chama save()
+            doador.atualizado_em = agora
+            variacoes.update(variacao_doador(anterior, tuple(getattr(doador, campo) for campo in cls.CAMPOS_ESTATISTICAS)))
+            if alteracoes[doador_id].get('intencao') is not None:
+                intencoes[doador_id] = alteracoes[doador_id]['intencao']
+            editados.append(doador)
+            resultados[doador_id] = (doador, None)
+
+        if editados:
+            with transaction.atomic():
+                cls.objects.bulk_update(editados, sorted(alterados))
+                EstatisticaDoadores.aplicar(variacoes)
+                IntencaoDeDoar.gravar_em_lote(intencoes)
+                _atualizar_compatibilidade(doador.pk for doador in editados)
+                transaction.on_commit(lambda: invalidar_cache('doadores', 'painel'))
+        return resultados
+
+    @classmethod
+    def remover_em_lote(cls, ids):
+        """
+        Remove os doadores de `ids` em uma única transação, tudo ou nada: se algum deles
+        tiver doações registradas (Doacao.doador usa PROTECT), nenhum é removido. O
+        delete() do queryset dispara os sinais de cada doador removido (estatísticas,
+        cache, compatibilidade). Retorna o conjunto dos ids com doações (vazio se os
+        doadores foram removidos).
+        """
+        try:
+            with transaction.atomic():
+                cls.objects.filter(pk__in=ids).delete()
+        except ProtectedError as e:
+            # O Collector reúne as doações de todos os doadores antes de lançar o erro
+            return {doacao.doador_id for doacao in e.protected_objects}
+        return set()
     
     def editar(doador, dados_intencao=None):
         """
@@ -150,19 +533,21 @@ class Doador(Pessoa):
         """
         try:
             doador.full_clean()  # Valida o model
-            doador.save()  # Salva as alterações
-
-            if dados_intencao:
-                # Cria a intenção de doar associada ao doador
-
-                orgaos = dados_intencao.pop('orgaos', None)  # Remove orgaos do dict para não passar no update_or_create
-                
-                intencao, _ = IntencaoDeDoar.objects.update_or_create(
-                    doador=doador,
-                    defaults=dados_intencao
-                )
-                if orgaos:
-                    intencao.orgaos.set(orgaos)
+            # Doador, intenção e estatísticas (via sinais) são gravados juntos
+            with transaction.atomic():
+                doador.save()  # Salva as alterações
+
+                if dados_intencao:
+                    # Cria a intenção de doar associada ao doador
+
+                    orgaos = dados_intencao.pop('orgaos', None)  # Remove orgaos do dict para não passar no update_or_create
+                    
+                    intencao, _ = IntencaoDeDoar.objects.update_or_create(
+                        doador=doador,
+                        defaults=dados_intencao
+                    )
+                    if orgaos:
+                        intencao.orgaos.set(orgaos)
 
             return doador, True, None  # Retorna o objeto e nenhum erro
         except ValidationError as e:
@@ -205,10 +590,372 @@ class IntencaoDeDoar(models.Model):
     # Novo campo para armazenar os órgãos que o doador deseja doar
     orgaos = models.ManyToManyField(Orgao, blank=True, null=True) # blank=True permite que não haja órgãos selecionados
 
+    # Última gravação (inclusive dos órgãos, gravados junto); usado pelo ETag da API
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
     class Meta:
         verbose_name = "Intenção de Doar"
         verbose_name_plural = "Intenções de Doar"
 
     def __str__(self):
         return f"Intenção de {self.doador.nome} - Status: {self.status}"
-    
\ No newline at end of file
+
+    @classmethod
+    def gravar_em_lote(cls, intencoes):
+        """
+        Cria ou atualiza as intenções de um lote de doadores, sem uma consulta por doador.
+
+        intencoes: doador_id -> dicionário com status, doar_agora e (opcional) orgaos,
+        uma lista de ids; como em Doador.cadastrar, os órgãos só são substituídos
+        quando a lista não é vazia. As intenções existentes e seus órgãos são lidos
+        em duas consultas, as intenções são gravadas com um bulk_create com upsert
+        no doador e os órgãos direto na tabela intermediária.
+
+        bulk_create não dispara sinais: as estatísticas por órgão são atualizadas
+        aqui e o motor de compatibilidade por quem chama (cadastrar_em_lote e editar_em_lote).
+        """
+        if not intencoes:
+            return
+        through = cls.orgaos.through
+
+        existentes = {
+            doador_id: (intencao_id, status)
+            for doador_id, intencao_id, status in cls.objects.filter(doador_id__in=list(intencoes)).values_list('doador_id', 'id', 'status')
+        }
+        orgaos_anteriores = {}
+        linhas = through.objects.filter(intencaodedoar_id__in=[i for i, _ in existentes.values()])
+        for intencao_id, orgao_id in linhas.values_list('intencaodedoar_id', 'orgao_id'):
+            orgaos_anteriores.setdefault(intencao_id, set()).add(orgao_id)
+
+        objetos = [
+            cls(doador_id=doador_id, status=dados['status'], doar_agora=dados.get('doar_agora', False))
+            for doador_id, dados in intencoes.items()
+        ]
+        cls.objects.bulk_create(
+            objetos,
+            update_conflicts=True,
+            unique_fields=['doador'],
+            update_fields=['status', 'doar_agora', 'atualizado_em'],  # data_intencao das existentes é mantida
+        )
+
+        sem_id = [i for i in objetos if i.pk is None and i.doador_id not in existentes]
+        if sem_id:
+            # Bancos que não retornam os ids do bulk_create (ex.: MySQL)
+            ids = dict(cls.objects.filter(doador_id__in=[i.doador_id for i in sem_id]).values_list('doador_id', 'id'))
+            for intencao in sem_id:
+                intencao.pk = ids[intencao.doador_id]
+
+        variacoes = Counter()
+        substituidas = []
+        novas_linhas = []
+        for intencao in objetos:
+            intencao_id, status_anterior = existentes.get(intencao.doador_id, (None, None))
+            if intencao_id is not None:
+                intencao.pk = intencao_id
+            anteriores = orgaos_anteriores.get(intencao.pk, set())
+            orgaos = set(intencoes[intencao.doador_id].get('orgaos') or ())
+            if orgaos and orgaos != anteriores:
+                if anteriores:
+                    substituidas.append(intencao.pk)
+                novas_linhas.extend(through(intencaodedoar_id=intencao.pk, orgao_id=orgao_id) for orgao_id in orgaos)
+            else:
+                orgaos = anteriores
+
+            # Estatísticas de intenções ativas por órgão (mesma regra dos sinais)
+            if (status_anterior or '').lower() == 'ativa':
+                variacoes.subtract(('orgao', str(orgao_id)) for orgao_id in anteriores)
+            if intencao.status.lower() == 'ativa':
+                variacoes.update(('orgao', str(orgao_id)) for orgao_id in orgaos)
+
+        if substituidas:
+            through.objects.filter(intencaodedoar_id__in=substituidas).delete()
+        through.objects.bulk_create(novas_linhas)
+        EstatisticaDoadores.aplicar(variacoes)
+        transaction.on_commit(lambda: invalidar_cache('doadores', 'painel'))
+    
+
+class ReceptorQuerySet(models.QuerySet):
+    def aguardando(self):
+        return self.filter(status='Aguardando')
+
+    def fila(self, orgao, tipos_sanguineos=None):
+        """
+        Fila de espera de um órgão, na ordem de atendimento: maior urgência primeiro
+        e, na mesma urgência, quem entrou na fila há mais tempo.
+        Percorre os índices parciais receptor_fila_* sem ordenar a tabela.
+        """
+        fila = self.aguardando().filter(orgao=orgao)
+        if tipos_sanguineos is not None:
+            fila = fila.filter(tipo_sanguineo__in=tipos_sanguineos)
+        return fila.order_by(*Receptor.ORDEM_FILA)
+
+class Receptor(Pessoa):
+    """
+    Pessoa na fila de espera por um órgão.
+    """
+    URGENCIA_CHOICES = [
+        (1, 'Eletiva'),
+        (2, 'Moderada'),
+        (3, 'Alta'),
+        (4, 'Emergência'),
+    ]
+    STATUS_CHOICES = [
+        ('Aguardando', 'Aguardando'),
+        ('Transplantado', 'Transplantado'),
+        ('Removido', 'Removido'),
+    ]
+    # Ordem de atendimento da fila (mesma ordem dos índices abaixo)
+    ORDEM_FILA = ('-urgencia', 'data_inclusao', 'id')
+    # Reimportar um receptor não o devolve para a fila nem muda o seu tempo de espera
+    CAMPOS_PRESERVADOS_UPSERT = ('status', 'data_inclusao')
+
+    tipo_sanguineo = models.CharField(max_length=5, choices=TIPO_SANGUINEO_CHOICES)
+    orgao = models.ForeignKey(Orgao, on_delete=models.PROTECT, related_name='receptores')
+    urgencia = models.PositiveSmallIntegerField(choices=URGENCIA_CHOICES, default=1)
+    data_inclusao = models.DateTimeField(default=timezone.now)  # Entrada na fila: define o tempo de espera
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='Aguardando')
+
+    objects = ReceptorQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Receptor"
+        verbose_name_plural = "Receptores"
+        indexes = [
+            # Índices parciais (só quem está aguardando) na ordem da fila:
+            # o próximo receptor é o primeiro item do índice que satisfaz o filtro
+            models.Index(
+                fields=['orgao', 'tipo_sanguineo', '-urgencia', 'data_inclusao', 'id'],
+                condition=models.Q(status='Aguardando'), name='receptor_fila_tipo_idx',
+            ),
+            models.Index(
+                fields=['orgao', '-urgencia', 'data_inclusao', 'id'],
+                condition=models.Q(status='Aguardando'), name='receptor_fila_idx',
+            ),
+        ]
+
+    @classmethod
+    def cadastrar(cls, dados_receptor):
+        """
+        Método de classe para cadastrar (ou atualizar, pelo CPF) um receptor.
+        Na atualização, os campos de CAMPOS_PRESERVADOS_UPSERT são mantidos.
+        """
+        try:
+            receptor = cls(**dados_receptor)
+            receptor.full_clean(validate_unique=False)
+            dados = {k: v for k, v in dados_receptor.items() if k != 'cpf'}
+            receptor, criado = Receptor.objects.update_or_create(
+                cpf=dados_receptor['cpf'],
+                defaults={k: v for k, v in dados.items() if k not in cls.CAMPOS_PRESERVADOS_UPSERT},
+                create_defaults=dados,
+            )
+            return receptor, criado, None
+        except ValidationError as e:
+            return None, False, e.message_dict
+
+
+class ImportacaoDoadores(models.Model):
+    """
+    Job de importação de doadores executado em segundo plano.
+
+    O upload cria o job como 'Pendente' e o comando processar_importacoes
+    (worker local, sem broker externo) executa o import_doadores e atualiza
+    o progresso a cada lote gravado.
+    """
+    STATUS_CHOICES = [
+        ('Pendente', 'Pendente'), ('Processando', 'Processando'),
+        ('Concluída', 'Concluída'), ('Falhou', 'Falhou'),
+    ]
+
+    arquivo = models.CharField(max_length=500)  # Caminho do arquivo salvo no servidor
+    nome_arquivo = models.CharField(max_length=255)  # Nome original do arquivo enviado
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='Pendente')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    registros_processados = models.PositiveIntegerField(default=0)
+    registros_criados = models.PositiveIntegerField(default=0)
+    registros_atualizados = models.PositiveIntegerField(default=0)
+    registros_com_erro = models.PositiveIntegerField(default=0)
+    resumo = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Importação de Doadores"
+        verbose_name_plural = "Importações de Doadores"
+        ordering = ['-criado_em']
+
+    def __str__(self):
+        return f"Importação #{self.pk} ({self.nome_arquivo}) - {self.status}"
+
+    @classmethod
+    def reservar_proxima(cls):
+        """
+        Reserva o job pendente mais antigo para processamento.
+        A reserva é um UPDATE condicional no status, então dois workers nunca
+        pegam o mesmo job. Retorna None se não houver jobs pendentes.
+        """
+        while True:
+            job = cls.objects.filter(status='Pendente').order_by('criado_em', 'id').first()
+            if job is None:
+                return None
+            reservado = cls.objects.filter(pk=job.pk, status='Pendente').update(
+                status='Processando', iniciado_em=job.iniciado_em or timezone.now()
+            )
+            if reservado:
+                job.refresh_from_db()
+                return job
+
+    def registrar_progresso(self, contagens):
+        """Soma as contagens de um lote gravado aos totais do job."""
+        ImportacaoDoadores.objects.filter(pk=self.pk).update(
+            **{campo: models.F(campo) + valor for campo, valor in contagens.items()}
+        )
+
+    @property
+    def registros_por_segundo(self):
+        if not self.iniciado_em:
+            return 0
+        fim = self.concluido_em or timezone.now()
+        duracao = (fim - self.iniciado_em).total_seconds()
+        return self.registros_processados / duracao if duracao > 0 else 0
+
+    def para_dict(self):
+        """Representação usada pelo endpoint de status do job."""
+        return {
+            'id': self.pk,
+            'arquivo': self.nome_arquivo,
+            'status': self.status,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None,
+            'registros_processados': self.registros_processados,
+            'registros_criados': self.registros_criados,
+            'registros_atualizados': self.registros_atualizados,
+            'registros_com_erro': self.registros_com_erro,
+            'registros_por_segundo': round(self.registros_por_segundo, 1),
+            'resumo': self.resumo,
+        }
+
+
+class Doacao(models.Model):
+    """
+    Registro (somente inclusão) de uma doação: qual órgão de qual doador foi para
+    qual receptor. Os registros não são alterados nem removidos depois de gravados;
+    use sndot.doacoes.registrar_doacao para incluí-los.
+    """
+    doador = models.ForeignKey(Doador, on_delete=models.PROTECT, related_name='doacoes')
+    receptor = models.ForeignKey(Receptor, on_delete=models.PROTECT, related_name='doacoes')
+    orgao = models.ForeignKey(Orgao, on_delete=models.PROTECT, related_name='doacoes')
+    data = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Doação"
+        verbose_name_plural = "Doações"
+        indexes = [
+            # Histórico por pessoa/órgão e histórico geral (paginação por cursor em (data, id))
+            models.Index(fields=['doador', 'data'], name='doacao_doador_data_idx'),
+            models.Index(fields=['receptor', 'data'], name='doacao_receptor_data_idx'),
+            models.Index(fields=['orgao', 'data'], name='doacao_orgao_data_idx'),
+            models.Index(fields=['data', 'id'], name='doacao_data_id_idx'),
+        ]
+        constraints = [
+            # Cada órgão da intenção de um doador só pode ser destinado uma vez
+            models.UniqueConstraint(fields=['doador', 'orgao'], name='doacao_doador_orgao_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.orgao} de {self.doador.nome} para {self.receptor.nome} em {self.data:%d/%m/%Y}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("Doações registradas não podem ser alteradas.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Doações registradas não podem ser removidas.")
+
+
+class ResumoMensalDoacoes(models.Model):
+    """
+    Total de doações por mês e órgão, atualizado na mesma transação de cada doação
+    registrada. Os painéis leem este resumo em vez de agregar a tabela de doações;
+    o comando recalcular_resumo_doacoes o reconstrói a partir das doações.
+    """
+    mes = models.DateField()  # Primeiro dia do mês
+    orgao = models.ForeignKey(Orgao, on_delete=models.CASCADE, related_name='resumos_mensais')
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Mensal de Doações"
+        verbose_name_plural = "Resumos Mensais de Doações"
+        ordering = ['-mes', 'orgao']
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'orgao'], name='resumo_doacoes_mes_orgao_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} - {self.orgao}: {self.total}"
+
+    @classmethod
+    def registrar(cls, data, orgao, quantidade=1):
+        """Soma `quantidade` doações ao mês de `data` (deve rodar dentro da transação da doação)."""
+        mes = timezone.localdate(data).replace(day=1) if timezone.is_aware(data) else data.date().replace(day=1)
+        resumo, _ = cls.objects.get_or_create(mes=mes, orgao=orgao)
+        cls.objects.filter(pk=resumo.pk).update(total=models.F('total') + quantidade)
+
+
+class EstatisticaDoadores(models.Model):
+    """
+    Contadores agregados exibidos no painel administrativo, mantidos de forma
+    incremental na mesma transação das gravações de doadores e intenções
+    (sinais em signals.py e Doador._apos_gravar_lote). O painel lê apenas estas
+    linhas, em tempo constante; o comando recalcular_estatisticas as reconstrói.
+    """
+    DIMENSOES = [
+        ('tipo_sanguineo', 'Doadores por tipo sanguíneo'),
+        ('estado', 'Doadores por estado de residência'),
+        ('faixa_etaria', 'Doadores por faixa etária'),
+        ('orgao', 'Intenções ativas por órgão'),  # valor = id do órgão
+        ('importacao_dia', 'Doadores cadastrados por dia'),  # valor = data (AAAA-MM-DD); só inclusões
+    ]
+
+    dimensao = models.CharField(max_length=20, choices=DIMENSOES)
+    valor = models.CharField(max_length=100)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Estatística de Doadores"
+        verbose_name_plural = "Estatísticas de Doadores"
+        constraints = [
+            models.UniqueConstraint(fields=['dimensao', 'valor'], name='estatistica_dimensao_valor_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimensao}={self.valor}: {self.total}"
+
+    @classmethod
+    def aplicar(cls, variacoes):
+        """Soma as variações {(dimensao, valor): quantidade} aos contadores."""
+        for (dimensao, valor), quantidade in variacoes.items():
+            if not quantidade:
+                continue
+            atualizados = cls.objects.filter(dimensao=dimensao, valor=valor).update(total=models.F('total') + quantidade)
+            if not atualizados:
+                _, criado = cls.objects.get_or_create(dimensao=dimensao, valor=valor, defaults={'total': quantidade})
+                if not criado:
+                    cls.objects.filter(dimensao=dimensao, valor=valor).update(total=models.F('total') + quantidade)
+
+
+class PulsoReplicacao(models.Model):
+    """
+    Linha única gravada periodicamente no banco principal pelo comando
+    pulso_replicacao e lida pelo monitor de réplicas (sndot/replicas.py). Comparar o valor lido em uma réplica com o do principal
+    indica quanto a réplica está atrasada.
+    """
+    atualizado_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Pulso de Replicação"
+        verbose_name_plural = "Pulsos de Replicação"
+
+    def __str__(self):
+        return f"Pulso de replicação: {self.atualizado_em}"
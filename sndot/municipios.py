@@ -0,0 +1,96 @@
+import bisect
+import os
+from functools import cache
+from .texto import normalizar_texto
+
+# Arquivo com os municípios: uma linha por município, "codigo_ibge<TAB>uf<TAB>nome".
+# Pode ser regenerado a partir da API de localidades do IBGE com o comando atualizar_municipios.
+ARQUIVO_MUNICIPIOS = os.path.join(os.path.dirname(__file__), 'dados', 'municipios.tsv')
+
+# Maior caractere usado como limite superior das buscas por prefixo (como em busca.py)
+LIMITE_PREFIXO = '\U0010ffff'
+
+
+class IndiceMunicipios:
+    """
+    Índices em memória sobre a lista de municípios, montados uma única vez:
+
+    - hash (uf, nome normalizado) -> nome oficial, para validar uma cidade em O(1),
+      sem diferenciar acentos e maiúsculas ('sao paulo' -> 'São Paulo');
+    - chaves normalizadas ordenadas (geral e por UF), para o autocompletar por
+      prefixo com busca binária: O(log n + k) para k resultados.
+    """
+
+    def __init__(self, municipios):
+        entradas = sorted(
+            (normalizar_texto(nome), uf, nome, codigo) for codigo, uf, nome in municipios
+        )
+        self._nomes = {(uf, chave): nome for chave, uf, nome, _ in entradas}
+        self._entradas = tuple(entradas)
+        self._chaves = tuple(entrada[0] for entrada in entradas)
+
+        por_uf = {}
+        for entrada in entradas:
+            por_uf.setdefault(entrada[1], []).append(entrada)
+        self._por_uf = {
+            uf: (tuple(e[0] for e in lista), tuple(lista)) for uf, lista in por_uf.items()
+        }
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def estados(self):
+        """Siglas das UFs, em ordem alfabética."""
+        return sorted(self._por_uf)
+
+    def cidades(self, uf):
+        """Nomes oficiais dos municípios da UF, em ordem alfabética (sem acentos)."""
+        _, entradas = self._por_uf.get((uf or '').upper(), ((), ()))
+        return [entrada[2] for entrada in entradas]
+
+    def nome_oficial(self, uf, cidade):
+        """Nome oficial do município, ou None se ele não existir na UF."""
+        return self._nomes.get(((uf or '').upper(), normalizar_texto(cidade)))
+
+    def existe(self, uf, cidade):
+        return self.nome_oficial(uf, cidade) is not None
+
+    def autocompletar(self, prefixo, uf=None, limite=10):
+        """
+        Municípios cujo nome começa com `prefixo` (sem diferenciar acentos e maiúsculas),
+        opcionalmente restritos a uma UF. Retorna dicionários com codigo_ibge, uf e nome.
+        """
+        chave = normalizar_texto(prefixo)
+        if not chave or limite <= 0:
+            return []
+        if uf:
+            chaves, entradas = self._por_uf.get(uf.upper(), ((), ()))
+        else:
+            chaves, entradas = self._chaves, self._entradas
+
+        inicio = bisect.bisect_left(chaves, chave)
+        fim = min(bisect.bisect_left(chaves, chave + LIMITE_PREFIXO, lo=inicio), inicio + limite)
+        return [
+            {'codigo_ibge': codigo, 'uf': uf_municipio, 'nome': nome}
+            for _, uf_municipio, nome, codigo in entradas[inicio:fim]
+        ]
+
+
+def ler_municipios(caminho=ARQUIVO_MUNICIPIOS):
+    """Lê o arquivo de municípios e retorna tuplas (codigo_ibge, uf, nome)."""
+    municipios = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        next(f, None)  # cabeçalho
+        for linha in f:
+            linha = linha.rstrip('\r\n')
+            if not linha:
+                continue
+            codigo, uf, nome = linha.split('\t')
+            municipios.append((codigo, uf, nome))
+    return municipios
+
+
+@cache
+def carregar_municipios(caminho=ARQUIVO_MUNICIPIOS):
+    """Índice dos municípios do arquivo, montado uma única vez por processo."""
+    return IndiceMunicipios(ler_municipios(caminho))
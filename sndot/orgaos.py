@@ -0,0 +1,80 @@
+import threading
+import time
+from .models import Orgao
+
+
+class RegistroOrgaos:
+    """
+    Catálogo de órgãos carregado uma única vez por processo (uma consulta) e
+    consultado em memória: id -> órgão, nome -> órgão e as choices dos formulários.
+
+    O catálogo é descartado quando um Orgao é salvo ou removido neste processo
+    (sinais em signals.py) e recarregado no próximo acesso. Alterações feitas por
+    outro processo (ex.: populate_orgaos) são vistas depois de `ttl` segundos.
+    Os objetos Orgao devolvidos são compartilhados: use-os apenas para leitura.
+    Processos que não devem consultar o banco recebem o catálogo pronto (preencher()).
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dados = None
+        self._carregado_em = None
+
+    @staticmethod
+    def _indexar(orgaos):
+        orgaos = tuple(orgaos)
+        return orgaos, {orgao.pk: orgao for orgao in orgaos}, {orgao.nome: orgao for orgao in orgaos}
+
+    def _carregados(self):
+        with self._lock:
+            expirado = self._carregado_em is not None and time.monotonic() - self._carregado_em >= self.ttl
+            if self._dados is None or expirado:
+                self._dados = self._indexar(Orgao.objects.order_by('nome'))
+                self._carregado_em = time.monotonic()
+            return self._dados
+
+    def preencher(self, orgaos):
+        """
+        Usa `orgaos` (ex.: todos() de outro processo) como catálogo, sem consultar o banco
+        e sem expirar pelo ttl; invalidar() volta a ler do banco no próximo acesso.
+        """
+        with self._lock:
+            self._dados = self._indexar(sorted(orgaos, key=lambda orgao: orgao.nome))
+            self._carregado_em = None
+
+    def __deepcopy__(self, memo):
+        # Compartilhado: os campos de formulário (copiados a cada instância do form)
+        # guardam métodos do registro, que devem continuar apontando para ele
+        return self
+
+    def invalidar(self):
+        """Descarta o catálogo; o próximo acesso o recarrega."""
+        with self._lock:
+            self._dados = None
+
+    def todos(self):
+        """Órgãos em ordem alfabética."""
+        return self._carregados()[0]
+
+    def por_id(self, orgao_id):
+        """Órgão com o id informado, ou None."""
+        try:
+            return self._carregados()[1].get(int(orgao_id))
+        except (TypeError, ValueError):
+            return None
+
+    def por_nome(self, nome):
+        """Órgão com o nome informado, ou None."""
+        return self._carregados()[2].get(nome)
+
+    def ids_por_nome(self):
+        """Dicionário nome -> id (ex.: para traduzir os órgãos de um arquivo importado)."""
+        return {nome: orgao.pk for nome, orgao in self._carregados()[2].items()}
+
+    def choices(self):
+        return [(orgao.pk, orgao.nome) for orgao in self.todos()]
+
+
+# Catálogo compartilhado pelo processo
+REGISTRO_ORGAOS = RegistroOrgaos()
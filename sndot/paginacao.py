@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+def codificar_cursor(dados):
+    """Gera um token opaco (base64 de um JSON) para ser usado na URL."""
+    texto = json.dumps(dados, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Decodifica um token gerado por codificar_cursor. Retorna None se o token for inválido."""
+    try:
+        texto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        dados = json.loads(texto)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return dados if isinstance(dados, dict) else None
+
+
+class PaginaKeyset:
+    """
+    Uma página de resultados da paginação por cursor.
+    Expõe os mesmos atributos usados pelo template com o Paginator do Django
+    (iteração, has_next, has_previous), mais os cursores de navegação.
+    """
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class PaginadorKeyset:
+    """
+    Paginação por cursor (keyset/seek) ordenada por (campo, id).
+
+    Em vez de OFFSET, cada página busca os registros depois (ou antes) da chave
+    do último (ou primeiro) registro da página atual, usando o índice (campo, id).
+    O custo de qualquer página é o mesmo, inclusive das mais profundas, e não há COUNT(*).
+
+    Os cursores são tokens opacos; CURSOR_ULTIMA leva à última página.
+    Com decrescente=True a ordem é (campo, id) decrescente (ex.: mais recentes primeiro).
+    """
+    CURSOR_ULTIMA = codificar_cursor({'d': 'ultima'})
+
+    def __init__(self, queryset, por_pagina, campo='nome', decrescente=False):
+        self.queryset = queryset
+        self.por_pagina = por_pagina
+        self.campo = campo
+        self.decrescente = decrescente
+
+    def _chave(self, item):
+        if isinstance(item, dict):
+            return item[self.campo], item['id']
+        return getattr(item, self.campo), item.id
+
+    def _cursor(self, item, direcao):
+        valor, pk = self._chave(item)
+        return codificar_cursor({'d': direcao, 'v': valor, 'id': pk})
+
+    def _chave_do_cursor(self, dados):
+        """
+        Chave (valor, id) de um cursor de próxima/anterior, com o valor convertido pelo
+        campo do model. None se o cursor não tiver uma chave válida (ex.: um token
+        alterado ou truncado que ainda decodifica para um JSON).
+        """
+        valor, pk = dados.get('v'), dados.get('id')
+        if type(pk) is not int or type(valor) not in (str, int, float):
+            return None
+        try:
+            return self.queryset.model._meta.get_field(self.campo).to_python(valor), pk
+        except FieldDoesNotExist:
+            return valor, pk
+        except ValidationError:
+            return None
+
+    def _consulta(self, cursor):
+        """Consulta da página indicada pelo cursor (um item a mais que a página) e a direção do cursor."""
+        dados = decodificar_cursor(cursor) if cursor else None
+        direcao = dados.get('d') if dados else None
+        if direcao in ('proxima', 'anterior'):
+            chave = self._chave_do_cursor(dados)
+            if chave is None:
+                direcao = None  # Cursor inválido: primeira página
+            else:
+                valor, pk = chave
+        n = self.por_pagina
+        crescente = (self.campo, 'id')
+        decrescente = (f'-{self.campo}', '-id')
+        depois, antes = 'gt', 'lt'
+        if self.decrescente:
+            crescente, decrescente = decrescente, crescente
+            depois, antes = antes, depois
+
+        if direcao == 'proxima':
+            filtro = Q(**{f'{self.campo}__{depois}': valor}) | Q(**{self.campo: valor, f'id__{depois}': pk})
+            return self.queryset.filter(filtro).order_by(*crescente)[:n + 1], direcao
+        if direcao == 'anterior':
+            filtro = Q(**{f'{self.campo}__{antes}': valor}) | Q(**{self.campo: valor, f'id__{antes}': pk})
+            return self.queryset.filter(filtro).order_by(*decrescente)[:n + 1], direcao
+        if direcao == 'ultima':
+            return self.queryset.order_by(*decrescente)[:n + 1], direcao
+        return self.queryset.order_by(*crescente)[:n + 1], None
+
+    def pagina(self, cursor=None):
+        """Retorna a página indicada pelo cursor (a primeira se o cursor for vazio ou inválido)."""
+        consulta, direcao = self._consulta(cursor)
+        return self._montar(list(consulta), direcao)
+
+    async def apagina(self, cursor=None):
+        """Versão assíncrona de pagina(), para views async (iteração assíncrona do ORM)."""
+        consulta, direcao = self._consulta(cursor)
+        return self._montar([item async for item in consulta], direcao)
+
+    def _montar(self, itens, direcao):
+        n = self.por_pagina
+        if direcao == 'proxima':
+            has_next, has_previous = len(itens) > n, True
+            itens = itens[:n]
+        elif direcao == 'anterior':
+            has_next, has_previous = True, len(itens) > n
+            itens = itens[:n][::-1]
+        elif direcao == 'ultima':
+            has_next, has_previous = False, len(itens) > n
+            itens = itens[:n][::-1]
+        else:
+            has_next, has_previous = len(itens) > n, False
+            itens = itens[:n]
+
+        return PaginaKeyset(
+            itens,
+            has_next=has_next and bool(itens),
+            has_previous=has_previous and bool(itens),
+            next_cursor=self._cursor(itens[-1], 'proxima') if itens else None,
+            previous_cursor=self._cursor(itens[0], 'anterior') if itens else None,
+        )
+
+
+def contagem_aproximada(model, using='default', timeout=60):
+    """
+    Total aproximado de registros da tabela do model, sem COUNT(*) a cada requisição.
+
+    No PostgreSQL usa a estimativa do planner (pg_class.reltuples). Nos demais
+    bancos faz o COUNT(*) e guarda o resultado em cache por `timeout` segundos.
+    """
+    tabela = model._meta.db_table
+    conexao = connections[using]
+    if conexao.vendor == 'postgresql':
+        with conexao.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabela])
+            linha = cursor.fetchone()
+        if linha and linha[0] >= 0:
+            return linha[0]
+
+    return cache.get_or_set(f'contagem_aproximada:{using}:{tabela}', lambda: model.objects.using(using).count(), timeout)
@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+PRINCIPAL = 'default'
+
+# Estado do roteamento no contexto atual (requisição, thread ou tarefa assíncrona).
+# None: fora de uma requisição (comandos, workers de importação) -> sempre o principal.
+_ESTADO = ContextVar('sndot_roteamento_replicas', default=None)
+
+# Momento (time.monotonic) da última gravação feita por este processo, em qualquer contexto
+_ULTIMA_GRAVACAO = None
+
+
+def replicas():
+    """Aliases das réplicas configuradas (settings SNDOT_REPLICAS)."""
+    return getattr(settings, 'SNDOT_REPLICAS', [])
+
+
+@contextmanager
+def usar_replicas(fixar_no_principal=False):
+    """
+    Permite que as leituras feitas dentro do bloco usem as réplicas (o middleware
+    faz isso a cada requisição; comandos que só leem podem usar diretamente).
+    Retorna o estado do bloco: estado['escreveu'] indica se houve alguma gravação.
+    """
+    estado = {'principal': fixar_no_principal, 'escreveu': False}
+    token = _ESTADO.set(estado)
+    try:
+        yield estado
+    finally:
+        _ESTADO.reset(token)
+
+
+def fixar_no_principal():
+    """Faz as próximas leituras do contexto atual irem para o principal (ex.: ler o que acabou de gravar)."""
+    estado = _ESTADO.get()
+    if estado is not None:
+        estado['principal'] = True
+
+
+def gravou_recentemente():
+    """
+    Se este processo gravou no principal há menos de SNDOT_REPLICA_FIXAR_SEGUNDOS:
+    nesse intervalo as réplicas podem ainda não ter recebido a gravação.
+    """
+    if _ULTIMA_GRAVACAO is None:
+        return False
+    return time.monotonic() - _ULTIMA_GRAVACAO < getattr(settings, 'SNDOT_REPLICA_FIXAR_SEGUNDOS', 5)
+
+
+def registrar_pulso():
+    """Grava o horário atual no pulso do principal (comando pulso_replicacao)."""
+    from .models import PulsoReplicacao
+    PulsoReplicacao.objects.using(PRINCIPAL).update_or_create(pk=1, defaults={'atualizado_em': timezone.now()})
+
+
+class MonitorReplicas:
+    """
+    Acompanha o atraso das réplicas pela tabela PulsoReplicacao, cujo horário é
+    gravado periodicamente no principal pelo comando pulso_replicacao: a cada
+    `intervalo` segundos lê (sem gravar) o pulso do principal e o de cada réplica.
+    Uma réplica fica fora do roteamento (as leituras voltam para o principal) se
+    não responder ou se o pulso que ela tem for mais antigo que o do principal
+    menos `atraso_maximo` segundos. Sem um pulso recente no principal (o comando
+    não está rodando) o atraso não pode ser medido e nenhuma réplica é usada.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._verificado_em = None
+        self._saudaveis = []
+
+    def invalidar(self):
+        with self._lock:
+            self._verificado_em = None
+
+    def saudaveis(self):
+        """Aliases das réplicas que podem receber leituras agora."""
+        intervalo = getattr(settings, 'SNDOT_REPLICA_INTERVALO', 5)
+        with self._lock:
+            if self._verificado_em is None or time.monotonic() - self._verificado_em >= intervalo:
+                self._saudaveis = self._verificar()
+                self._verificado_em = time.monotonic()
+            return self._saudaveis
+
+    def _verificar(self):
+        from .models import PulsoReplicacao
+
+        def pulso(alias):
+            return PulsoReplicacao.objects.using(alias).filter(pk=1).values_list('atualizado_em', flat=True).first()
+
+        atraso_maximo = getattr(settings, 'SNDOT_REPLICA_ATRASO_MAXIMO', 10)
+        # Os querysets usam .using(): consultas com o banco explícito não passam pelo roteador
+        try:
+            principal = pulso(PRINCIPAL)
+        except DatabaseError:
+            return []  # Sem a tabela do pulso no principal (ex.: migração pendente)
+        if principal is None or (timezone.now() - principal).total_seconds() > atraso_maximo:
+            return []
+
+        saudaveis = []
+        for alias in replicas():
+            try:
+                atual = pulso(alias)
+            except DatabaseError:
+                continue
+            if atual is not None and (principal - atual).total_seconds() <= atraso_maximo:
+                saudaveis.append(alias)
+        return saudaveis
+
+
+# Monitor compartilhado pelo processo
+MONITOR_REPLICAS = MonitorReplicas()
+
+
+class RoteadorReplicas:
+    """
+    Roteador de banco de dados (settings DATABASE_ROUTERS): gravações sempre no
+    principal; leituras em uma das réplicas saudáveis, exceto quando o contexto
+    está fixado no principal:
+
+    - fora de uma requisição (sem usar_replicas());
+    - em requisições que não são GET/HEAD/OPTIONS ou logo depois de uma gravação
+      do mesmo usuário (ReplicasMiddleware);
+    - depois de qualquer gravação no mesmo contexto (ler o que acabou de gravar);
+    - por SNDOT_REPLICA_FIXAR_SEGUNDOS depois de qualquer gravação deste processo,
+      de qualquer usuário (gravou_recentemente), para que uma leitura de réplica
+      atrasada não seja guardada no cache com a versão que a gravação acabou de criar;
+    - dentro de uma transação do principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _ESTADO.get()
+        if estado is None or estado['principal'] or connections[PRINCIPAL].in_atomic_block or gravou_recentemente():
+            return PRINCIPAL
+        saudaveis = MONITOR_REPLICAS.saudaveis()
+        return random.choice(saudaveis) if saudaveis else PRINCIPAL
+
+    def db_for_write(self, model, **hints):
+        global _ULTIMA_GRAVACAO
+        _ULTIMA_GRAVACAO = time.monotonic()
+        estado = _ESTADO.get()
+        if estado is not None:
+            estado['principal'] = estado['escreveu'] = True
+        return PRINCIPAL
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {PRINCIPAL, *replicas()}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o esquema pela replicação (ou por sincronizar_replicas)
+        return db == PRINCIPAL
@@ -0,0 +1,183 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .cache import invalidar
+from .compatibilidade import MOTOR_COMPATIBILIDADE
+from .estatisticas import variacao_doador
+from .models import Doacao, Doador, EstatisticaDoadores, IntencaoDeDoar, Orgao
+from .orgaos import REGISTRO_ORGAOS
+
+# Mantém os índices do motor de compatibilidade atualizados. As atualizações só
+# são aplicadas depois do commit, para que um rollback não deixe o índice inconsistente.
+
+
+def _atualizar_doador(doador_id):
+    transaction.on_commit(lambda: MOTOR_COMPATIBILIDADE.atualizar_doador(doador_id))
+
+
+@receiver(post_save, sender=Doador)
+def doador_salvo(sender, instance, **kwargs):
+    _atualizar_doador(instance.pk)
+
+
+@receiver(post_delete, sender=Doador)
+def doador_removido(sender, instance, **kwargs):
+    doador_id = instance.pk
+    transaction.on_commit(lambda: MOTOR_COMPATIBILIDADE.remover_doador(doador_id))
+
+
+@receiver(post_save, sender=IntencaoDeDoar)
+@receiver(post_delete, sender=IntencaoDeDoar)
+def intencao_alterada(sender, instance, **kwargs):
+    _atualizar_doador(instance.doador_id)
+
+
+@receiver(m2m_changed, sender=IntencaoDeDoar.orgaos.through)
+def orgaos_da_intencao_alterados(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Alteração a partir do órgão: pode afetar muitos doadores
+        transaction.on_commit(MOTOR_COMPATIBILIDADE.invalidar)
+    else:
+        _atualizar_doador(instance.doador_id)
+
+
+@receiver(post_save, sender=Doacao)
+def doacao_registrada(sender, instance, **kwargs):
+    _atualizar_doador(instance.doador_id)  # O órgão doado sai do índice do doador
+
+
+@receiver(post_delete, sender=Orgao)
+def orgao_removido(sender, instance, **kwargs):
+    transaction.on_commit(MOTOR_COMPATIBILIDADE.invalidar)
+
+
+# Estatísticas do painel (EstatisticaDoadores): atualizadas na mesma transação da
+# gravação, de forma síncrona. bulk_create não dispara sinais; o cadastro em lote
+# atualiza as estatísticas em Doador._apos_gravar_lote.
+
+def _valores_estatisticas(doador):
+    return tuple(getattr(doador, campo) for campo in Doador.CAMPOS_ESTATISTICAS)
+
+
+def _intencao_ativa(status):
+    return (status or '').lower() == 'ativa'  # As views gravam 'ativa'; o model usa 'Ativa'
+
+
+def _variacao_orgaos(orgao_ids, quantidade):
+    return Counter({('orgao', str(orgao_id)): quantidade for orgao_id in orgao_ids})
+
+
+@receiver(pre_save, sender=Doador)
+def doador_antes_de_salvar(sender, instance, **kwargs):
+    instance._estatisticas_anteriores = None
+    if not instance._state.adding:
+        instance._estatisticas_anteriores = (
+            Doador.objects.filter(pk=instance.pk).values_list(*Doador.CAMPOS_ESTATISTICAS).first()
+        )
+
+
+@receiver(post_save, sender=Doador)
+def estatisticas_doador_salvo(sender, instance, **kwargs):
+    anterior = getattr(instance, '_estatisticas_anteriores', None)
+    EstatisticaDoadores.aplicar(variacao_doador(anterior, _valores_estatisticas(instance)))
+
+
+@receiver(post_delete, sender=Doador)
+def estatisticas_doador_removido(sender, instance, **kwargs):
+    EstatisticaDoadores.aplicar(variacao_doador(_valores_estatisticas(instance), None))
+
+
+@receiver(pre_save, sender=IntencaoDeDoar)
+def intencao_antes_de_salvar(sender, instance, **kwargs):
+    status = None
+    if not instance._state.adding:
+        status = IntencaoDeDoar.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    instance._ativa_anterior = _intencao_ativa(status)
+
+
+@receiver(post_save, sender=IntencaoDeDoar)
+def estatisticas_intencao_salva(sender, instance, **kwargs):
+    ativa = _intencao_ativa(instance.status)
+    if ativa != getattr(instance, '_ativa_anterior', False):
+        orgao_ids = instance.orgaos.values_list('id', flat=True)
+        EstatisticaDoadores.aplicar(_variacao_orgaos(orgao_ids, 1 if ativa else -1))
+
+
+@receiver(pre_delete, sender=IntencaoDeDoar)
+def estatisticas_intencao_removida(sender, instance, **kwargs):
+    # As ligações com os órgãos são removidas em cascata, sem m2m_changed
+    if _intencao_ativa(instance.status):
+        EstatisticaDoadores.aplicar(_variacao_orgaos(instance.orgaos.values_list('id', flat=True), -1))
+
+
+@receiver(m2m_changed, sender=IntencaoDeDoar.orgaos.through)
+def estatisticas_orgaos_alterados(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Guarda o que será removido: post_clear não informa os ids
+        if reverse:
+            instance._intencoes_ativas_removidas = sum(
+                1 for status in instance.intencaodedoar_set.values_list('status', flat=True) if _intencao_ativa(status)
+            )
+        else:
+            instance._orgaos_removidos = list(instance.orgaos.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    sinal = -1 if action in ('post_remove', 'post_clear') else 1
+    if reverse:
+        # instance é o órgão e pk_set são ids de intenções
+        if action == 'post_clear':
+            quantidade = instance._intencoes_ativas_removidas
+        else:
+            quantidade = sum(
+                1 for status in IntencaoDeDoar.objects.filter(pk__in=pk_set).values_list('status', flat=True)
+                if _intencao_ativa(status)
+            )
+        EstatisticaDoadores.aplicar(Counter({('orgao', str(instance.pk)): sinal * quantidade}))
+    elif _intencao_ativa(instance.status):
+        orgao_ids = instance._orgaos_removidos if action == 'post_clear' else pk_set
+        EstatisticaDoadores.aplicar(_variacao_orgaos(orgao_ids, sinal))
+
+
+@receiver(post_delete, sender=Orgao)
+def estatisticas_orgao_removido(sender, instance, **kwargs):
+    EstatisticaDoadores.objects.filter(dimensao='orgao', valor=str(instance.pk)).delete()
+
+
+# Cache (sndot/cache.py): cada gravação troca a versão dos grupos afetados, depois
+# do commit, para que uma requisição concorrente não guarde de novo os dados antigos.
+
+def _invalidar_cache(*grupos):
+    transaction.on_commit(lambda: invalidar(*grupos))
+
+
+@receiver(post_save, sender=Doador)
+@receiver(post_delete, sender=Doador)
+def cache_doador_alterado(sender, **kwargs):
+    _invalidar_cache('doadores', 'painel')
+
+
+@receiver(post_save, sender=IntencaoDeDoar)
+@receiver(post_delete, sender=IntencaoDeDoar)
+@receiver(m2m_changed, sender=IntencaoDeDoar.orgaos.through)
+def cache_intencao_alterada(sender, **kwargs):
+    _invalidar_cache('doadores', 'painel')  # A API de doadores inclui a intenção
+
+
+@receiver(post_save, sender=Orgao)
+@receiver(post_delete, sender=Orgao)
+def cache_orgao_alterado(sender, **kwargs):
+    _invalidar_cache('painel')
+
+
+# Catálogo de órgãos em memória (orgaos.py): descartado depois do commit de qualquer
+# alteração em Orgao e recarregado no próximo acesso.
+
+@receiver(post_save, sender=Orgao)
+@receiver(post_delete, sender=Orgao)
+def registro_orgao_alterado(sender, **kwargs):
+    transaction.on_commit(REGISTRO_ORGAOS.invalidar)
@@ -1,3 +1,942 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.messages import get_messages
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .cache import invalidar, obter_ou_calcular, versao
+from .busca import buscar_doadores
+from .compatibilidade import MOTOR_COMPATIBILIDADE
+from .doacoes import registrar_doacao
+from .exportacao import COLUNAS_CSV, gerar_exportacao
+from .leitor_json import ler_registros
+from .localidades import ESTADOS_CIDADES_VERSAO, MUNICIPIOS
+from . import models as sndot_models
+from .metricas import percentil
+from .models import (
+    MENSAGEM_CPF_INVALIDO, MENSAGEM_CPF_NAO_NUMERICO, Doacao, Doador, EstatisticaDoadores, ImportacaoDoadores,
+    IntencaoDeDoar, Orgao, PulsoReplicacao, Receptor, ResumoMensalDoacoes, validar_cpf, validar_cpfs,
+)
+from .orgaos import REGISTRO_ORGAOS
+from .paginacao import PaginadorKeyset, codificar_cursor
+from .replicas import MONITOR_REPLICAS, MonitorReplicas, RoteadorReplicas, usar_replicas
+from .validador import VALIDADOR_SEGURANCA, ValidadorScriptInjection, ValidadorSQLInjection, ValidadorXSS
 
-# Create your tests here.
+
+def gerar_cpf(numero):
+    """CPF válido (só dígitos) a partir dos 9 primeiros dígitos de `numero`."""
+    digitos = [int(c) for c in f'{numero:09d}'[:9]]
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        resto = sum(d * p for d, p in zip(digitos, pesos)) % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    return ''.join(map(str, digitos))
+
+
+def dados_pessoa(numero, **extras):
+    """Registro "dados" do JSON de importação (formato de dados_json/potenciais_doadores.json)."""
+    return {
+        'nome': 'Maria Silva',
+        'sexo': 'F',
+        'data_nascimento': '10/05/1980',
+        'cidade_natal': 'Campinas',
+        'estado_natal': 'SP',
+        'cpf': gerar_cpf(numero),
+        'profissao': 'Professora',
+        'cidade_residencia': 'Campinas',
+        'estado_residencia': 'SP',
+        'estado_civil': 'Casado',
+        **extras,
+    }
+
+
+def dados_doador(numero, **extras):
+    """Campos de um doador válido, já convertidos (como em cadastrar e cadastrar_em_lote)."""
+    return {
+        'nome': 'Maria Silva', 'idade': 44, 'sexo': 'F', 'data_nascimento': date(1980, 5, 10),
+        'cidade_natal': 'Campinas', 'estado_natal': 'SP', 'cpf': gerar_cpf(numero), 'profissao': 'Professora',
+        'cidade_residencia': 'Campinas', 'estado_residencia': 'SP', 'estado_civil': 'Casado',
+        'contato_emergencia': '(19) 99999-0000', 'tipo_sanguineo': 'O-', **extras,
+    }
+
+
+def criar_doador(numero, **extras):
+    """Grava um doador válido (com save(), disparando os sinais)."""
+    return Doador.objects.create(**dados_doador(numero, **extras))
+
+
+def criar_intencao(doador, *orgaos, **extras):
+    intencao = IntencaoDeDoar.objects.create(doador=doador, **{'status': 'Ativa', **extras})
+    intencao.orgaos.set(orgaos)
+    return intencao
+
+
+def criar_receptor(numero, orgao, **extras):
+    return Receptor.objects.create(**{
+        'nome': 'Joao Souza', 'idade': 50, 'sexo': 'M', 'data_nascimento': date(1974, 3, 2),
+        'cidade_natal': 'Santos', 'estado_natal': 'SP', 'cpf': gerar_cpf(numero), 'cidade_residencia': 'Santos',
+        'estado_residencia': 'SP', 'tipo_sanguineo': 'A+', 'orgao': orgao, **extras,
+    })
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TesteSndot(TestCase):
+    """
+    Base dos testes: cache em memória (o backend padrão, em arquivo, é o do servidor
+    de desenvolvimento) e os caches do processo (cache do Django, catálogo de
+    órgãos, índice de compatibilidade) descartados a cada teste, já que o TestCase
+    não faz commit e os sinais que os invalidam rodam em transaction.on_commit.
+    """
+
+    def setUp(self):
+        cache.clear()
+        REGISTRO_ORGAOS.invalidar()
+        MOTOR_COMPATIBILIDADE.invalidar()
+        self.addCleanup(REGISTRO_ORGAOS.invalidar)
+        self.addCleanup(MOTOR_COMPATIBILIDADE.invalidar)
+
+    def arquivo_json(self, registros):
+        """
+        Grava os registros em um arquivo JSON, em um diretório temporário removido
+        ao final do teste (com os arquivos criados ao lado dele, ex.: log e checkpoint).
+        """
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        caminho = os.path.join(diretorio, 'registros.json')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(registros, f)
+        return caminho
+
+
+class CadastroEmLoteTest(TesteSndot):
+
+    def test_upsert_pelo_cpf(self):
+        existente = criar_doador(1, nome='Nome Antigo')
+        lote = [
+            dados_doador(1, nome='Nome Novo'),
+            dados_doador(2, nome='Primeira Versao'),
+            dados_doador(3, cpf='12345678900'),
+            dados_doador(2, nome='Segunda Versao'),
+        ]
+
+        # Validação em memória, leitura dos CPFs existentes e um único INSERT ... ON CONFLICT
+        # (mais as estatísticas), qualquer que seja o tamanho do lote
+        with self.captureOnCommitCallbacks():
+            resultados = Doador.cadastrar_em_lote(lote)
+
+        self.assertEqual([(criado, erros is None) for _, criado, erros in resultados],
+                         [(False, True), (True, True), (False, False), (False, True)])
+        self.assertIn('cpf', resultados[2][2])
+        self.assertEqual(resultados[0][0].pk, existente.pk)
+        self.assertEqual(resultados[1][0].pk, resultados[3][0].pk)
+        self.assertEqual(
+            dict(Doador.objects.values_list('cpf', 'nome')),
+            {gerar_cpf(1): 'Nome Novo', gerar_cpf(2): 'Segunda Versao'},
+        )
+        self.assertEqual(Doador.objects.get(cpf=gerar_cpf(2)).nome_normalizado, 'segunda versao')
+
+    def test_consultas_nao_crescem_com_o_lote(self):
+        def consultas(quantidade, inicio):
+            lote = [dados_doador(numero) for numero in range(inicio, inicio + quantidade)]
+            with self.captureOnCommitCallbacks(), CaptureQueriesContext(connection) as contexto:
+                Doador.cadastrar_em_lote(lote)
+            return len(contexto)
+
+        consultas(1, 1)  # Cria as linhas de EstatisticaDoadores, que depois só são atualizadas
+        self.assertEqual(consultas(2, 10), consultas(20, 100))
+
+
+class LeitorJsonTest(TestCase):
+
+    REGISTROS = [
+        {'dados': {'nome': 'João [Filho]', 'profissao': 'Médico, "clínico"'}},
+        {'dados': {'nome': 'Ana'}, 'intencao': {'status': 's', 'orgaos_id': [1, 2]}},
+    ]
+
+    def test_array_lido_em_blocos_pequenos(self):
+        # Blocos de 3 bytes cortam strings, escapes e caracteres acentuados (multibyte) ao meio
+        conteudo = ('\ufeff' + json.dumps(self.REGISTROS, ensure_ascii=False, indent=2)).encode('utf-8')
+        self.assertEqual(list(ler_registros(BytesIO(conteudo), tamanho_bloco=3)), self.REGISTROS)
+
+    def test_json_lines(self):
+        conteudo = '\n'.join(json.dumps(registro, ensure_ascii=False) for registro in self.REGISTROS) + '\n\n'
+        self.assertEqual(list(ler_registros(BytesIO(conteudo.encode('utf-8')), tamanho_bloco=5)), self.REGISTROS)
+        self.assertEqual(list(ler_registros(BytesIO(b'  '))), [])
+
+    def test_json_invalido(self):
+        registros = ler_registros(BytesIO(b'[{"dados": {}}, {"dados": }]'), tamanho_bloco=4)
+        self.assertEqual(next(registros), {'dados': {}})
+        with self.assertRaises(json.JSONDecodeError):
+            next(registros)
+
+
+class ValidadorSegurancaTest(TestCase):
+
+    VALORES = [
+        'Maria da Silva', 'Rua das Flores, 10', '<b>negrito</b>', '<script>alert(1)</script>',
+        "x' or 1=1", 'drop table sndot_doador', 'select nome from sndot_doador', 'Analista -- sênior ',
+    ]
+
+    def erro(self, validador, valor):
+        try:
+            validador.validar(valor, 'profissao')
+        except ValidationError as e:
+            return e.messages
+        return None
+
+    def test_mesmo_resultado_da_cadeia_original(self):
+        # Como era montada em Doador.clean: cada validador chama o próximo antes da própria regra (XSS primeiro)
+        cadeia = ValidadorSQLInjection(ValidadorScriptInjection(ValidadorXSS()))
+        for valor in self.VALORES:
+            with self.subTest(valor=valor):
+                self.assertEqual(self.erro(VALIDADOR_SEGURANCA, valor), self.erro(cadeia, valor))
+        self.assertIsNone(self.erro(VALIDADOR_SEGURANCA, 'Maria da Silva'))
+        self.assertIsNotNone(self.erro(VALIDADOR_SEGURANCA, '<b>negrito</b>'))
+
+
+class ValidacaoCpfsTest(TestCase):
+
+    CPFS = [gerar_cpf(1), '529.982.247-25', '52998224724', '123', '', 'abc']
+
+    def test_mesmo_resultado_com_e_sem_numpy(self):
+        esperado = [
+            None, None, MENSAGEM_CPF_INVALIDO, MENSAGEM_CPF_INVALIDO,
+            MENSAGEM_CPF_NAO_NUMERICO, MENSAGEM_CPF_NAO_NUMERICO,
+        ]
+        for numpy in (sndot_models.np, None):
+            with self.subTest(numpy=numpy is not None), mock.patch('sndot.models.np', numpy):
+                mascara, erros = validar_cpfs(self.CPFS)
+                self.assertEqual(erros, esperado)
+                self.assertEqual(mascara, [erro is None for erro in esperado])
+
+    def test_digitos_nao_ascii(self):
+        # '²' passa em str.isdigit, mas não em int(): o CPF é rejeitado, sem ValueError
+        for numpy in (sndot_models.np, None):
+            with self.subTest(numpy=numpy is not None), mock.patch('sndot.models.np', numpy):
+                _, erros = validar_cpfs(['1114447773²', '²²²'])
+                self.assertEqual(erros, [MENSAGEM_CPF_INVALIDO, MENSAGEM_CPF_NAO_NUMERICO])
+        with self.assertRaisesMessage(ValidationError, MENSAGEM_CPF_INVALIDO):
+            validar_cpf('1114447773²')
+
+        resultados = Doador.cadastrar_em_lote([dados_doador(1, cpf='1114447773²'), dados_doador(2)])
+        self.assertIn('cpf', resultados[0][2])
+        self.assertTrue(resultados[1][1])  # O restante do lote é gravado
+
+
+class PaginacaoKeysetTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        # Nomes repetidos: o desempate pelo id não pode pular nem repetir registros
+        for numero, nome in enumerate(['Ana', 'Bruno', 'Bruno', 'Bruno', 'Carla', 'Davi', 'Elisa'], 1):
+            criar_doador(numero, nome=nome)
+        self.ordem = list(Doador.objects.order_by('nome', 'id').values_list('id', flat=True))
+        self.paginador = PaginadorKeyset(Doador.objects.values('id', 'nome'), por_pagina=3)
+
+    def ids(self, pagina):
+        return [doador['id'] for doador in pagina]
+
+    def test_avanca_e_volta_pelos_cursores(self):
+        primeira = self.paginador.pagina()
+        segunda = self.paginador.pagina(primeira.next_cursor)
+        terceira = self.paginador.pagina(segunda.next_cursor)
+
+        self.assertEqual(self.ids(primeira) + self.ids(segunda) + self.ids(terceira), self.ordem)
+        self.assertEqual((primeira.has_previous, primeira.has_next), (False, True))
+        self.assertEqual((terceira.has_previous, terceira.has_next), (True, False))
+        self.assertEqual(self.ids(self.paginador.pagina(terceira.previous_cursor)), self.ids(segunda))
+        self.assertEqual(self.ids(self.paginador.pagina(segunda.previous_cursor)), self.ids(primeira))
+
+    def test_ultima_pagina_e_cursor_invalido(self):
+        ultima = self.paginador.pagina(PaginadorKeyset.CURSOR_ULTIMA)
+        self.assertEqual(self.ids(ultima), self.ordem[-3:])
+        self.assertEqual((ultima.has_previous, ultima.has_next), (True, False))
+        self.assertEqual(self.ids(self.paginador.pagina('nao-e-um-cursor')), self.ordem[:3])
+
+    def test_cursor_alterado_volta_para_a_primeira_pagina(self):
+        # Tokens que decodificam para um JSON, mas sem uma chave (valor, id) válida
+        for dados in ({}, {'d': 'proxima'}, {'d': 'proxima', 'v': 'Bruno'}, {'d': 'anterior', 'v': 1},
+                      {'d': 'proxima', 'v': ['Bruno'], 'id': 1}, {'d': 'anterior', 'v': 'Bruno', 'id': '2'}):
+            with self.subTest(dados=dados):
+                self.assertEqual(self.ids(self.paginador.pagina(codificar_cursor(dados))), self.ordem[:3])
+
+        # Valor que não é uma data para um cursor sobre DateTimeField: também a primeira página
+        doacoes = PaginadorKeyset(Doacao.objects.all(), por_pagina=3, campo='data', decrescente=True)
+        self.assertEqual(list(doacoes.pagina(codificar_cursor({'d': 'proxima', 'v': 'ontem', 'id': 1}))), [])
+        resposta = self.client.get(reverse('listar_doadores'), {'cursor': codificar_cursor({'d': 'proxima', 'v': 1})})
+        self.assertEqual(self.ids(resposta.context['page_obj']), self.ordem[:5])
+
+    def test_listagem_sem_count_nem_offset(self):
+        primeira = self.paginador.pagina()
+        self.client.get(reverse('listar_doadores'))  # Guarda no cache a contagem aproximada do total
+        with self.assertNumQueries(1) as consultas:
+            resposta = self.client.get(reverse('listar_doadores'), {'cursor': primeira.next_cursor})
+        self.assertEqual(self.ids(resposta.context['page_obj']), self.ordem[3:])
+        sql = consultas.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+class BuscaDoadoresTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.maria = criar_doador(1, nome='Maria da Silva', tipo_sanguineo='A+')
+        self.joao = criar_doador(2, nome='João Silveira', estado_residencia='RJ', cidade_residencia='Niterói')
+        self.ana = criar_doador(3, nome='Ana Souza', cpf='529.982.247-25')
+
+    def buscar(self, **filtros):
+        return set(buscar_doadores(**filtros))
+
+    def test_nome_por_prefixo_de_palavra_sem_acentos(self):
+        self.assertEqual(self.buscar(nome='sil'), {self.maria, self.joao})
+        self.assertEqual(self.buscar(nome='JOAO silv'), {self.joao})
+        self.assertEqual(self.buscar(nome='ilva'), set())  # Só prefixos, nunca LIKE '%...%'
+
+    def test_cpf_com_ou_sem_mascara(self):
+        self.assertEqual(self.buscar(cpf='529982'), {self.ana})
+        self.assertEqual(self.buscar(cpf='529.98'), {self.ana})
+        self.assertEqual(self.buscar(cpf=gerar_cpf(2)[:9]), {self.joao})
+
+    def test_filtros_combinados(self):
+        self.assertEqual(self.buscar(nome='silva', tipo_sanguineo='A+'), {self.maria})
+        self.assertEqual(self.buscar(estado='rj', cidade='Niterói'), {self.joao})
+        self.assertEqual(self.buscar(nome='silva', estado='RJ'), set())
+
+    def test_busca_no_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        url = reverse('admin:sndot_doador_changelist')
+        self.assertContains(self.client.get(url, {'q': gerar_cpf(2)[:9]}), 'João Silveira')
+        resposta = self.client.get(url, {'q': 'silv'})
+        self.assertContains(resposta, 'Maria da Silva')
+        self.assertNotContains(resposta, 'Ana Souza')
+
+
+class DoadorAdminTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        self.rim, self.figado = Orgao.objects.create(nome='Rim'), Orgao.objects.create(nome='Fígado')
+
+    def consultas_changelist(self):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(reverse('admin:sndot_doador_changelist'))
+        self.assertEqual(resposta.status_code, 200)
+        return len(contexto)
+
+    def test_consultas_nao_dependem_da_quantidade_de_doadores(self):
+        criar_intencao(criar_doador(1), self.rim)
+        self.consultas_changelist()  # Sessão e catálogos carregados
+        uma = self.consultas_changelist()
+
+        for numero in range(2, 10):
+            criar_intencao(criar_doador(numero), self.rim, self.figado)
+        self.assertEqual(self.consultas_changelist(), uma)
+
+
+class EstadosCidadesTest(TestCase):
+
+    def test_url_versionada_com_etag(self):
+        resposta = self.client.get(reverse('estados_cidades'), {'v': ESTADOS_CIDADES_VERSAO})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('immutable', resposta['Cache-Control'])
+        self.assertIn('Niterói', resposta.json()['RJ'])
+
+        revalidacao = self.client.get(reverse('estados_cidades'), HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(revalidacao.status_code, 304)
+        self.assertEqual(revalidacao.content, b'')
+
+    def test_formulario_usa_a_url_versionada(self):
+        resposta = self.client.get(reverse('cadastrar_doador'))
+        self.assertContains(resposta, f'v={ESTADOS_CIDADES_VERSAO}')
+
+
+class MunicipiosTest(TestCase):
+
+    def test_nome_oficial_sem_acentos_e_maiusculas(self):
+        self.assertEqual(MUNICIPIOS.nome_oficial('sp', 'SAO PAULO'), 'São Paulo')
+        self.assertTrue(MUNICIPIOS.existe('RJ', 'niteroi'))
+        self.assertIsNone(MUNICIPIOS.nome_oficial('RJ', 'São Paulo'))
+
+    def test_autocompletar_por_prefixo(self):
+        resultados = MUNICIPIOS.autocompletar('sao pau', uf='SP')
+        self.assertIn('São Paulo', [municipio['nome'] for municipio in resultados])
+        self.assertTrue(all(municipio['uf'] == 'SP' for municipio in resultados))
+        self.assertEqual(len(MUNICIPIOS.autocompletar('sa', limite=3)), 3)
+
+        resposta = self.client.get(reverse('autocompletar_municipios'), {'q': 'niter', 'uf': 'rj'})
+        self.assertEqual([m['nome'] for m in resposta.json()['resultados']], ['Niterói'])
+
+
+class RegistroDoacoesTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.rim, self.figado = Orgao.objects.create(nome='Rim'), Orgao.objects.create(nome='Fígado')
+        self.doador = criar_doador(1)
+        self.intencao = criar_intencao(self.doador, self.rim, self.figado)
+
+    def test_orgao_destinado_uma_unica_vez_e_intencao_concluida(self):
+        receptores = [criar_receptor(numero, self.rim) for numero in (2, 3)]
+        receptor_figado = criar_receptor(4, self.figado)
+
+        _, erros = registrar_doacao(self.doador, self.rim, receptores[0], data=datetime(2025, 3, 10, tzinfo=dt_timezone.utc))
+        self.assertIsNone(erros)
+        _, erros = registrar_doacao(self.doador, self.rim, receptores[1])
+        self.assertIn('orgao', erros)
+        _, erros = registrar_doacao(self.doador, self.figado, receptores[0])
+        self.assertIn('receptor', erros)  # Já transplantado
+
+        self.intencao.refresh_from_db()
+        self.assertEqual(self.intencao.status, 'Ativa')
+        _, erros = registrar_doacao(self.doador, self.figado, receptor_figado, data=datetime(2025, 4, 2, tzinfo=dt_timezone.utc))
+        self.assertIsNone(erros)
+        self.intencao.refresh_from_db()
+        self.assertEqual(self.intencao.status, 'Concluída')
+        self.assertEqual(Doacao.objects.count(), 2)
+
+    def test_doacao_nao_e_alterada_nem_removida(self):
+        doacao, _ = registrar_doacao(self.doador, self.rim, criar_receptor(2, self.rim))
+        doacao.data = timezone.now()
+        with self.assertRaises(ValidationError):
+            doacao.save()
+        with self.assertRaises(ValidationError):
+            doacao.delete()
+
+    def test_resumo_mensal_igual_ao_recalculado(self):
+        for numero, (orgao, data) in enumerate([
+            (self.rim, datetime(2025, 3, 10, tzinfo=dt_timezone.utc)),
+            (self.figado, datetime(2025, 3, 20, tzinfo=dt_timezone.utc)),
+        ], 2):
+            _, erros = registrar_doacao(self.doador, orgao, criar_receptor(numero, orgao), data=data)
+            self.assertIsNone(erros)
+        incremental = set(ResumoMensalDoacoes.objects.values_list('mes', 'orgao_id', 'total'))
+
+        call_command('recalcular_resumo_doacoes', stdout=StringIO())
+
+        self.assertEqual(incremental, {(date(2025, 3, 1), self.rim.pk, 1), (date(2025, 3, 1), self.figado.pk, 1)})
+        self.assertEqual(set(ResumoMensalDoacoes.objects.values_list('mes', 'orgao_id', 'total')), incremental)
+        resposta = self.client.get(reverse('visualizar_historico_doacoes'), {'orgao': self.figado.pk})
+        self.assertEqual([d.orgao for d in resposta.context['page_obj']], [self.figado])
+
+
+class RegistroOrgaosTest(TesteSndot):
+
+    def test_uma_consulta_para_todas_as_buscas(self):
+        rim = Orgao.objects.create(nome='Rim')
+        with self.assertNumQueries(1):
+            self.assertEqual(REGISTRO_ORGAOS.por_id(rim.pk), rim)
+            self.assertEqual(REGISTRO_ORGAOS.por_id(str(rim.pk)), rim)
+            self.assertEqual(REGISTRO_ORGAOS.por_nome('Rim'), rim)
+            self.assertIsNone(REGISTRO_ORGAOS.por_id('x'))
+            self.assertEqual(REGISTRO_ORGAOS.choices(), [(rim.pk, 'Rim')])
+
+    def test_recarregado_depois_de_salvar_um_orgao(self):
+        self.assertEqual(REGISTRO_ORGAOS.todos(), ())
+        with self.captureOnCommitCallbacks(execute=True):
+            coracao = Orgao.objects.create(nome='Coração')
+        self.assertEqual(REGISTRO_ORGAOS.todos(), (coracao,))
+
+
+class ViewsAssincronasTest(TesteSndot):
+
+    async def test_listagem_e_edicao_pelo_cliente_assincrono(self):
+        doador = await sync_to_async(criar_doador)(1, nome='Maria da Silva')
+        resposta = await self.async_client.get(reverse('listar_doadores'))
+        self.assertContains(resposta, 'Maria da Silva')
+        resposta = await self.async_client.get(reverse('editar_doador', args=[doador.pk]))
+        self.assertEqual(resposta.context['doador'].pk, doador.pk)
+        resposta = await self.async_client.get(reverse('editar_doador', args=[doador.pk + 1]))
+        self.assertEqual(resposta.status_code, 404)
+
+    async def test_delecao_pelo_cliente_assincrono(self):
+        doador = await sync_to_async(criar_doador)(1)
+        resposta = await self.async_client.post(reverse('deletar_doador', args=[doador.pk]))
+        self.assertRedirects(resposta, reverse('listar_doadores'), fetch_redirect_response=False)
+        self.assertFalse(await Doador.objects.filter(pk=doador.pk).aexists())
+
+
+class ExportacaoTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.rim, self.figado = Orgao.objects.create(nome='Rim'), Orgao.objects.create(nome='Fígado')
+        for numero in range(1, 6):
+            doador = criar_doador(numero, nome=f'Doador {numero}')
+            if numero % 2:
+                criar_intencao(doador, self.rim, self.figado, doar_agora=True)
+
+    def test_jsonl_em_blocos_com_consultas_constantes_por_bloco(self):
+        REGISTRO_ORGAOS.todos()
+        # 3 blocos de até 2 doadores: uma consulta (cursor) para os doadores e uma por bloco para os órgãos
+        with self.assertNumQueries(4):
+            partes = list(gerar_exportacao('jsonl', queryset=Doador.objects.all(), tamanho_bloco=2))
+
+        self.assertEqual(len(partes), 3)
+        linhas = [json.loads(linha) for linha in b''.join(partes).decode('utf-8').splitlines()]
+        self.assertEqual([linha['nome'] for linha in linhas], [f'Doador {numero}' for numero in range(1, 6)])
+        self.assertEqual(linhas[0]['intencao'], {'status': 'Ativa', 'doar_agora': True, 'orgaos': ['Fígado', 'Rim']})
+        self.assertIsNone(linhas[1]['intencao'])
+
+    def test_csv_comprimido_pela_view(self):
+        self.client.force_login(User.objects.create_user('equipe', password='x', is_staff=True))
+
+        resposta = self.client.get(reverse('exportar_doadores'), {'formato': 'csv', 'gzip': '1'})
+
+        self.assertTrue(resposta.streaming)
+        self.assertEqual(resposta['Content-Type'], 'application/gzip')
+        linhas = list(csv.reader(gzip.decompress(b''.join(resposta.streaming_content)).decode('utf-8').splitlines()))
+        self.assertEqual(tuple(linhas[0]), COLUNAS_CSV)
+        self.assertEqual(len(linhas), 6)
+        self.assertEqual(linhas[1][-3:], ['Ativa', '1', 'Fígado|Rim'])
+        self.assertEqual(linhas[2][-3:], ['', '', ''])
+
+    def test_formato_invalido(self):
+        self.client.force_login(User.objects.create_user('equipe', password='x', is_staff=True))
+        self.assertEqual(self.client.get(reverse('exportar_doadores'), {'formato': 'xml'}).status_code, 400)
+
+
+class ImportacaoReceptoresTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.rim = Orgao.objects.create(nome='Rim')
+
+    def test_reimportar_receptor_transplantado_mantem_status_e_data_de_inclusao(self):
+        data_inclusao = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        receptor = Receptor.objects.create(
+            nome='Maria Silva', idade=44, sexo='F', data_nascimento=date(1980, 5, 10),
+            cidade_natal='Campinas', estado_natal='SP', cpf=gerar_cpf(1), cidade_residencia='Campinas',
+            estado_residencia='SP', tipo_sanguineo='A+', orgao=self.rim, urgencia=1,
+            data_inclusao=data_inclusao, status='Transplantado',
+        )
+        caminho = self.arquivo_json([
+            {'dados': dados_pessoa(1, tipo_sanguineo='A+', orgao='Rim', urgencia=3)},
+            {'dados': dados_pessoa(2, tipo_sanguineo='O-', orgao='Rim')},
+        ])
+
+        call_command('import_receptores', caminho, stdout=StringIO())
+
+        receptor.refresh_from_db()
+        self.assertEqual(receptor.status, 'Transplantado')
+        self.assertEqual(receptor.data_inclusao, data_inclusao)
+        self.assertEqual(receptor.urgencia, 3)  # Os demais campos são atualizados
+        novo = Receptor.objects.get(cpf=gerar_cpf(2))
+        self.assertEqual(novo.status, 'Aguardando')
+        self.assertEqual(list(Receptor.objects.fila(self.rim)), [novo])
+
+    def test_receptor_com_script_e_rejeitado(self):
+        caminho = self.arquivo_json([
+            {'dados': dados_pessoa(1, tipo_sanguineo='A+', orgao='Rim', profissao='<script>alert(1)</script>')},
+            {'dados': dados_pessoa(2, tipo_sanguineo='A+', orgao='Rim')},
+        ])
+        saida = StringIO()
+
+        call_command('import_receptores', caminho, stdout=saida)
+
+        self.assertEqual(list(Receptor.objects.values_list('cpf', flat=True)), [gerar_cpf(2)])
+        self.assertIn("Erro ao processar receptor 'Maria Silva'", saida.getvalue())
+
+    def test_retomada_pelo_checkpoint(self):
+        caminho = self.arquivo_json([
+            {'dados': dados_pessoa(numero, tipo_sanguineo='A+', orgao='Rim')} for numero in range(1, 6)
+        ])
+        checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(checkpoint))
+        with open(checkpoint, 'w', encoding='utf-8') as f:
+            json.dump({'registros_processados': 3}, f)
+
+        call_command('import_receptores', caminho, checkpoint=checkpoint, resume=True, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(set(Receptor.objects.values_list('cpf', flat=True)), {gerar_cpf(4), gerar_cpf(5)})
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_cadastrar_receptor_existente_mantem_status_e_data_de_inclusao(self):
+        dados = {
+            'nome': 'Maria Silva', 'idade': 44, 'sexo': 'F', 'data_nascimento': date(1980, 5, 10),
+            'cidade_natal': 'Campinas', 'estado_natal': 'SP', 'cpf': gerar_cpf(1), 'cidade_residencia': 'Campinas',
+            'estado_residencia': 'SP', 'tipo_sanguineo': 'A+', 'orgao_id': self.rim.pk,
+        }
+        receptor, criado, erros = Receptor.cadastrar(dict(dados))
+        self.assertTrue(criado)
+        self.assertIsNone(erros)
+        Receptor.objects.filter(pk=receptor.pk).update(status='Transplantado')
+
+        novo_dados = {**dados, 'urgencia': 4, 'status': 'Aguardando', 'data_inclusao': datetime.now(dt_timezone.utc)}
+        _, criado, erros = Receptor.cadastrar(novo_dados)
+        self.assertFalse(criado)
+        self.assertIsNone(erros)
+        atualizado = Receptor.objects.get(pk=receptor.pk)
+        self.assertEqual((atualizado.status, atualizado.urgencia), ('Transplantado', 4))
+        self.assertEqual(atualizado.data_inclusao, receptor.data_inclusao)
+
+
+class RemocaoDoadorTest(TesteSndot):
+
+    def test_doador_com_doacao_nao_e_deletado(self):
+        rim = Orgao.objects.create(nome='Rim')
+        doador = criar_doador(1)
+        Doacao.objects.create(doador=doador, receptor=criar_receptor(2, rim), orgao=rim)
+
+        resposta = self.client.post(reverse('deletar_doador', args=[doador.pk]))
+
+        self.assertRedirects(resposta, reverse('editar_doador', args=[doador.pk]), fetch_redirect_response=False)
+        self.assertTrue(Doador.objects.filter(pk=doador.pk).exists())
+        self.assertIn('doações registradas', [str(m) for m in get_messages(resposta.wsgi_request)][0])
+
+    def test_doador_sem_doacao_e_deletado(self):
+        doador = criar_doador(1)
+        resposta = self.client.post(reverse('deletar_doador', args=[doador.pk]))
+        self.assertRedirects(resposta, reverse('listar_doadores'), fetch_redirect_response=False)
+        self.assertFalse(Doador.objects.filter(pk=doador.pk).exists())
+
+
+@override_settings(SNDOT_API_TOKENS=['segredo'])
+class ApiDoadoresTest(TesteSndot):
+    AUTORIZACAO = {'HTTP_AUTHORIZATION': 'Bearer segredo'}
+
+    def lote(self, metodo, corpo, **cabecalhos):
+        return getattr(self.client, metodo)(
+            reverse('doadores_em_lote_json'), json.dumps(corpo), content_type='application/json',
+            **{**self.AUTORIZACAO, **cabecalhos},
+        )
+
+    def test_gravacao_exige_token(self):
+        doador = criar_doador(1)
+        for cabecalhos in ({'HTTP_AUTHORIZATION': ''}, {'HTTP_AUTHORIZATION': 'Bearer errado'}):
+            resposta = self.lote('delete', {'ids': [doador.pk]}, **cabecalhos)
+            self.assertEqual(resposta.status_code, 401)
+        self.assertTrue(Doador.objects.filter(pk=doador.pk).exists())
+
+    def test_selecao_de_campos(self):
+        rim = Orgao.objects.create(nome='Rim')
+        doador = criar_doador(1)
+        intencao = IntencaoDeDoar.objects.create(doador=doador, status='ativa', doar_agora=True)
+        intencao.orgaos.set([rim])
+
+        resposta = self.client.get(reverse('listar_doadores_json'), {'fields': 'nome,intencao'})
+        self.assertEqual(resposta.json()['resultados'], [
+            {'nome': 'Maria Silva', 'intencao': {'status': 'ativa', 'doar_agora': True, 'orgaos': [rim.pk]}},
+        ])
+        resposta = self.client.get(reverse('detalhar_doador_json', args=[doador.pk]), {'fields': 'cpf,senha'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_etag_muda_com_gravacao_sem_invalidar_o_cache(self):
+        # No TestCase as invalidações do cache (on_commit) não rodam: é o mesmo que uma
+        # gravação feita por outro processo, que não troca a versão do cache deste
+        doador = criar_doador(1)
+        url = reverse('listar_doadores_json')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        doador.nome = 'Ana Lima'
+        doador.save()
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertEqual(resposta.json()['resultados'][0]['nome'], 'Ana Lima')
+
+    def test_etag_sem_count_e_alterado_pela_remocao(self):
+        primeiro, _ = criar_doador(1), criar_doador(2)
+        url = reverse('listar_doadores_json')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2) as consultas:  # Um MAX(atualizado_em) por tabela
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for consulta in consultas.captured_queries:
+            self.assertNotIn('COUNT(', consulta['sql'].upper())
+
+        # A remoção do primeiro não muda nenhum MAX: o ETag muda pela versão do cache
+        with self.captureOnCommitCallbacks(execute=True):
+            primeiro.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_remocao_em_lote_tudo_ou_nada(self):
+        rim = Orgao.objects.create(nome='Rim')
+        com_doacao, sem_doacao = criar_doador(1), criar_doador(2)
+        Doacao.objects.create(doador=com_doacao, receptor=criar_receptor(3, rim), orgao=rim)
+
+        resposta = self.lote('delete', {'ids': [sem_doacao.pk, com_doacao.pk]})
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['erros'], [
+            {'indice': 1, 'erros': {'id': ['Doador com doações registradas não pode ser removido.']}},
+        ])
+        self.assertEqual(Doador.objects.count(), 2)
+
+        resposta = self.lote('delete', {'ids': [sem_doacao.pk]})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['resultados'], [{'id': sem_doacao.pk}])
+        self.assertEqual(list(Doador.objects.values_list('pk', flat=True)), [com_doacao.pk])
+
+    def test_cadastro_em_lote_tudo_ou_nada(self):
+        valido = dados_pessoa(1, contato_emergencia='(19) 3333-0000', tipo_sanguineo='A+', data_nascimento='1980-05-10')
+        invalido = {**valido, 'cpf': gerar_cpf(2), 'nome': '<b>Maria</b>'}
+
+        resposta = self.lote('post', {'doadores': [valido, invalido]})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual([erro['indice'] for erro in resposta.json()['erros']], [1])
+        self.assertFalse(Doador.objects.exists())
+
+        resposta = self.lote('post', {'doadores': [valido]})
+        self.assertEqual(resposta.status_code, 201)
+        doador = Doador.objects.get()
+        self.assertEqual(resposta.json()['resultados'], [{'id': doador.pk, 'cpf': gerar_cpf(1)}])
+        self.assertGreaterEqual(doador.idade, 44)  # Calculada pela data de nascimento
+
+
+class CacheCompartilhadoTest(TesteSndot):
+
+    def test_invalidacao_de_outro_processo_com_o_backend_padrao(self):
+        from django.core.cache.backends.filebased import FileBasedCache
+        from .cache import invalidar, obter_ou_calcular
+
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio}
+        with override_settings(CACHES={'default': configuracao}):
+            self.assertEqual(obter_ou_calcular('doadores', ('pagina',), lambda: 'antiga'), 'antiga')
+            self.assertEqual(obter_ou_calcular('doadores', ('pagina',), lambda: 'nova'), 'antiga')
+
+            # Outro processo (ex.: o worker de importações) invalida o grupo no mesmo diretório
+            outro_processo = FileBasedCache(diretorio, {})
+            with mock.patch('sndot.cache.cache', outro_processo):
+                invalidar('doadores')
+
+            self.assertEqual(obter_ou_calcular('doadores', ('pagina',), lambda: 'nova'), 'nova')
+
+
+class PercentilTest(TestCase):
+
+    def test_posto_mais_proximo(self):
+        valores = list(range(1, 101))
+        self.assertEqual([percentil(valores, p) for p in (1, 7, 50, 95, 99, 100)], [1, 7, 50, 95, 99, 100])
+        self.assertEqual([percentil([10, 20, 30], p) for p in (0, 50, 95)], [10, 20, 30])
+        self.assertEqual(percentil([], 99), 0)
+
+
+class ImportacaoDoadoresTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.rim = Orgao.objects.create(nome='Rim')
+
+    def registros(self, quantidade, inicio=1):
+        return [
+            {
+                'dados': dados_pessoa(numero, contato_emergencia='(19) 3333-0000', tipo_sanguineo='A+'),
+                'intencao': {'status': 's', 'orgaos_id': [self.rim.pk]},
+            }
+            for numero in range(inicio, inicio + quantidade)
+        ]
+
+    def test_validacao_em_processos_usa_o_catalogo_do_processo_principal(self):
+        caminho = self.arquivo_json(self.registros(6))
+        with mock.patch('sndot.importacao.connections.close_all') as fechar:
+            call_command('import_doadores', caminho, workers=2, batch_size=2, stdout=StringIO())
+        fechar.assert_called_once()  # Antes de criar o pool
+        self.assertEqual(Doador.objects.count(), 6)
+        self.assertEqual(IntencaoDeDoar.orgaos.through.objects.filter(orgao=self.rim).count(), 6)
+
+    def test_catalogo_preenchido_nao_consulta_o_banco(self):
+        REGISTRO_ORGAOS.preencher([self.rim])
+        with self.assertNumQueries(0), mock.patch('time.monotonic', return_value=10 ** 9):
+            self.assertEqual(REGISTRO_ORGAOS.por_id(self.rim.pk), self.rim)
+            self.assertEqual(REGISTRO_ORGAOS.ids_por_nome(), {'Rim': self.rim.pk})
+
+
+class CompatibilidadeTest(TesteSndot):
+
+    def setUp(self):
+        super().setUp()
+        self.rim = Orgao.objects.create(nome='Rim')
+        self.figado = Orgao.objects.create(nome='Fígado')
+
+    def test_orgao_doado_sai_do_indice(self):
+        doador = criar_doador(1)
+        criar_intencao(doador, self.rim, self.figado)
+        receptor = criar_receptor(2, self.rim)
+        self.assertEqual([d.doador_id for d in MOTOR_COMPATIBILIDADE.para_receptor(receptor)], [doador.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            _, erros = registrar_doacao(doador, self.rim, receptor)
+        self.assertIsNone(erros)
+        self.assertTrue(MOTOR_COMPATIBILIDADE.carregado)  # Atualizado pelo sinal, sem remontar
+        self.assertEqual(MOTOR_COMPATIBILIDADE.buscar('A+', self.rim), [])
+        self.assertEqual([d.doador_id for d in MOTOR_COMPATIBILIDADE.buscar('A+', self.figado)], [doador.pk])
+
+    def test_gravacao_em_lote_atualiza_o_indice(self):
+        MOTOR_COMPATIBILIDADE.carregar()
+        with self.captureOnCommitCallbacks(execute=True):
+            resultados = Doador.cadastrar_em_lote([
+                {**dados_doador(1), 'intencao': {'status': 'Ativa', 'doar_agora': True, 'orgaos': [self.rim.pk]}},
+            ])
+        doador = resultados[0][0]
+        with self.assertNumQueries(0):
+            self.assertEqual([d.doador_id for d in MOTOR_COMPATIBILIDADE.buscar('A+', self.rim)], [doador.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Doador.editar_em_lote({doador.pk: {'tipo_sanguineo': 'AB+'}})
+        with self.assertNumQueries(0):
+            self.assertEqual(MOTOR_COMPATIBILIDADE.buscar('A+', self.rim), [])
+
+    def test_doacao_sem_receptor_retira_o_proximo_da_fila(self):
+        doador = criar_doador(1, tipo_sanguineo='A+')
+        criar_intencao(doador, self.rim)
+        incompativel = criar_receptor(2, self.rim, tipo_sanguineo='B+', urgencia=5)
+        proximo = criar_receptor(3, self.rim, urgencia=3)
+        criar_receptor(4, self.rim, urgencia=1)
+
+        doacao, erros = registrar_doacao(doador, self.rim)
+
+        self.assertIsNone(erros)
+        self.assertEqual(doacao.receptor, proximo)
+        proximo.refresh_from_db()
+        incompativel.refresh_from_db()
+        self.assertEqual((proximo.status, incompativel.status), ('Transplantado', 'Aguardando'))
+
+    def test_pagina_de_doadores_compativeis(self):
+        doador = criar_doador(1)
+        criar_intencao(doador, self.rim)
+        receptor = criar_receptor(2, self.rim)
+
+        resposta = self.client.get(reverse('doadores_compativeis', args=[receptor.pk]))
+
+        link = f"{reverse('registrar_doacao')}?cpf_doador={doador.cpf}&orgao={self.rim.pk}&cpf_receptor={receptor.cpf}"
+        self.assertContains(resposta, link)
+        formulario = self.client.get(link).context['form']
+        self.assertEqual(formulario['cpf_receptor'].value(), receptor.cpf)
+
+
+class EstatisticasTest(TesteSndot):
+
+    def cadastrados_hoje(self):
+        linha = EstatisticaDoadores.objects.filter(dimensao='importacao_dia', valor=timezone.localdate().isoformat()).first()
+        return linha.total if linha else 0
+
+    def test_conta_apenas_doadores_novos(self):
+        criar_doador(1)
+        Doador.cadastrar_em_lote([dados_doador(1, idade=45), dados_doador(2), dados_doador(3)])
+        self.assertEqual(self.cadastrados_hoje(), 3)
+
+        Doador.cadastrar_em_lote([dados_doador(2, idade=30), dados_doador(3, idade=31)])
+        Doador.editar_em_lote({Doador.objects.get(cpf=gerar_cpf(1)).pk: {'idade': 50}})
+        Doador.objects.get(cpf=gerar_cpf(3)).delete()
+
+        self.assertEqual(self.cadastrados_hoje(), 3)
+        self.assertEqual(EstatisticaDoadores.objects.get(dimensao='tipo_sanguineo', valor='O-').total, 2)
+
+    def test_painel_pelo_login_do_sndot_admin(self):
+        Doador.cadastrar_em_lote([dados_doador(1)])
+        User.objects.create_user('operador', password='x')  # Sem is_staff
+
+        resposta = self.client.post(reverse('sndot_admin:login'), {'username': 'operador', 'password': 'x'}, follow=True)
+
+        self.assertEqual(resposta.redirect_chain, [(reverse('sndot_admin:painel_admin'), 302)])
+        self.assertContains(resposta, 'Doadores cadastrados por dia')
+
+
+@override_settings(SNDOT_REPLICAS=['default'], SNDOT_REPLICA_ATRASO_MAXIMO=10, SNDOT_REPLICA_FIXAR_SEGUNDOS=5)
+class ReplicasTest(TesteSndot):
+    """O próprio banco de testes faz o papel da réplica ('default' em SNDOT_REPLICAS)."""
+
+    def setUp(self):
+        super().setUp()
+        self.roteador = RoteadorReplicas()
+        # O TestCase roda dentro de uma transação, que fixaria todas as leituras no principal
+        fora_de_transacao = {'default': SimpleNamespace(in_atomic_block=False)}
+        for alvo, valor in (
+            ('sndot.replicas.connections', fora_de_transacao),
+            ('sndot.replicas._ULTIMA_GRAVACAO', None),
+        ):
+            patcher = mock.patch(alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_monitor_so_le_o_pulso(self):
+        monitor = MonitorReplicas()
+        self.assertEqual(monitor._verificar(), [])  # Sem pulso não há como medir o atraso
+        self.assertFalse(PulsoReplicacao.objects.exists())
+
+        antigo = timezone.now() - timedelta(seconds=60)
+        PulsoReplicacao.objects.create(pk=1, atualizado_em=antigo)
+        self.assertEqual(monitor._verificar(), [])  # Pulso parado: comando pulso_replicacao fora do ar
+
+        call_command('pulso_replicacao', once=True)
+        self.assertEqual(monitor._verificar(), ['default'])
+        pulso = PulsoReplicacao.objects.get(pk=1).atualizado_em
+        monitor._verificar()
+        self.assertEqual(PulsoReplicacao.objects.get(pk=1).atualizado_em, pulso)
+
+    def test_leituras_no_principal_logo_apos_uma_gravacao_do_processo(self):
+        with mock.patch.object(MONITOR_REPLICAS, 'saudaveis', return_value=['replica1']):
+            with usar_replicas():
+                self.assertEqual(self.roteador.db_for_read(Doador), 'replica1')
+            with usar_replicas():
+                self.roteador.db_for_write(Doador)  # Gravação de outro usuário
+            with usar_replicas():
+                self.assertEqual(self.roteador.db_for_read(Doador), 'default')
+                with mock.patch('sndot.replicas.time.monotonic', return_value=time.monotonic() + 6):
+                    self.assertEqual(self.roteador.db_for_read(Doador), 'replica1')
+
+    def test_entrada_do_cache_logo_apos_invalidar_e_lida_do_principal(self):
+        invalidar('doadores')
+        with usar_replicas() as estado:
+            obter_ou_calcular('doadores', ('pagina', 1), lambda: [])
+        self.assertTrue(estado['principal'])
+
+        mais_tarde = versao('doadores') + 6 * 10 ** 9
+        with usar_replicas() as estado, mock.patch('sndot.cache.time.time_ns', return_value=mais_tarde):
+            obter_ou_calcular('doadores', ('pagina', 2), lambda: [])
+        self.assertFalse(estado['principal'])
+
+
+class ImportacaoEmSegundoPlanoTest(TesteSndot):
+
+    def criar_job(self, registros):
+        return ImportacaoDoadores.objects.create(arquivo=self.arquivo_json(registros), nome_arquivo='doadores.json')
+
+    def test_reservar_proxima_em_ordem_de_criacao(self):
+        primeiro, segundo = self.criar_job([]), self.criar_job([])
+
+        self.assertEqual(ImportacaoDoadores.reservar_proxima(), primeiro)
+        reservado = ImportacaoDoadores.reservar_proxima()
+        self.assertEqual((reservado, reservado.status), (segundo, 'Processando'))
+        self.assertIsNotNone(reservado.iniciado_em)
+        self.assertIsNone(ImportacaoDoadores.reservar_proxima())
+
+    def test_worker_grava_o_progresso_e_o_log_do_job(self):
+        registros = [{'dados': dados_pessoa(numero, contato_emergencia='(19) 3333-0000', tipo_sanguineo='A+')} for numero in (1, 2)]
+        registros.append({'dados': dados_pessoa(3, contato_emergencia='(19) 3333-0000', tipo_sanguineo='A+', cpf='123')})
+        job = self.criar_job(registros)
+
+        with mock.patch('sys.stdout', new_callable=StringIO) as terminal:
+            call_command('processar_importacoes', once=True, stdout=StringIO())
+
+        self.assertEqual(terminal.getvalue(), '')  # Nada escrito fora do stdout do comando
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Concluída')
+        self.assertEqual(
+            (job.registros_processados, job.registros_criados, job.registros_atualizados, job.registros_com_erro),
+            (3, 2, 0, 1),
+        )
+        self.assertFalse(os.path.exists(job.arquivo))
+        with open(f'{job.arquivo}.log', encoding='utf-8') as log:
+            conteudo = log.read()
+        self.assertIn("Doador 'Maria Silva' cadastrado com sucesso.", conteudo)
+        self.assertIn('3 registros processados', conteudo)
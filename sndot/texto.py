@@ -0,0 +1,14 @@
+import unicodedata
+
+
+def normalizar_texto(texto):
+    """
+    Remove acentos, converte para minúsculas e junta espaços repetidos.
+    Ex.: '  João  da Silva' -> 'joao da silva'.
+    Usada para buscas e comparações que não devem depender de acentuação ou caixa.
+    """
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
@@ -1,17 +1,25 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('doadores/importar/', views.importar_doadores, name='importar_doadores'),
+    path('doadores/importar/<int:job_id>/status/', views.status_importacao, name='status_importacao'),
     path('doadores/cadastrar/', views.cadastrar_doador, name='cadastrar_doador'),
     path('doadores/editar/<int:doador_id>/', views.editar_doador, name='editar_doador'),
     path('doadores/deletar/<int:doador_id>/', views.deletar_doador, name='deletar_doador'),
     path('doadores/listar/', views.listar_doadores, name='listar_doadores'),
+    path('doadores/exportar/', views.exportar_doadores, name='exportar_doadores'),
+    path('api/doadores/', api.listar_doadores_json, name='listar_doadores_json'),
+    path('api/doadores/lote/', api.doadores_em_lote_json, name='doadores_em_lote_json'),
+    path('api/doadores/<int:doador_id>/', api.detalhar_doador_json, name='detalhar_doador_json'),
     path('receptores/importar/', views.importar_receptores, name='importar_receptores'),
     path('receptores/cadastrar/', views.cadastrar_receptor, name='cadastrar_receptor'),
     path('receptores/listar/', views.listar_receptores, name='listar_receptores'),
+    path('receptores/<int:receptor_id>/compativeis/', views.doadores_compativeis, name='doadores_compativeis'),
     path('doacoes/registrar/', views.registrar_doacao, name='registrar_doacao'),
     path('doacoes/historico/', views.visualizar_historico_doacoes, name='visualizar_historico_doacoes'),
+    path('localidades/estados-cidades.json', views.estados_cidades, name='estados_cidades'),
+    path('localidades/municipios/', views.autocompletar_municipios, name='autocompletar_municipios'),
     path('acesso_restrito/', views.acesso_restrito, name='acesso_restrito'), # Adicione esta linha
 ]
\ No newline at end of file
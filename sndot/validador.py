@@ -32,27 +32,65 @@ class ValidadorNome(Validador):
         if not isinstance(value, str) or not value.strip() or not value.replace(" ", "").isalpha():
             raise ValidationError(f"{field_name} deve ser uma string não vazia e conter apenas letras.")
 
+# Padrões compilados uma única vez, na importação do módulo
+PADRAO_SCRIPT = re.compile(r'<script.*?>.*?</script>', re.IGNORECASE)
+PADRAO_XSS = re.compile(r'<[^>]+>')
+### https://regex101.com/r/qE9gR7/1
+REGEX_SQL = r"(\s*([\0\b\'\"\n\r\t\%\_\\]*\s*(((select\s*.+\s*from\s*.+)|(insert\s*.+\s*into\s*.+)|(update\s*.+\s*set\s*.+)|(delete\s*.+\s*from\s*.+)|(drop\s*.+)|(truncate\s*.+)|(alter\s*.+)|(exec\s*.+)|(\s*(all|any|not|and|between|in|like|or|some|contains|containsall|containskey)\s*.+[\=\>\<=\!\~]+.+)|(let\s+.+[\=]\s*.*)|(begin\s*.*\s*end)|(\s*[\/\*]+\s*.*\s*[\*\/]+)|(\s*(\-\-)\s*.*\s+)|(\s*(contains|containsall|containskey)\s+.*)))(\s*[\;]\s*)*)+)"
+PADRAO_SQL = re.compile(REGEX_SQL, re.IGNORECASE)
+
 class ValidadorScriptInjection(Validador):
     def validar(self, value, field_name):
         super().validar(value, field_name)
-        if re.search(r'<script.*?>.*?</script>', value, re.IGNORECASE):
+        if PADRAO_SCRIPT.search(value):
             raise ValidationError(f"{field_name} contém tags de script e não é permitido.")
 
 class ValidadorXSS(Validador):
     def validar(self, value, field_name):
         super().validar(value, field_name)
-        if re.search(r'<[^>]+>', value):
+        if PADRAO_XSS.search(value):
             raise ValidationError(f"{field_name} contém tags HTML e não é permitido.")
         
-### https://regex101.com/r/qE9gR7/1
 class ValidadorSQLInjection(Validador):
     def validar(self, value, field_name):
         super().validar(value, field_name)
+        if PADRAO_SQL.search(value):
+            raise ValidationError(f"{str(field_name).title()} contém caracteres que podem ser usados para injeção SQL.")
 
-        regex = r"(\s*([\0\b\'\"\n\r\t\%\_\\]*\s*(((select\s*.+\s*from\s*.+)|(insert\s*.+\s*into\s*.+)|(update\s*.+\s*set\s*.+)|(delete\s*.+\s*from\s*.+)|(drop\s*.+)|(truncate\s*.+)|(alter\s*.+)|(exec\s*.+)|(\s*(all|any|not|and|between|in|like|or|some|contains|containsall|containskey)\s*.+[\=\>\<=\!\~]+.+)|(let\s+.+[\=]\s*.*)|(begin\s*.*\s*end)|(\s*[\/\*]+\s*.*\s*[\*\/]+)|(\s*(\-\-)\s*.*\s+)|(\s*(contains|containsall|containskey)\s+.*)))(\s*[\;]\s*)*)+)"
+class ValidadorSeguranca(Validador):
+    """
+    Equivalente à cadeia ValidadorXSS -> ValidadorScriptInjection -> ValidadorSQLInjection
+    em uma única passada: os três padrões são combinados em uma só expressão compilada.
 
-        if re.search(regex, value, re.IGNORECASE):
-            raise ValidationError(f"{str(field_name).title()} contém caracteres que podem ser usados para injeção SQL.")
-        
+    No caso comum (valor válido) o texto é percorrido uma única vez. Só quando há
+    alguma ocorrência as regras são conferidas na ordem da cadeia, para que o erro
+    (e a mensagem) sejam exatamente os mesmos da cadeia original.
+    """
+    # (nome da regra, padrão, mensagem), na ordem em que a cadeia original avalia
+    REGRAS = [
+        ('xss', PADRAO_XSS, "{field_name} contém tags HTML e não é permitido."),
+        ('script', PADRAO_SCRIPT, "{field_name} contém tags de script e não é permitido."),
+        ('sql', PADRAO_SQL, "{field_name_title} contém caracteres que podem ser usados para injeção SQL."),
+    ]
+    PADRAO_COMBINADO = re.compile(
+        '|'.join(f'(?:{padrao.pattern})' for _, padrao, _ in REGRAS), re.IGNORECASE
+    )
+
+    def primeira_regra(self, value):
+        """Retorna o nome da primeira regra violada pelo valor, ou None."""
+        if not self.PADRAO_COMBINADO.search(value):
+            return None
+        for nome, padrao, _ in self.REGRAS:
+            if padrao.search(value):
+                return nome
+        return None
 
+    def validar(self, value, field_name):
+        super().validar(value, field_name)
+        regra = self.primeira_regra(value)
+        if regra:
+            mensagem = next(m for nome, _, m in self.REGRAS if nome == regra)
+            raise ValidationError(mensagem.format(field_name=field_name, field_name_title=str(field_name).title()))
 
+# Instância compartilhada: o validador não guarda estado entre chamadas
+VALIDADOR_SEGURANCA = ValidadorSeguranca()
@@ -1,44 +1,110 @@
-import json
-from django.shortcuts import render, redirect, get_object_or_404
-from django.core.management import call_command
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.db.models import ProtectedError
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control, cache_page
+from django.views.decorators.http import etag, require_GET
 from django.contrib import messages
-from .forms import ImportarDoadoresForm, CadastrarDoadorForm, BRAZILIAN_STATES_AND_CITIES
-from .models import Doador, IntencaoDeDoar  # Importe o model Doador
+from .forms import ImportarDoadoresForm, CadastrarDoadorForm, RegistrarDoacaoForm
+from .localidades import ESTADOS_CIDADES_JSON, ESTADOS_CIDADES_VERSAO, MUNICIPIOS
+from .models import Doador, IntencaoDeDoar, ImportacaoDoadores, Receptor, Doacao, ResumoMensalDoacoes  # Importe o model Doador
+from .paginacao import PaginadorKeyset, contagem_aproximada
+from .busca import buscar_doadores, filtros_da_consulta
+from .cache import aobter_ou_calcular, ttl
+from .compatibilidade import MOTOR_COMPATIBILIDADE
+from .doacoes import registrar_doacao as registrar_nova_doacao
+from .orgaos import REGISTRO_ORGAOS
+from .exportacao import FORMATOS, TIPO_GZIP, gerar_exportacao, nome_arquivo, partes_assincronas
 import os
-from datetime import date
+import uuid
+from urllib.parse import urlencode
+from datetime import date, datetime, time, timedelta
 
+@cache_page(ttl('paginas'))
 def index(request):
     return render(request, 'index.html')
 
+# Diretório onde os uploads ficam até serem processados pelo worker (processar_importacoes)
+DIRETORIO_IMPORTACOES = os.path.join(settings.BASE_DIR, 'dados_json', 'importacoes')
+
 def importar_doadores(request):
+    """
+    Recebe o arquivo de doadores e cria um job de importação em segundo plano.
+    A importação é feita pelo comando processar_importacoes; a página acompanha
+    o progresso pelo endpoint status_importacao.
+    """
     if request.method == 'POST':
         form = ImportarDoadoresForm(request.POST, request.FILES)
         if form.is_valid():
             json_file = request.FILES['json_file']
             try:
-                # Salva o arquivo JSON no diretório correto
-                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                json_file_path = os.path.join(base_dir, 'dados_json', json_file.name)
-
+                # Salva o upload em disco em blocos (memória constante) para o worker processar
+                os.makedirs(DIRETORIO_IMPORTACOES, exist_ok=True)
+                nome_arquivo = os.path.basename(json_file.name)
+                json_file_path = os.path.join(DIRETORIO_IMPORTACOES, f'{uuid.uuid4().hex}_{nome_arquivo}')
                 with open(json_file_path, 'wb') as f:
                     for chunk in json_file.chunks():
                         f.write(chunk)
 
-                # Chama a management command para importar os dados
-                call_command('import_doadores', json_file_path)
-                messages.success(request, 'Doadores importados com sucesso!')
-                return redirect('listar_doadores')  # Redireciona para a página de listagem
-            except json.JSONDecodeError:
-                messages.error(request, 'Erro ao decodificar o arquivo JSON. Verifique se o arquivo está no formato correto.')
+                job = ImportacaoDoadores.objects.create(arquivo=json_file_path, nome_arquivo=nome_arquivo)
+                messages.success(request, f'Importação #{job.pk} enviada para processamento.')
+                return redirect(f"{reverse('importar_doadores')}?job={job.pk}")
             except Exception as e:
                 messages.error(request, f'Ocorreu um erro durante a importação: {e}')
         else:
             messages.error(request, 'Por favor, selecione um arquivo JSON válido.')
     else:
         form = ImportarDoadoresForm()
-    return render(request, 'importar_doadores.html', {'form': form})
 
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = ImportacaoDoadores.objects.filter(pk=job_id).first()
+    return render(request, 'importar_doadores.html', {'form': form, 'job': job})
+
+def status_importacao(request, job_id):
+    """
+    Retorna em JSON o progresso de um job de importação: status, contagens,
+    registros por segundo e o resumo final.
+    """
+    job = get_object_or_404(ImportacaoDoadores, pk=job_id)
+    return JsonResponse(job.para_dict())
+
+
+def url_estados_cidades():
+    """URL versionada (?v=hash do conteúdo) dos estados e cidades, usada pelos formulários."""
+    return f"{reverse('estados_cidades')}?v={ESTADOS_CIDADES_VERSAO}"
+
+@require_GET
+@cache_control(public=True, max_age=31536000, immutable=True)
+@etag(lambda request: ESTADOS_CIDADES_VERSAO)
+def estados_cidades(request):
+    """
+    Estados e cidades em JSON, gerados uma única vez (ver localidades.py).
+    A URL é versionada pelo hash do conteúdo, então o navegador pode guardar a
+    resposta indefinidamente; o ETag permite revalidar com 304 sem reenviar os dados.
+    """
+    return HttpResponse(ESTADOS_CIDADES_JSON, content_type='application/json; charset=utf-8')
+
+@require_GET
+@cache_control(public=True, max_age=60 * 60 * 24)
+def autocompletar_municipios(request):
+    """
+    Municípios cujo nome começa com ?q= (sem diferenciar acentos e maiúsculas),
+    opcionalmente filtrados por ?uf=. Usa o índice em memória de municipios.py.
+    """
+    try:
+        limite = min(max(int(request.GET.get('limite', 10)), 1), 50)
+    except ValueError:
+        limite = 10
+    resultados = MUNICIPIOS.autocompletar(request.GET.get('q', ''), uf=request.GET.get('uf') or None, limite=limite)
+    return JsonResponse({'resultados': resultados})
 
 def cadastrar_doador(request):
     """
@@ -119,21 +185,23 @@ def cadastrar_doador(request):
 
     contexto = {
         'form': form,
-        'estados_cidades': json.dumps(BRAZILIAN_STATES_AND_CITIES)
+        'estados_cidades_url': url_estados_cidades(),
     }
 
     return render(request, 'cadastrar_doador.html', contexto)
 
 
-def editar_doador(request, doador_id):
+async def editar_doador(request, doador_id):
     """
     Permite editar os dados de um doador existente.
+    View assíncrona: as consultas usam o ORM assíncrono (aget, asave); o formulário,
+    Doador.editar e o template, que são síncronos, rodam via sync_to_async.
     """
-    doador = get_object_or_404(Doador, id=doador_id)
+    doador = await aget_object_or_404(Doador, id=doador_id)
 
     if request.method == 'POST':
-        form = CadastrarDoadorForm(request.POST, instance=doador)
-        if form.is_valid():
+        form = await sync_to_async(CadastrarDoadorForm)(request.POST, instance=doador)
+        if await sync_to_async(form.is_valid)():
             # Lógica para 'Outra' profissão (se aplicável)
             profissao_final = form.cleaned_data['profissao']
             if profissao_final == 'Outra' and form.cleaned_data.get('outra_profissao'):
@@ -167,14 +235,14 @@ def editar_doador(request, doador_id):
                 }
             else:
                 try:
-                    intencao = IntencaoDeDoar.objects.get(doador__cpf=doador.cpf)
+                    intencao = await IntencaoDeDoar.objects.aget(doador__cpf=doador.cpf)
                     intencao.doar_agora = False  # Atualiza para não doar agora
                     intencao.status = "inativa"  # Atualiza o status para inativa
-                    intencao.save()
+                    await intencao.asave()
                 except IntencaoDeDoar.DoesNotExist:
                     pass # Se não houver intenção, não faz nada
 
-            doador, criado, erros = Doador.editar(doador=doador, dados_intencao=intencao if doar_agora else None)
+            doador, criado, erros = await sync_to_async(Doador.editar)(doador=doador, dados_intencao=intencao if doar_agora else None)
 
             if not erros:
                 if criado:
@@ -188,24 +256,29 @@ def editar_doador(request, doador_id):
             messages.error(request, 'Por favor, corrija os erros no formulário.')
     else:
         print(repr(doador.data_nascimento))
-        form = CadastrarDoadorForm(instance=doador) # Preenche o formulário com os dados do doador
+        form = await sync_to_async(CadastrarDoadorForm)(instance=doador) # Preenche o formulário com os dados do doador
 
     contexto = {
         'form': form,
         'doador': doador, # Passa o objeto doador para o template
-        'estados_cidades': json.dumps(BRAZILIAN_STATES_AND_CITIES)
+        'estados_cidades_url': url_estados_cidades(),
     }
-    return render(request, 'editar_doador.html', contexto)
+    return await sync_to_async(render)(request, 'editar_doador.html', contexto)
 
-def deletar_doador(request, doador_id):
+async def deletar_doador(request, doador_id):
     """
-    Permite deletar um doador existente.
+    Permite deletar um doador existente (view assíncrona).
     """
-    doador = get_object_or_404(Doador, id=doador_id)
+    doador = await aget_object_or_404(Doador, id=doador_id)
 
     if request.method == 'POST':
         doador_nome = doador.nome # Salva o nome antes de deletar para a mensagem
-        doador.delete()
+        try:
+            await doador.adelete()
+        except ProtectedError:
+            # Doações registradas não podem ser removidas (Doacao.doador usa PROTECT)
+            messages.error(request, f'Doador "{doador_nome}" tem doações registradas e não pode ser deletado.')
+            return redirect('editar_doador', doador_id=doador.pk)
         messages.success(request, f'Doador "{doador_nome}" deletado com sucesso!')
         return redirect('listar_doadores')  # Redireciona para a lista após a exclusão
 
@@ -214,47 +287,79 @@ def deletar_doador(request, doador_id):
     messages.error(request, 'Método não permitido para exclusão direta. Use o formulário de edição.')
     return redirect('listar_doadores')
 
-def listar_doadores(request):
-    """
-    View para listar doadores com paginação e filtro por CPF.
+# Campos dos doadores mostrados na listagem
+CAMPOS_LISTAGEM_DOADORES = (
+    'id',
+    'nome',
+    'cpf',
+    'idade',
+    'data_nascimento',
+    'cidade_residencia',
+    'estado_residencia',
+    'tipo_sanguineo',
+    'contato_emergencia',
+)
+
+async def _pagina_doadores(filtros, cursor, por_pagina):
     """
-    # Recupera o valor do CPF do parâmetro GET da requisição
-    cpf = request.GET.get('cpf')
+    Página de doadores (dicionários com CAMPOS_LISTAGEM_DOADORES) para os filtros e o cursor.
 
-    # Filtra os doadores por CPF, se o parâmetro for fornecido
-    if cpf:
-        doadores_lista = Doador.objects.filter(cpf=cpf)
-    else:
-        doadores_lista = Doador.objects.all().order_by('nome')
-
-    doadores_lista = doadores_lista.values(
-        'id',
-        'nome',
-        'cpf',
-        'idade',
-        'data_nascimento',
-        'cidade_residencia',
-        'estado_residencia',
-        'tipo_sanguineo',
-        'contato_emergencia',            
+    Paginação por cursor sobre (nome, id): sem COUNT(*) nem OFFSET, o custo de
+    qualquer página é o mesmo, inclusive das mais profundas. Cada página fica em
+    cache pelos filtros e cursor; gravar um doador troca a versão do grupo
+    'doadores' e invalida todas as páginas de uma vez.
+    """
+    # buscar_doadores consulta o roteador de bancos (que pode ir ao banco): roda fora do event loop
+    doadores_lista = await sync_to_async(buscar_doadores)(**filtros)
+    paginator = PaginadorKeyset(doadores_lista.values(*CAMPOS_LISTAGEM_DOADORES), por_pagina)
+    return await aobter_ou_calcular(
+        'doadores', (sorted(filtros.items()), cursor, por_pagina), lambda: paginator.apagina(cursor)
     )
 
-    # Cria um objeto Paginator com a lista de doadores filtrada
-    paginator = Paginator(doadores_lista, 5)  # doadores por página
+async def listar_doadores(request):
+    """
+    View para listar doadores com paginação por cursor e busca por nome, CPF,
+    tipo sanguíneo, estado e cidade de residência (view assíncrona).
+    """
+    # Recupera os filtros dos parâmetros GET da requisição
+    filtros = filtros_da_consulta(request.GET)
+    page_obj = await _pagina_doadores(filtros, request.GET.get('cursor'), 5)  # doadores por página
 
-    # Obtém o número da página da requisição
-    page = request.GET.get('page')
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        # Se a página não for um inteiro, exibe a primeira página.
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        # Se a página estiver fora do intervalo, exibe a última página de resultados.
-        page_obj = paginator.page(paginator.num_pages)
+    contexto = {
+        'page_obj': page_obj,
+        'filtros': filtros,
+        'filtros_query': urlencode(filtros),  # Mantém os filtros nos links de paginação
+        'tipos_sanguineos': [valor for valor, _ in Doador._meta.get_field('tipo_sanguineo').choices],
+        'cursor_ultima': PaginadorKeyset.CURSOR_ULTIMA,
+        # Total aproximado (opcional): evita um COUNT(*) a cada página
+        'total_aproximado': await sync_to_async(contagem_aproximada)(Doador) if not filtros else None,
+    }
+
+    # Renderiza o template com os dados dos doadores e os filtros aplicados
+    return await sync_to_async(render)(request, 'listar_doadores.html', contexto)
+
+@staff_member_required
+@require_GET
+def exportar_doadores(request):
+    """
+    Exporta os doadores (com os mesmos filtros de listar_doadores) e as suas intenções
+    em CSV ou JSON Lines (?formato=csv|jsonl), opcionalmente comprimidos (?gzip=1).
+    A resposta é gerada em streaming, bloco a bloco, com memória constante.
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return HttpResponse(f"Formato inválido. Use: {', '.join(FORMATOS)}.", status=400)
+    compactar = request.GET.get('gzip') == '1'
+
+    # Lê de uma réplica quando possível (decidido agora, enquanto o contexto da requisição está ativo)
+    doadores = buscar_doadores(Doador.objects.using(router.db_for_read(Doador)), **filtros_da_consulta(request.GET))
+    partes = gerar_exportacao(formato, compactar, doadores)
+    if isinstance(request, ASGIRequest):
+        partes = partes_assincronas(partes)
 
-    # Renderiza o template com os dados dos doadores e o valor do filtro de CPF
-    return render(request, 'listar_doadores.html', {'page_obj': page_obj, 'cpf': cpf})
+    response = StreamingHttpResponse(partes, content_type=TIPO_GZIP if compactar else FORMATOS[formato][0])
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo(formato, compactar, timezone.localdate())}"'
+    return response
 
 def importar_receptores(request):
     return render(request, 'importar_receptores.html')
@@ -263,13 +368,105 @@ def cadastrar_receptor(request):
     return render(request, 'cadastrar_receptor.html')
 
 def listar_receptores(request):
-    return render(request, 'listar_receptores.html')
+    """
+    Fila de espera de um órgão, na ordem de atendimento (urgência e tempo de espera),
+    opcionalmente filtrada pelo tipo sanguíneo do receptor. Mostra os primeiros
+    TAMANHO_FILA receptores, lidos diretamente do índice parcial da fila.
+    """
+    TAMANHO_FILA = 50
+    orgaos = REGISTRO_ORGAOS.todos()
+    orgao = REGISTRO_ORGAOS.por_id(request.GET.get('orgao'))
+    tipo_sanguineo = request.GET.get('tipo_sanguineo', '').strip()
+
+    fila = []
+    if orgao is not None:
+        tipos = [tipo_sanguineo] if tipo_sanguineo else None
+        fila = Receptor.objects.fila(orgao, tipos).select_related('orgao')[:TAMANHO_FILA]
+
+    contexto = {
+        'orgaos': orgaos,
+        'orgao': orgao,
+        'tipo_sanguineo': tipo_sanguineo,
+        'tipos_sanguineos': [valor for valor, _ in Receptor._meta.get_field('tipo_sanguineo').choices],
+        'fila': fila,
+    }
+    return render(request, 'listar_receptores.html', contexto)
+
+def doadores_compativeis(request, receptor_id):
+    """
+    Doadores compatíveis com um receptor (tipo sanguíneo, órgão da fila e intenção de
+    doar ativa), em ordem de prioridade, lidos dos índices em memória do motor de
+    compatibilidade, sem percorrer a tabela de doadores.
+    """
+    receptor = get_object_or_404(Receptor.objects.select_related('orgao'), id=receptor_id)
+    compativeis = MOTOR_COMPATIBILIDADE.para_receptor(receptor) if receptor.status == 'Aguardando' else []
+    return render(request, 'doadores_compativeis.html', {'receptor': receptor, 'compativeis': compativeis})
 
 def registrar_doacao(request):
-    return render(request, 'registrar_doacao.html')
+    """
+    Registra a doação de um órgão de um doador para um receptor (ou para o próximo
+    receptor compatível da fila). As verificações e a gravação ficam em doacoes.py.
+    Os campos podem vir preenchidos pela URL (ex.: a partir de doadores_compativeis).
+    """
+    form = RegistrarDoacaoForm(request.POST or None, initial=request.GET.dict())
+    if request.method == 'POST' and form.is_valid():
+        dados = form.cleaned_data
+        doacao, erros = registrar_nova_doacao(dados['cpf_doador'], dados['orgao'], dados['cpf_receptor'])
+        if not erros:
+            messages.success(request, f'Doação registrada: {doacao.orgao} de "{doacao.doador.nome}" para "{doacao.receptor.nome}".')
+            return redirect('visualizar_historico_doacoes')
+        for campo, mensagens in erros.items():
+            for mensagem in mensagens:
+                messages.error(request, mensagem)
+    return render(request, 'registrar_doacao.html', {'form': form})
+
+def _inicio_do_dia(texto):
+    """Converte 'AAAA-MM-DD' no início do dia no fuso horário atual (None se inválido)."""
+    try:
+        dia = date.fromisoformat(texto)
+    except ValueError:
+        return None
+    return timezone.make_aware(datetime.combine(dia, time.min))
 
 def visualizar_historico_doacoes(request):
-    return render(request, 'visualizar_historico_doacoes.html')
+    """
+    Histórico de doações, das mais recentes para as mais antigas, com paginação por
+    cursor sobre (data, id) e filtro opcional por período e órgão. O resumo por mês
+    vem de ResumoMensalDoacoes, sem agregar a tabela de doações.
+    """
+    filtros = {
+        campo: request.GET.get(campo, '').strip()
+        for campo in ('data_inicio', 'data_fim', 'orgao')
+    }
+    filtros = {campo: valor for campo, valor in filtros.items() if valor}
+
+    doacoes = Doacao.objects.select_related('doador', 'receptor', 'orgao')
+    resumos = ResumoMensalDoacoes.objects.select_related('orgao')
+
+    inicio = _inicio_do_dia(filtros.get('data_inicio', ''))
+    if inicio:
+        doacoes = doacoes.filter(data__gte=inicio)
+        resumos = resumos.filter(mes__gte=inicio.date().replace(day=1))
+    fim = _inicio_do_dia(filtros.get('data_fim', ''))
+    if fim:
+        doacoes = doacoes.filter(data__lt=fim + timedelta(days=1))  # inclui o dia final inteiro
+        resumos = resumos.filter(mes__lte=fim.date())
+    if filtros.get('orgao', '').isdigit():
+        doacoes = doacoes.filter(orgao_id=filtros['orgao'])
+        resumos = resumos.filter(orgao_id=filtros['orgao'])
+
+    paginator = PaginadorKeyset(doacoes, 10, campo='data', decrescente=True)
+    page_obj = paginator.pagina(request.GET.get('cursor'))
+
+    contexto = {
+        'page_obj': page_obj,
+        'filtros': filtros,
+        'filtros_query': urlencode(filtros),  # Mantém os filtros nos links de paginação
+        'cursor_ultima': PaginadorKeyset.CURSOR_ULTIMA,
+        'orgaos': REGISTRO_ORGAOS.todos(),
+        'resumos': resumos,
+    }
+    return render(request, 'visualizar_historico_doacoes.html', contexto)
 
 def acesso_restrito(request): # Crie esta view
     return render(request, 'acesso_restrito.html')
\ No newline at end of file
@@ -7,4 +7,5 @@ urlpatterns = [
     path('login/', views.logar, name='login'),
     path('logout/', views.logout, name='logout'),
     path('painel-admin/', views.painel_admin, name='painel_admin'),
+    path('metricas/', views.metricas, name='metricas'),
 ]
\ No newline at end of file
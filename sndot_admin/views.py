@@ -1,23 +1,65 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from sndot.middleware import METRICAS
+from sndot.cache import fixar_se_recente, ttl, versao
+from sndot.models import EstatisticaDoadores
+from sndot.orgaos import REGISTRO_ORGAOS
 
 # Create your views here.
 
+DIAS_CADASTROS_PAINEL = 30  # Dias exibidos em "Doadores cadastrados por dia"
+
 def painel_admin(request):
     """
-    View para a página administrativa.
-    Aqui você pode adicionar lógica para exibir dados administrativos,
-    como estatísticas, gráficos, etc.
+    View para a página administrativa, com as estatísticas operacionais.
+    Os números vêm de EstatisticaDoadores (contadores mantidos a cada gravação),
+    então o painel faz o mesmo número de consultas pequenas, qualquer que seja
+    a quantidade de doadores.
+
+    As estatísticas ficam em um fragmento de template em cache (grupo 'painel'),
+    invalidado a cada gravação de doador, intenção ou órgão; 'secoes' é passado
+    como função, então só é calculado quando o fragmento não está em cache.
     """
-    # Exemplo de lógica para exibir dados administrativos
-    # Você pode substituir isso por qualquer lógica que desejar
+    versao_painel = versao('painel')
+    fixar_se_recente(versao_painel)  # Logo após uma gravação, o fragmento é montado com o principal
     context = {
         'titulo': 'Painel Administrativo',
-        'mensagem': 'Bem-vindo ao painel administrativo!'
+        'mensagem': 'Bem-vindo ao painel administrativo!',
+        'secoes': secoes_estatisticas,
+        'versao_painel': versao_painel,
+        'ttl_painel': ttl('painel'),
     }
     return render(request, 'admin.html', context)
 
+def secoes_estatisticas():
+    """Lista de (título, linhas) de cada dimensão de EstatisticaDoadores, exibida no painel."""
+    estatisticas = {dimensao: [] for dimensao, _ in EstatisticaDoadores.DIMENSOES}
+    linhas = EstatisticaDoadores.objects.exclude(dimensao='importacao_dia').filter(total__gt=0).order_by('dimensao', 'valor')
+    for linha in linhas:
+        estatisticas[linha.dimensao].append(linha)
+    estatisticas['importacao_dia'] = list(
+        EstatisticaDoadores.objects.filter(dimensao='importacao_dia').order_by('-valor')[:DIAS_CADASTROS_PAINEL]
+    )
+
+    # Os contadores por órgão guardam o id: troca pelo nome, vindo do catálogo em memória
+    for linha in estatisticas['orgao']:
+        orgao = REGISTRO_ORGAOS.por_id(linha.valor)
+        linha.valor = orgao.nome if orgao else linha.valor
+
+    return [(titulo, estatisticas[dimensao]) for dimensao, titulo in EstatisticaDoadores.DIMENSOES]
+
+@staff_member_required
+def metricas(request):
+    """
+    Retorna em JSON as métricas por view deste processo: p50/p95/p99 de tempo,
+    quantidade de consultas e tempo de SQL, e as consultas mais lentas.
+    Apenas para usuários da equipe (is_staff).
+    """
+    return JsonResponse(METRICAS.resumo())
+
 def logar(request):
     """
     View para a tela de login administrativo.